@@ -1,25 +1,31 @@
 #!/usr/bin/env python3
 import argparse
+import codecs
 import json
 import os
-import re
 import shlex
 import shutil
 import subprocess
 import sys
+import threading
+import time
 from pathlib import Path
 
-ANSI_RE = re.compile(r'\x1b\[[0-9;?]*[ -/]*[@-~]')
+# process start as seen by this module; the `imports` phase runs from here to main()
+_STARTED = time.monotonic()
+
+from agent_server import DEFAULT_ADDRESS, send_request, serve
+from batch_runner import run_batch
+from model_pool import touch_model
+from output_sanitizer import OutputSanitizer, sanitize
+from ollama_client import OllamaHTTPError, find_api_url, get_client
+from request_metrics import DEFAULT_METRICS_PATH, MetricsSink, Timings, request_record
+from response_cache import DEFAULT_CACHE_PATH, ResponseCache, cache_key
 
 def remove_ansi(s: str) -> str:
     if not s:
         return s
-    s = ANSI_RE.sub('', s)
-    # strip braille/spinner glyphs
-    s = re.sub(r'[\u2800-\u28FF]', '', s)
-    # remove control chars
-    s = ''.join(ch for ch in s if ch.isprintable() or ch in '\t\n')
-    return s.strip()
+    return sanitize(s).strip()
 
 def find_config(root: Path) -> dict:
     cfg = root / '.continue' / 'config.agent'
@@ -30,59 +36,224 @@ def find_config(root: Path) -> dict:
     except Exception:
         return {}
 
-def main():
-    p = argparse.ArgumentParser()
-    p.add_argument('--agent', '-a', help='Agent name')
-    p.add_argument('--prompt', '-p', help='Prompt text')
-    p.add_argument('--ci', action='store_true', help='CI mode: force no external runtime calls and use echo fallback')
-    p.add_argument('--noop', action='store_true', help='No-op mode: return immediately with stub response')
-    p.add_argument('--short', action='store_true', help='Return a shortened response (good for CI)')
-    p.add_argument('--timeout', type=float, default=10.0, help='Timeout (seconds) for external runtime calls')
-    args = p.parse_args()
+def _load_seconds(rec: dict, timings: Timings = None):
+    """Copy the runtime's own model load time (ns) from a final reply record into `timings`."""
+    if timings is not None and rec.get('load_duration') is not None:
+        timings.add('modelLoad', rec['load_duration'] / 1e9)
 
-    prompt = args.prompt
-    if not prompt:
-        # try stdin
-        try:
-            prompt = sys.stdin.read().strip()
-        except Exception:
-            prompt = ''
+def run_ollama_cli(model: str, prompt: str, timeout: float, timings: Timings = None) -> dict:
+    cmd = ['ollama', 'run', model, prompt]
+    env = os.environ.copy()
+    env['TERM'] = 'dumb'
+    t0 = time.monotonic()
+    try:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env,
+                                text=True, encoding='utf-8', errors='replace')
+    except FileNotFoundError:
+        return {'raw': 'ollama not found', 'cleaned': 'ollama not found', 'exitCode': 127}
+    if timings is not None:
+        timings.since(t0, 'spawn')
+    try:
+        # apply timeout from args
+        stdout, stderr = proc.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired as te:
+        proc.kill()
+        proc.communicate()
+        return {'raw': f'ollama timeout: {te}', 'cleaned': f'ollama timeout', 'exitCode': 124}
+    raw = (stdout or '') + '\n' + (stderr or '')
+    cleaned = remove_ansi(raw)
+    return {'raw': raw, 'cleaned': cleaned, 'exitCode': proc.returncode}
 
-    if not prompt:
-        print(json.dumps({'error': 'no prompt provided'}))
-        sys.exit(2)
+def run_ollama_http(api_url: str, model: str, prompt: str, timeout: float, timings: Timings = None) -> dict:
+    """Call `/api/generate` over the shared keep-alive pool.
 
-    cwd = Path.cwd()
-    cfg = find_config(cwd)
-    agent_name = args.agent or None
+    Returns None when the runtime is unreachable so the caller can fall back
+    to the CLI. The reply is structured JSON, so no ANSI cleanup is needed.
+    Without a stream there is no client-side first token; `timings` gets the
+    runtime's own load and eval durations instead.
+    """
+    client = get_client(api_url, timeout=timeout)
+    try:
+        data = client.generate(model, prompt, timeout=timeout)
+    except TimeoutError as te:
+        return {'raw': f'ollama timeout: {te}', 'cleaned': 'ollama timeout', 'exitCode': 124}
+    except OllamaHTTPError as he:
+        return {'raw': str(he), 'cleaned': he.message, 'exitCode': 1}
+    except OSError:
+        return None
+    _load_seconds(data, timings)
+    if timings is not None and data.get('eval_duration') is not None:
+        timings.add('generation', data['eval_duration'] / 1e9)
+    text = data.get('response', '')
+    return {'raw': text, 'cleaned': text.strip(), 'exitCode': 0}
+
+def stream_ollama_cli(model: str, prompt: str, timeout: float, emit, timings: Timings = None) -> dict:
+    """Like run_ollama_cli, but pass cleaned output to `emit` as it arrives.
+
+    The pipe is read in chunks (no waiting for a newline while the spinner
+    redraws), decoded incrementally and cleaned by one OutputSanitizer, so an
+    escape sequence or UTF-8 character split across reads is handled.
+    `emit(text)` returning False stops the generation (used by --short).
+    """
+    cmd = ['ollama', 'run', model, prompt]
+    env = os.environ.copy()
+    env['TERM'] = 'dumb'
+    t0 = time.monotonic()
+    try:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, env=env)
+    except FileNotFoundError:
+        return {'raw': 'ollama not found', 'cleaned': 'ollama not found', 'exitCode': 127}
+    if timings is not None:
+        timings.since(t0, 'spawn')
+    timed_out = threading.Event()
+
+    def on_timeout():
+        timed_out.set()
+        proc.kill()
+
+    timer = threading.Timer(timeout, on_timeout)
+    timer.start()
+    raw, cleaned = [], []
+    stopped = False
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    sanitizer = OutputSanitizer()
+    try:
+        while True:
+            block = proc.stdout.read1(65536)
+            part = decoder.decode(block, final=not block)
+            raw.append(part)
+            text = sanitizer.feed(part) if block else sanitizer.feed(part) + sanitizer.flush()
+            if text and (cleaned or text.strip()):
+                # leading whitespace (spinner padding) is dropped until the answer starts
+                if timings is not None:
+                    timings.first_token()
+                cleaned.append(text)
+                if not emit(text):
+                    stopped = True
+                    proc.kill()
+                    break
+            if not block:
+                break
+        proc.wait()
+    finally:
+        timer.cancel()
+    if timings is not None:
+        timings.finish_generation()
+    if timed_out.is_set():
+        return {'raw': ''.join(raw) + 'ollama timeout', 'cleaned': 'ollama timeout', 'exitCode': 124}
+    return {'raw': ''.join(raw), 'cleaned': ''.join(cleaned).strip(), 'exitCode': 0 if stopped else proc.returncode}
+
+def stream_ollama_http(api_url: str, model: str, prompt: str, timeout: float, emit, timings: Timings = None) -> dict:
+    """Streamed `/api/generate`: each token record's text is passed to `emit`."""
+    client = get_client(api_url, timeout=timeout)
+    parts = []
+    started = False
+    try:
+        for rec in client.generate_stream(model, prompt, timeout=timeout):
+            started = True
+            if rec.get('done'):
+                _load_seconds(rec, timings)
+            text = rec.get('response', '')
+            if not text:
+                continue
+            if timings is not None:
+                timings.first_token()
+            parts.append(text)
+            if not emit(text):
+                break
+    except TimeoutError as te:
+        return {'raw': ''.join(parts) + f'ollama timeout: {te}', 'cleaned': 'ollama timeout', 'exitCode': 124}
+    except OllamaHTTPError as he:
+        return {'raw': str(he), 'cleaned': he.message, 'exitCode': 1}
+    except OSError:
+        if not started:
+            return None
+        return {'raw': ''.join(parts), 'cleaned': 'ollama connection lost', 'exitCode': 1}
+    if timings is not None:
+        timings.finish_generation()
+    text = ''.join(parts)
+    return {'raw': text, 'cleaned': text.strip(), 'exitCode': 0}
+
+class ShortStream:
+    """Apply the --short limit to emitted chunks as they arrive."""
+
+    def __init__(self, emit, max_chars: int):
+        self.emit = emit
+        self.left = max_chars
+        self.truncated = False
+
+    def __call__(self, text: str) -> bool:
+        if len(text) > self.left:
+            if self.left:
+                self.emit(text[:self.left])
+            self.left = 0
+            self.truncated = True
+            return False
+        self.left -= len(text)
+        self.emit(text)
+        return True
+
+def resolve_agent_name(root: Path, cfg: dict, agent_name: str = None) -> str:
     if not agent_name:
-        sel = cwd / '.continue' / 'selected_agent.txt'
+        sel = root / '.continue' / 'selected_agent.txt'
         if sel.exists():
             agent_name = sel.read_text(encoding='utf-8').strip()
     if not agent_name:
         agent_name = cfg.get('default', 'CustomAgent')
+    return agent_name
 
-    selected = None
+def select_agent(cfg: dict, agent_name: str) -> dict:
     for a in cfg.get('agents', []):
         if a.get('name') == agent_name:
-            selected = a
-            break
-    if not selected:
-        selected = {'name': 'echo', 'options': {'model': 'none', 'mode': 'echo'}}
+            return a
+    return {'name': 'echo', 'options': {'model': 'none', 'mode': 'echo'}}
 
-    model = selected.get('options', {}).get('model')
+def call_runtime(root: Path, model: str, prompt: str, timeout: float, backend: str, emit=None,
+                 timings: Timings = None) -> dict:
+    """Run `prompt` on the local runtime; None when no runtime is available."""
+    result = None
+    if backend in ('auto', 'http'):
+        if emit is None:
+            result = run_ollama_http(find_api_url(root), model, prompt, timeout, timings)
+        else:
+            result = stream_ollama_http(find_api_url(root), model, prompt, timeout, emit, timings)
+        if result is None and backend == 'http':
+            result = {'raw': 'ollama api unreachable', 'cleaned': 'ollama api unreachable', 'exitCode': 127}
+        if result is not None and timings is not None:
+            timings.backend = 'http'
+    if result is None and shutil.which('ollama'):
+        if emit is None:
+            result = run_ollama_cli(model, prompt, timeout, timings)
+        else:
+            result = stream_ollama_cli(model, prompt, timeout, emit, timings)
+        if timings is not None:
+            timings.backend = 'cli'
+    return result
+
+def run_prompt(root: Path, selected: dict, prompt: str, ci: bool = False, noop: bool = False,
+               short: bool = False, timeout: float = 10.0, backend: str = 'auto', emit=None,
+               cache: ResponseCache = None, timings: Timings = None) -> dict:
+    """Run one prompt for `selected` and return the JSON envelope printed by main().
 
-    llm_result = {'raw': '', 'cleaned': '', 'exitCode': 1}
-    ok = False
+    With `emit`, response text is also passed to `emit(text)` as it is generated
+    (already cut to the --short limit) before the envelope is returned. With
+    `cache`, successful runtime replies are stored and later identical requests
+    skip the runtime (envelope gets `"cached": true`). With `timings`, phase
+    durations are recorded into it and the envelope gets `"timings"`.
+    """
+    max_chars = int(os.environ.get('AGENT_RUNNER_SHORT_CHARS', '200'))
+    model = selected.get('options', {}).get('model')
 
     # Decide whether to invoke external runtimes.
     # Priority: explicit flags -> environment gates. In CI we prefer echo fallback.
     ollama_disabled = os.environ.get('OLLAMA_DISABLED') == '1'
     run_ollama_flag = os.environ.get('RUN_OLLAMA_INTEGRATION') == '1'
-    if args.ci:
+    if ci:
         ollama_disabled = True
-    if args.noop:
+    if noop:
         # immediate stub response for fast CI tests
+        if emit is not None:
+            emit(f"[noop] {prompt}")
         resp = {
             'agent': selected.get('name'),
             'options': selected.get('options'),
@@ -92,36 +263,54 @@ def main():
             'ok': True,
             'exitCode': 0,
         }
-        sys.stdout.write(json.dumps(resp, ensure_ascii=True))
-        return
+        if timings is not None:
+            timings.backend = 'noop'
+            resp['timings'] = timings.as_dict()
+        return resp
 
-    if model and model != 'none' and (not ollama_disabled) and run_ollama_flag and shutil.which('ollama'):
-        cmd = ['ollama', 'run', model, prompt]
-        env = os.environ.copy()
-        env['TERM'] = 'dumb'
-        try:
-            # apply timeout from args
-            proc = subprocess.run(cmd, capture_output=True, env=env, text=True, encoding='utf-8', errors='replace', timeout=args.timeout)
-            raw = (proc.stdout or '') + '\n' + (proc.stderr or '')
-            cleaned = remove_ansi(raw)
-            llm_result = {'raw': raw, 'cleaned': cleaned, 'exitCode': proc.returncode}
-            ok = proc.returncode == 0
-        except subprocess.TimeoutExpired as te:
-            llm_result = {'raw': f'ollama timeout: {te}', 'cleaned': f'ollama timeout', 'exitCode': 124}
-            ok = False
-        except FileNotFoundError:
-            llm_result = {'raw': 'ollama not found', 'cleaned': 'ollama not found', 'exitCode': 127}
-    else:
+    short_stream = None
+    if emit is not None and short:
+        emit = short_stream = ShortStream(emit, max_chars)
+    result = None
+    cached = False
+    if model and model != 'none' and (not ollama_disabled) and run_ollama_flag:
+        key = None
+        if cache is not None:
+            t0 = time.monotonic()
+            key = cache_key(selected.get('name'), model, selected.get('options'), prompt)
+            result = cache.get(key)
+            cached = result is not None
+            if timings is not None:
+                timings.since(t0, 'cache')
+                if cached:
+                    timings.backend = 'cache'
+            if cached and emit is not None:
+                emit(result['cleaned'])
+        if result is None:
+            t0 = time.monotonic()
+            result = call_runtime(root, model, prompt, timeout, backend, emit, timings)
+            if timings is not None and result is not None:
+                timings.since(t0, 'runtime')
+            if result is not None:
+                touch_model(root, model)
+            complete = short_stream is None or not short_stream.truncated
+            if key is not None and result is not None and result['exitCode'] == 0 and complete:
+                cache.put(key, result, agent=selected.get('name'), model=model)
+    if result is None:
         # fallback echo
         out = f"[{selected.get('name')}] Echo: {prompt}"
-        llm_result = {'raw': out, 'cleaned': out, 'exitCode': 0}
-        ok = True
+        result = {'raw': out, 'cleaned': out, 'exitCode': 0}
+        if timings is not None:
+            timings.backend = 'echo'
+        if emit is not None:
+            emit(out)
+    llm_result = result
+    ok = llm_result['exitCode'] == 0
 
     # Optionally shorten response for CI
     final_response = llm_result['cleaned']
-    if args.short and final_response:
-        max_chars = int(os.environ.get('AGENT_RUNNER_SHORT_CHARS', '200'))
-        if len(final_response) > max_chars:
+    if short and final_response:
+        if len(final_response) > max_chars or (short_stream is not None and short_stream.truncated):
             final_response = final_response[:max_chars] + '...'
 
     resp = {
@@ -133,7 +322,189 @@ def main():
         'ok': ok,
         'exitCode': llm_result['exitCode'],
     }
-    sys.stdout.write(json.dumps(resp, ensure_ascii=True))
+    if cached:
+        resp['cached'] = True
+    if timings is not None:
+        resp['timings'] = timings.as_dict()
+    return resp
+
+def record_metrics(sink: MetricsSink, resp: dict, selected: dict, timings: Timings):
+    """Append one request to the metrics sink; a failing sink never fails the request."""
+    try:
+        sink.append(request_record(resp, model=selected.get('options', {}).get('model'), backend=timings.backend))
+    except OSError as e:
+        sys.stderr.write(f'metrics: {e}\n')
+
+def make_handler(root: Path, ci: bool = False, timeout: float = 10.0, backend: str = 'auto',
+                 cache: ResponseCache = None, timings: bool = False, metrics: MetricsSink = None):
+    """Load config once and return a `handler(request) -> envelope` for server/batch mode.
+
+    `handler.select(request)` returns the agent definition a request resolves to.
+    Envelopes carry `timings` when `timings` is set or the request has
+    `"timings": true`; with `metrics`, every request is appended to the sink.
+    """
+    cfg = find_config(root)
+    default_agent = resolve_agent_name(root, cfg)
+    agents = {a.get('name'): a for a in cfg.get('agents', [])}
+    echo = select_agent({}, None)
+
+    def select(request: dict) -> dict:
+        return agents.get(request.get('agent') or default_agent, echo)
+
+    def handle(request: dict, emit=None) -> dict:
+        want = timings or bool(request.get('timings'))
+        t = Timings() if want or metrics is not None else None
+        selected = select(request)
+        resp = run_prompt(root, selected, request['prompt'], ci=ci or bool(request.get('ci')),
+                          noop=bool(request.get('noop')), short=bool(request.get('short')),
+                          timeout=float(request.get('timeout') or timeout), backend=request.get('backend') or backend,
+                          emit=emit, cache=cache, timings=t)
+        if metrics is not None:
+            record_metrics(metrics, resp, selected, t)
+        if not want:
+            resp.pop('timings', None)
+        return resp
+    handle.select = select
+    return handle
+
+def batch_main(root: Path, args, cache: ResponseCache = None, metrics: MetricsSink = None) -> int:
+    handler = make_handler(root, ci=args.ci, timeout=args.timeout, backend=args.backend, cache=cache,
+                           timings=args.timings, metrics=metrics)
+    # CLI flags are defaults; per-record fields win
+    defaults = {k: v for k, v in (('agent', args.agent), ('noop', args.noop), ('short', args.short)) if v}
+
+    def handle(request: dict) -> dict:
+        return handler(dict(defaults, **request))
+
+    def model_of(request: dict):
+        return handler.select(dict(defaults, **request)).get('options', {}).get('model')
+
+    src = sys.stdin if args.batch == '-' else open(args.batch, encoding='utf-8-sig')
+    out = sys.stdout if not args.batch_output else open(args.batch_output, 'w', encoding='utf-8')
+    try:
+        summary = run_batch(src, handle, out, model_of, max_concurrency=args.max_concurrency,
+                            per_model=args.model_concurrency, prompt_field=args.prompt_field)
+    finally:
+        if src is not sys.stdin:
+            src.close()
+        if out is not sys.stdout:
+            out.close()
+    sys.stderr.write(json.dumps(summary) + '\n')
+    return 0 if summary['failed'] == 0 else 1
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument('--agent', '-a', help='Agent name')
+    p.add_argument('--prompt', '-p', help='Prompt text')
+    p.add_argument('--ci', action='store_true', help='CI mode: force no external runtime calls and use echo fallback')
+    p.add_argument('--noop', action='store_true', help='No-op mode: return immediately with stub response')
+    p.add_argument('--short', action='store_true', help='Return a shortened response (good for CI)')
+    p.add_argument('--timeout', type=float, default=10.0, help='Timeout (seconds) for external runtime calls')
+    p.add_argument('--backend', choices=['auto', 'http', 'cli'], default=os.environ.get('AGENT_RUNNER_BACKEND', 'auto'),
+                   help='Runtime backend: http API (keep-alive), `ollama run` cli, or auto (http, falling back to cli)')
+    p.add_argument('--stream', action='store_true',
+                   help='Write NDJSON: one {"response", "done": false} record per chunk, then the envelope with "done": true')
+    p.add_argument('--cache', action='store_true', default=os.environ.get('AGENT_RUNNER_CACHE') == '1',
+                   help='Serve repeated (agent, model, options, prompt) requests from the on-disk response cache')
+    p.add_argument('--cache-path', default=os.environ.get('AGENT_RUNNER_CACHE_PATH', str(DEFAULT_CACHE_PATH)))
+    p.add_argument('--cache-ttl', type=float, default=float(os.environ.get('AGENT_RUNNER_CACHE_TTL', '86400')),
+                   help='Cache entry lifetime in seconds (0 = no expiry)')
+    p.add_argument('--cache-max-entries', type=int, default=int(os.environ.get('AGENT_RUNNER_CACHE_MAX_ENTRIES', '10000')))
+    p.add_argument('--batch', metavar='FILE.jsonl',
+                   help="Run every prompt record in a JSONL file ('-' = stdin); results are JSONL in completion order")
+    p.add_argument('--batch-output', help='Batch mode: write results here instead of stdout')
+    p.add_argument('--prompt-field', default='prompt', help="Batch mode: record field holding the prompt (e.g. 'body')")
+    p.add_argument('--model-concurrency', type=int, default=int(os.environ.get('AGENT_RUNNER_MODEL_CONCURRENCY', '2')),
+                   help='Batch mode: prompts in flight per model')
+    p.add_argument('--serve', action='store_true', help='Run as a resident server accepting prompts on --address')
+    p.add_argument('--address', default=os.environ.get('AGENT_RUNNER_ADDRESS', DEFAULT_ADDRESS),
+                   help='Server address: host:port or unix:/path/to.sock')
+    p.add_argument('--max-concurrency', type=int, default=int(os.environ.get('AGENT_RUNNER_MAX_CONCURRENCY', '4')),
+                   help='Server/batch mode: prompts executed concurrently')
+    p.add_argument('--connect', action='store_true', default=os.environ.get('AGENT_RUNNER_CONNECT') == '1',
+                   help='Client mode: send the prompt to a running server, run in-process if none is listening')
+    p.add_argument('--timings', action='store_true', default=os.environ.get('AGENT_RUNNER_TIMINGS') == '1',
+                   help='Add per-phase "timings" (seconds) to the envelope')
+    p.add_argument('--metrics', nargs='?', const=str(DEFAULT_METRICS_PATH), default=os.environ.get('AGENT_RUNNER_METRICS'),
+                   metavar='PATH', help=f'Append one timing record per request to a JSONL sink (default {DEFAULT_METRICS_PATH})')
+    args = p.parse_args()
+
+    cwd = Path.cwd()
+    timings = Timings(origin=_STARTED) if args.timings or args.metrics else None
+    if timings is not None:
+        timings.since(_STARTED, 'imports')
+    metrics = MetricsSink(cwd / args.metrics) if args.metrics else None
+    cache = None
+    if args.cache:
+        cache = ResponseCache(cwd / args.cache_path, ttl_seconds=args.cache_ttl, max_entries=args.cache_max_entries)
+    if args.serve:
+        handler = make_handler(cwd, ci=args.ci, timeout=args.timeout, backend=args.backend, cache=cache,
+                               timings=args.timings, metrics=metrics)
+        serve(args.address, handler, max_concurrency=args.max_concurrency)
+        return
+    if args.batch:
+        sys.exit(batch_main(cwd, args, cache, metrics))
+
+    prompt = args.prompt
+    if not prompt:
+        # try stdin
+        try:
+            prompt = sys.stdin.read().strip()
+        except Exception:
+            prompt = ''
+
+    if not prompt:
+        print(json.dumps({'error': 'no prompt provided'}))
+        sys.exit(2)
+
+    emit = None
+    if args.stream:
+        def emit(text):
+            sys.stdout.write(json.dumps({'response': text, 'done': False}, ensure_ascii=True) + '\n')
+            sys.stdout.flush()
+
+    request = {'agent': args.agent, 'prompt': prompt, 'ci': args.ci, 'noop': args.noop,
+               'short': args.short, 'timeout': args.timeout, 'backend': args.backend, 'stream': args.stream}
+    if args.timings:
+        request['timings'] = True
+    resp = None
+    if args.connect:
+        streamed = []
+
+        def on_chunk(rec):
+            streamed.append(rec)
+            if emit:
+                emit(rec['response'])
+
+        try:
+            resp = send_request(args.address, request, timeout=args.timeout + 5, on_chunk=on_chunk)
+        except ValueError as e:
+            resp = {'error': f'invalid reply from agent server: {e}', 'ok': False}
+        except OSError as e:
+            if streamed:
+                # part of the answer is already out: running it again would repeat it
+                resp = {'error': f'agent server connection lost: {type(e).__name__}: {e}', 'ok': False}
+            else:
+                # no server listening, or it stalled/reset before answering: run in-process as before
+                resp = None
+    if resp is None:
+        t0 = time.monotonic()
+        cfg = find_config(cwd)
+        selected = select_agent(cfg, resolve_agent_name(cwd, cfg, args.agent))
+        if timings is not None:
+            timings.since(t0, 'config')
+        resp = run_prompt(cwd, selected, prompt, ci=args.ci, noop=args.noop, short=args.short,
+                          timeout=args.timeout, backend=args.backend, emit=emit, cache=cache, timings=timings)
+        # with --connect the server's own sink records the request
+        if metrics is not None:
+            record_metrics(metrics, resp, selected, timings)
+        if not args.timings:
+            resp.pop('timings', None)
+    if args.stream:
+        resp['done'] = True
+        sys.stdout.write(json.dumps(resp, ensure_ascii=True) + '\n')
+    else:
+        sys.stdout.write(json.dumps(resp, ensure_ascii=True))
 
 if __name__ == '__main__':
     main()
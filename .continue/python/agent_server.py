@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""Resident request server and thin client for `agent_runner.py`.
+
+Protocol: newline-delimited JSON over a local TCP socket (`host:port`) or a
+Unix socket (`unix:/path`). Each request line is answered by exactly one
+response line; a connection may send any number of requests. Request fields
+mirror the CLI flags (`agent`, `prompt`, `ci`, `noop`, `short`, `timeout`,
+`backend`) and the response is the envelope `agent_runner.main()` prints.
+`{"op": "ping"}` returns `{"ok": true}` for health checks. With
+`"stream": true` the server first writes `{"response": ..., "done": false}`
+chunk lines, then the envelope with `"done": true`.
+
+The transport knows nothing about agents: `serve()` takes a `handler(request)
+-> dict` built once by the runner, so config is parsed a single time.
+"""
+import json
+import os
+import socket
+import socketserver
+import threading
+from pathlib import Path
+
+DEFAULT_ADDRESS = '127.0.0.1:8765'
+
+
+def parse_address(address: str):
+    """Return `(family, sockaddr)` for `host:port` or `unix:/path`."""
+    if address.startswith('unix:'):
+        return socket.AF_UNIX, address[len('unix:'):]
+    host, _, port = address.rpartition(':')
+    return socket.AF_INET, (host or '127.0.0.1', int(port))
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                request = json.loads(line)
+            except ValueError:
+                self.write({'error': 'invalid json request'})
+                continue
+            if not isinstance(request, dict):
+                self.write({'error': 'request must be a JSON object'})
+                continue
+            if request.get('stream'):
+                resp = self.server.dispatch(request, lambda text: self.write({'response': text, 'done': False}))
+                resp['done'] = True
+            else:
+                resp = self.server.dispatch(request)
+            self.write(resp)
+
+    def write(self, record: dict):
+        self.wfile.write((json.dumps(record, ensure_ascii=True) + '\n').encode('utf-8'))
+        self.wfile.flush()
+
+
+class _ServerMixin:
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 64
+
+    def setup_dispatch(self, handler, max_concurrency: int):
+        self.handler = handler
+        self.slots = threading.BoundedSemaphore(max(1, max_concurrency))
+
+    def dispatch(self, request: dict, emit=None) -> dict:
+        if request.get('op') == 'ping':
+            return {'ok': True}
+        if not request.get('prompt'):
+            return {'error': 'no prompt provided'}
+        with self.slots:
+            try:
+                if emit is not None:
+                    return self.handler(request, emit)
+                return self.handler(request)
+            except Exception as e:
+                return {'error': f'{type(e).__name__}: {e}'}
+
+
+class TCPServer(_ServerMixin, socketserver.ThreadingTCPServer):
+    pass
+
+
+if hasattr(socketserver, 'ThreadingUnixStreamServer'):
+    class UnixServer(_ServerMixin, socketserver.ThreadingUnixStreamServer):
+        pass
+else:
+    UnixServer = None
+
+
+def make_server(address: str, handler, max_concurrency: int = 4):
+    family, sockaddr = parse_address(address)
+    if family == socket.AF_INET:
+        srv = TCPServer(sockaddr, _RequestHandler)
+    else:
+        if UnixServer is None:
+            raise OSError('unix sockets are not supported on this platform')
+        path = Path(sockaddr)
+        if path.exists():
+            # stale socket from a previous run
+            path.unlink()
+        srv = UnixServer(sockaddr, _RequestHandler)
+    srv.setup_dispatch(handler, max_concurrency)
+    return srv
+
+
+def serve(address: str, handler, max_concurrency: int = 4):
+    srv = make_server(address, handler, max_concurrency)
+    print(json.dumps({'serving': address, 'pid': os.getpid(), 'maxConcurrency': max_concurrency}), flush=True)
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        print('stopped')
+    finally:
+        srv.server_close()
+        if isinstance(srv.server_address, str) and os.path.exists(srv.server_address):
+            os.unlink(srv.server_address)
+
+
+def send_request(address: str, request: dict, timeout: float = 30.0, on_chunk=None) -> dict:
+    """Send one request to a running server and return its response.
+
+    For streamed requests each chunk record is passed to `on_chunk` and the
+    final envelope is returned. Raises OSError (e.g. ConnectionRefusedError)
+    when no server is listening or the connection fails, and ValueError when
+    the server replies with something other than a JSON object.
+    """
+    family, sockaddr = parse_address(address)
+    with socket.socket(family, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(sockaddr)
+        with sock.makefile('rwb') as f:
+            f.write((json.dumps(request) + '\n').encode('utf-8'))
+            f.flush()
+            while True:
+                line = f.readline()
+                if not line:
+                    raise ConnectionResetError('server closed connection without reply')
+                rec = json.loads(line)
+                if not isinstance(rec, dict):
+                    raise ValueError('reply is not a JSON object')
+                if rec.get('done') is False:
+                    if on_chunk is not None:
+                        on_chunk(rec)
+                    continue
+                return rec
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""Batch fan-out for `agent_runner.py --batch <file.jsonl>`.
+
+Input records are read one line at a time into per-model queues; at most
+`max_concurrency` requests are in flight, at most `per_model` of those against
+the same model, and reading pauses while the queues are full (so memory stays
+bounded for arbitrarily large files). Each result is written as one
+JSONL line as soon as it completes, carrying the input line's `index`.
+
+Input lines are JSON objects (`{"prompt": ..., "agent": ..., "short": ...}`,
+same fields as a server request) or bare JSON strings used as the prompt.
+"""
+import json
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+def iter_requests(lines, prompt_field: str = 'prompt'):
+    """Yield `(index, request_or_None, error_or_None)` per non-blank input line."""
+    for index, line in enumerate(lines):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            rec = json.loads(line)
+        except ValueError:
+            yield index, None, 'invalid json'
+            continue
+        if isinstance(rec, str):
+            rec = {'prompt': rec}
+        if not isinstance(rec, dict):
+            yield index, None, 'record must be an object or string'
+            continue
+        request = dict(rec)
+        request['prompt'] = rec.get(prompt_field)
+        if not request['prompt']:
+            yield index, None, 'no prompt provided'
+            continue
+        yield index, request, None
+
+
+def run_batch(lines, handler, out, model_of, max_concurrency: int = 4, per_model: int = 2,
+              prompt_field: str = 'prompt', backlog: int = None) -> dict:
+    """Run every request in `lines` through `handler`, writing results to `out`.
+
+    `model_of(request)` names the model a request will use, for the per-model cap.
+    Parsed requests wait in per-model queues and are only handed to a worker once
+    their model has a free slot, so a run of requests for one busy model never
+    holds workers that requests for other models could use. At most `backlog`
+    (default 4 * max_concurrency) requests are queued before reading pauses.
+    Returns a summary `{'total', 'ok', 'failed'}`. If writing a result fails, no
+    further requests start and the error is raised once in-flight ones finish.
+    """
+    workers = max(1, max_concurrency)
+    per_model = max(1, per_model)
+    backlog = max(1, backlog or 4 * workers)
+    queues = {}    # model -> deque of (index, request), in input order
+    running = {}   # model -> requests in flight
+    state = {'queued': 0, 'inflight': 0}
+    errors = []
+    cond = threading.Condition()
+    out_lock = threading.Lock()
+    summary = {'total': 0, 'ok': 0, 'failed': 0}
+
+    def write(index, resp):
+        rec = {'index': index}
+        rec.update(resp)
+        line = json.dumps(rec, ensure_ascii=True) + '\n'
+        with out_lock:
+            out.write(line)
+            out.flush()
+            summary['total'] += 1
+            summary['ok' if resp.get('ok') else 'failed'] += 1
+
+    def dispatch(pool):
+        # caller holds `cond`; models are scanned in first-seen order
+        if errors:
+            return
+        for model, queue in queues.items():
+            if state['inflight'] >= workers:
+                return
+            while queue and running.get(model, 0) < per_model and state['inflight'] < workers:
+                index, request = queue.popleft()
+                running[model] = running.get(model, 0) + 1
+                state['queued'] -= 1
+                state['inflight'] += 1
+                pool.submit(work, pool, model, index, request)
+
+    def work(pool, model, index, request):
+        failure = None
+        try:
+            try:
+                resp = handler(request)
+            except Exception as e:
+                resp = {'error': f'{type(e).__name__}: {e}', 'ok': False}
+            write(index, resp)
+        except Exception as e:
+            # broken output or an unserializable response: stop dispatching, raise after in-flight work ends
+            failure = e
+        finally:
+            with cond:
+                if failure is not None:
+                    errors.append(failure)
+                running[model] -= 1
+                state['inflight'] -= 1
+                dispatch(pool)
+                cond.notify_all()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        try:
+            for index, request, error in iter_requests(lines, prompt_field):
+                if errors:
+                    break
+                if not error:
+                    try:
+                        model = model_of(request)
+                    except Exception as e:
+                        error = f'{type(e).__name__}: {e}'
+                if error:
+                    write(index, {'error': error, 'ok': False})
+                    continue
+                with cond:
+                    # blocks reading further input while the backlog is full
+                    while state['queued'] >= backlog and not errors:
+                        cond.wait()
+                    if errors:
+                        break
+                    queues.setdefault(model, deque()).append((index, request))
+                    state['queued'] += 1
+                    dispatch(pool)
+        except BaseException as e:
+            with cond:
+                errors.append(e)
+            raise
+        with cond:
+            while state['inflight'] or (state['queued'] and not errors):
+                cond.wait()
+    if errors:
+        raise errors[0]
+    return summary
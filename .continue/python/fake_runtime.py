@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""Stand-in for the local model runtime API, for load tests without a GPU.
+
+Serves ollama's `/api/generate`, `/api/chat`, `/api/tags` and `/api/version`
+with synthetic output and configurable behaviour:
+
+- `load_time`: seconds to "load" a model on its first request (concurrent
+  requests wait for the same load); an empty prompt only loads it and
+  `keep_alive: 0` unloads it, like the real preload/unload calls.
+- `first_token_delay`: seconds before the first token of each reply.
+- `tokens_per_second`: generation speed per request once started.
+- `error_rate`: fraction of requests answered with HTTP 500.
+- `parallel`: requests generating at once (like OLLAMA_NUM_PARALLEL); the
+  rest queue, so MaxParallel sizing sees realistic saturation.
+
+Usage: python fake_runtime.py --address 127.0.0.1:11434 --tokens-per-second 40 --first-token-delay 0.2
+Then run agent_runner with OLLAMA_API_URL=http://127.0.0.1:11434 RUN_OLLAMA_INTEGRATION=1.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeRuntime:
+    def __init__(self, load_time: float = 0.0, first_token_delay: float = 0.05, tokens_per_second: float = 50.0,
+                 error_rate: float = 0.0, parallel: int = 4, tokens: int = 32, seed: int = None, sleep=time.sleep):
+        self.load_time = load_time
+        self.first_token_delay = first_token_delay
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.tokens = tokens
+        self.sleep = sleep
+        self._slots = threading.BoundedSemaphore(max(1, parallel))
+        self._rnd = random.Random(seed)
+        self._lock = threading.Lock()
+        self._models = {}  # name -> Event set once loaded
+        self.stats = {'requests': 0, 'errors': 0, 'loads': 0, 'tokens': 0}
+
+    def ensure_loaded(self, model: str) -> float:
+        """Load `model` if needed; returns the seconds this call spent loading/waiting."""
+        with self._lock:
+            ready = self._models.get(model)
+            loader = ready is None
+            if loader:
+                ready = self._models[model] = threading.Event()
+                self.stats['loads'] += 1
+        t0 = time.monotonic()
+        if loader:
+            if self.load_time:
+                self.sleep(self.load_time)
+            ready.set()
+        else:
+            ready.wait()
+        return time.monotonic() - t0
+
+    def unload(self, model: str):
+        with self._lock:
+            self._models.pop(model, None)
+
+    def loaded(self):
+        with self._lock:
+            return sorted(m for m, ev in self._models.items() if ev.is_set())
+
+    def should_fail(self) -> bool:
+        with self._lock:
+            self.stats['requests'] += 1
+            fail = self.error_rate > 0 and self._rnd.random() < self.error_rate
+            if fail:
+                self.stats['errors'] += 1
+            return fail
+
+    def reply_tokens(self, prompt: str, limit: int = None):
+        words = prompt.split() or ['ok']
+        n = limit if limit is not None and limit >= 0 else self.tokens
+        return [('' if i == 0 else ' ') + words[i % len(words)] for i in range(n)]
+
+    def generate(self, tokens):
+        """Yield tokens at the configured pace while holding a generation slot."""
+        with self._slots:
+            if self.first_token_delay:
+                self.sleep(self.first_token_delay)
+            interval = 1.0 / self.tokens_per_second if self.tokens_per_second else 0
+            for i, tok in enumerate(tokens):
+                if i and interval:
+                    self.sleep(interval)
+                with self._lock:
+                    self.stats['tokens'] += 1
+                yield tok
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, fmt, *args):
+        if self.server.verbose:
+            super().log_message(fmt, *args)
+
+    def do_GET(self):
+        rt = self.server.runtime
+        if self.path == '/api/version':
+            return self._send_json(200, {'version': '0.0.0-fake'})
+        if self.path == '/api/tags':
+            return self._send_json(200, {'models': [{'name': m, 'model': m} for m in rt.loaded()]})
+        if self.path == '/api/stats':
+            return self._send_json(200, dict(rt.stats, loaded=rt.loaded()))
+        self._send_json(404, {'error': 'not found'})
+
+    def do_POST(self):
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)) or b'{}')
+        except ValueError:
+            return self._send_json(400, {'error': 'invalid json'})
+        if self.path not in ('/api/generate', '/api/chat'):
+            return self._send_json(404, {'error': 'not found'})
+        rt = self.server.runtime
+        model = body.get('model')
+        if not model:
+            return self._send_json(400, {'error': 'model is required'})
+        chat = self.path == '/api/chat'
+        if chat:
+            messages = body.get('messages') or []
+            prompt = ' '.join(m.get('content', '') for m in messages if m.get('role') == 'user')
+        else:
+            prompt = body.get('prompt', '')
+        t0 = time.monotonic()
+        if body.get('keep_alive') == 0 and not prompt:
+            rt.unload(model)
+            return self._send_json(200, self._final(model, chat, '', 0, 0, t0, done_reason='unload'))
+        if rt.should_fail():
+            return self._send_json(500, {'error': 'fake runtime: injected failure'})
+        load = rt.ensure_loaded(model)
+        if not prompt:
+            return self._send_json(200, self._final(model, chat, '', load, 0, t0, done_reason='load'))
+
+        tokens = rt.reply_tokens(prompt, (body.get('options') or {}).get('num_predict'))
+        if body.get('stream') is False:
+            text = ''.join(rt.generate(tokens))
+            return self._send_json(200, self._final(model, chat, text, load, len(tokens), t0))
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        try:
+            for tok in rt.generate(tokens):
+                rec = {'model': model, 'done': False}
+                if chat:
+                    rec['message'] = {'role': 'assistant', 'content': tok}
+                else:
+                    rec['response'] = tok
+                self._write_chunk(rec)
+            self._write_chunk(self._final(model, chat, '', load, len(tokens), t0))
+            self.wfile.write(b'0\r\n\r\n')
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # client stopped reading (e.g. --short): abandon the generation
+            self.close_connection = True
+
+    def _final(self, model, chat, text, load, count, t0, done_reason='stop'):
+        total = time.monotonic() - t0
+        rec = {'model': model, 'done': True, 'done_reason': done_reason,
+               'total_duration': int(total * 1e9), 'load_duration': int(load * 1e9),
+               'eval_count': count, 'eval_duration': int(max(0.0, total - load) * 1e9)}
+        if chat:
+            rec['message'] = {'role': 'assistant', 'content': text}
+        else:
+            rec['response'] = text
+        return rec
+
+    def _send_json(self, status, reply):
+        data = json.dumps(reply).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _write_chunk(self, rec):
+        data = (json.dumps(rec) + '\n').encode('utf-8')
+        self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+        self.wfile.flush()
+
+
+class FakeRuntimeServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, runtime: FakeRuntime, verbose: bool = False):
+        self.runtime = runtime
+        self.verbose = verbose
+        super().__init__(address, _Handler)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+
+def start_in_thread(runtime: FakeRuntime, host: str = '127.0.0.1', port: int = 0) -> FakeRuntimeServer:
+    """Start a server on a background thread (port 0 = any free port); call shutdown() to stop."""
+    srv = FakeRuntimeServer((host, port), runtime)
+    threading.Thread(target=srv.serve_forever, args=(0.05,), daemon=True).start()
+    return srv
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument('--address', default='127.0.0.1:11434', help='host:port to listen on')
+    p.add_argument('--load-time', type=float, default=0.0, help='Seconds to load a model on first use')
+    p.add_argument('--first-token-delay', type=float, default=0.05)
+    p.add_argument('--tokens-per-second', type=float, default=50.0)
+    p.add_argument('--tokens', type=int, default=32, help='Tokens per reply (options.num_predict overrides)')
+    p.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests failing with HTTP 500')
+    p.add_argument('--parallel', type=int, default=4, help='Requests generating concurrently')
+    p.add_argument('--seed', type=int, default=None)
+    p.add_argument('--verbose', action='store_true')
+    args = p.parse_args()
+
+    host, _, port = args.address.rpartition(':')
+    runtime = FakeRuntime(args.load_time, args.first_token_delay, args.tokens_per_second, args.error_rate,
+                          args.parallel, args.tokens, args.seed)
+    srv = FakeRuntimeServer((host or '127.0.0.1', int(port)), runtime, verbose=args.verbose)
+    print(json.dumps({'listening': srv.url}), flush=True)
+    try:
+        srv.serve_forever(0.5)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        srv.server_close()
+
+
+if __name__ == '__main__':
+    main()
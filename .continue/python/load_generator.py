@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""Open-loop load generator for agent_runner.
+
+Replays a JSONL request file (same records as `agent_runner.py --batch`) or a
+synthetic prompt mix at a target arrival rate and reports throughput, latency
+and time-to-first-token percentiles. Arrivals are scheduled at fixed times
+(`--rate` per second, optionally Poisson) and latency is measured from the
+scheduled arrival, so time spent queued behind `--concurrency` counts.
+
+Targets:
+- `inprocess` (default): run_prompt in this process over the HTTP backend.
+- `server`: a resident `agent_runner.py --serve` at `--address`.
+- `subprocess`: one `agent_runner.py --stream` process per request (includes startup).
+
+With `--fake`, a fake_runtime server is started in-process and used as the
+runtime, so the whole path runs on a machine without a GPU:
+
+    python load_generator.py --fake --model qwen2.5-coder:1.5b --synthetic 200 --rate 20 --concurrency 8
+    python load_generator.py --requests ../../requests.jsonl --prompt-field body --rate 5 --target server
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from batch_runner import iter_requests
+
+SCRIPT = Path(__file__).resolve().parent / 'agent_runner.py'
+SYNTHETIC_PROMPTS = [
+    ('short', 'Say hello'),
+    ('medium', 'Summarize the recent changes to the backlog controller and list open risks'),
+    ('long', ' '.join(['Review this diff and explain every change in detail.'] * 12)),
+]
+
+
+def percentile(values, q):
+    """Nearest-rank percentile (None for no values)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(q * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def synthetic_requests(n: int, seed: int = 1, mix=None):
+    """`n` requests drawn from the short/medium/long prompt mix (weights from `mix`)."""
+    rnd = random.Random(seed)
+    kinds = [k for k, _ in SYNTHETIC_PROMPTS]
+    weights = [(mix or {}).get(k, 1.0) for k in kinds]
+    prompts = dict(SYNTHETIC_PROMPTS)
+    for i in range(n):
+        kind = rnd.choices(kinds, weights)[0]
+        yield {'prompt': f'{prompts[kind]} #{i}', 'kind': kind}
+
+
+def file_requests(path: Path, prompt_field: str = 'prompt', limit: int = None):
+    with open(path, encoding='utf-8-sig') as f:
+        n = 0
+        for _, request, error in iter_requests(f, prompt_field):
+            if error:
+                continue
+            yield request
+            n += 1
+            if limit is not None and n >= limit:
+                return
+
+
+def make_target(kind: str, root: Path, model: str = None, address: str = None, timeout: float = 60.0):
+    """Return `call(request, on_first_token) -> envelope` for the chosen target."""
+    if kind == 'server':
+        from agent_server import send_request
+
+        def call(request, first):
+            req = dict(request, stream=True, timeout=timeout)
+            return send_request(address, req, timeout=timeout + 5, on_chunk=lambda rec: first())
+        return call
+
+    if kind == 'subprocess':
+        env = dict(os.environ, RUN_OLLAMA_INTEGRATION='1')
+
+        def call(request, first):
+            cmd = [sys.executable, str(SCRIPT), '--stream', '--backend', 'http', '--timeout', str(timeout),
+                   '-p', request['prompt']]
+            if request.get('agent'):
+                cmd += ['-a', request['agent']]
+            proc = subprocess.Popen(cmd, cwd=root, env=env, stdout=subprocess.PIPE, text=True, encoding='utf-8')
+            final = None
+            for line in proc.stdout:
+                rec = json.loads(line)
+                if rec.get('done') is False:
+                    first()
+                else:
+                    final = rec
+            proc.wait()
+            return final or {'ok': False, 'exitCode': proc.returncode}
+        return call
+
+    from agent_runner import make_handler, run_prompt
+
+    os.environ['RUN_OLLAMA_INTEGRATION'] = '1'
+    handler = make_handler(root, timeout=timeout, backend='http')
+
+    def call(request, first):
+        def emit(text):
+            first()
+            return True
+        if model:
+            selected = {'name': request.get('agent') or 'loadgen', 'options': {'model': model}}
+            return run_prompt(root, selected, request['prompt'], timeout=timeout, backend='http', emit=emit)
+        return handler(request, emit=emit)
+    return call
+
+
+def run_load(requests, call, rate: float, concurrency: int = 8, poisson: bool = False, seed: int = 1,
+             clock=time.perf_counter, sleep=time.sleep) -> dict:
+    """Issue `requests` at `rate` per second (0 = as fast as `concurrency` allows) and summarize."""
+    rnd = random.Random(seed)
+    samples = []
+    lock = threading.Lock()
+
+    def one(request, scheduled):
+        first = []
+
+        def on_first():
+            if not first:
+                first.append(clock())
+        try:
+            resp = call(request, on_first)
+            ok = bool(resp and resp.get('ok'))
+            echo = ok and str(resp.get('response', '')).startswith(f"[{resp.get('agent')}] Echo:")
+        except Exception as e:
+            ok, echo, resp = False, False, {'error': str(e)}
+        done = clock()
+        with lock:
+            samples.append({'latency': done - scheduled, 'ttft': (first[0] - scheduled) if first else None,
+                            'ok': ok, 'echo': echo, 'kind': request.get('kind')})
+
+    t0 = clock()
+    next_at = t0
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        window = threading.BoundedSemaphore(max(1, concurrency) if not rate else 10 ** 6)
+        for request in requests:
+            if rate:
+                delay = next_at - clock()
+                if delay > 0:
+                    sleep(delay)
+                scheduled = next_at
+                next_at += rnd.expovariate(rate) if poisson else 1.0 / rate
+            else:
+                window.acquire()
+                scheduled = clock()
+
+            def task(request=request, scheduled=scheduled):
+                try:
+                    one(request, scheduled)
+                finally:
+                    if not rate:
+                        window.release()
+            pool.submit(task)
+    wall = clock() - t0
+    return summarize(samples, wall, rate)
+
+
+def summarize(samples, wall: float, rate: float = 0) -> dict:
+    lat = [s['latency'] for s in samples]
+    ttft = [s['ttft'] for s in samples if s['ttft'] is not None]
+    ok = sum(1 for s in samples if s['ok'])
+
+    def pct(values):
+        return {f'p{int(q * 100)}': (round(percentile(values, q), 4) if values else None) for q in (0.5, 0.95, 0.99)}
+
+    return {
+        'requests': len(samples),
+        'ok': ok,
+        'errors': len(samples) - ok,
+        'echoFallbacks': sum(1 for s in samples if s['echo']),
+        'wallSeconds': round(wall, 3),
+        'targetRate': rate or None,
+        'throughput': round(ok / wall, 2) if wall else None,
+        'latency': dict(pct(lat), mean=round(sum(lat) / len(lat), 4) if lat else None),
+        'ttft': pct(ttft),
+    }
+
+
+def main():
+    p = argparse.ArgumentParser()
+    src = p.add_mutually_exclusive_group()
+    src.add_argument('--requests', help='JSONL request file to replay (agent_runner --batch format)')
+    src.add_argument('--synthetic', type=int, default=50, help='Number of synthetic requests (default source)')
+    p.add_argument('--mix', default='short=1,medium=1,long=1', help='Synthetic weights, e.g. short=3,long=1')
+    p.add_argument('--prompt-field', default='prompt')
+    p.add_argument('--limit', type=int, default=None, help='Replay at most this many file records')
+    p.add_argument('--rate', type=float, default=10.0, help='Arrivals per second (0 = closed loop at --concurrency)')
+    p.add_argument('--poisson', action='store_true', help='Exponential inter-arrival times instead of fixed spacing')
+    p.add_argument('--concurrency', type=int, default=8, help='Requests in flight at most')
+    p.add_argument('--target', choices=['inprocess', 'server', 'subprocess'], default='inprocess')
+    p.add_argument('--address', default=os.environ.get('AGENT_RUNNER_ADDRESS', '127.0.0.1:8765'))
+    p.add_argument('--model', help='inprocess: run every request on this model instead of the agent config')
+    p.add_argument('--timeout', type=float, default=60.0)
+    p.add_argument('--root', default='.', help='Workspace root holding .continue/config.agent')
+    p.add_argument('--fake', action='store_true', help='Start a fake runtime in-process and point OLLAMA_API_URL at it')
+    p.add_argument('--fake-load-time', type=float, default=0.5)
+    p.add_argument('--fake-first-token-delay', type=float, default=0.1)
+    p.add_argument('--fake-tokens-per-second', type=float, default=50.0)
+    p.add_argument('--fake-error-rate', type=float, default=0.0)
+    p.add_argument('--fake-parallel', type=int, default=4)
+    p.add_argument('--output', help='Also write the JSON report here')
+    args = p.parse_args()
+
+    srv = None
+    if args.fake:
+        from fake_runtime import FakeRuntime, start_in_thread
+        srv = start_in_thread(FakeRuntime(args.fake_load_time, args.fake_first_token_delay,
+                                          args.fake_tokens_per_second, args.fake_error_rate, args.fake_parallel))
+        os.environ['OLLAMA_API_URL'] = srv.url
+        os.environ.pop('OLLAMA_DISABLED', None)
+
+    if args.requests:
+        requests = file_requests(Path(args.requests), args.prompt_field, args.limit)
+    else:
+        mix = {k: float(v) for k, _, v in (part.partition('=') for part in args.mix.split(',') if part)}
+        requests = synthetic_requests(args.synthetic, mix=mix)
+    call = make_target(args.target, Path(args.root).resolve(), args.model, args.address, args.timeout)
+    report = run_load(requests, call, args.rate, args.concurrency, args.poisson)
+    report['target'] = args.target
+    if srv is not None:
+        report['fakeRuntime'] = dict(srv.runtime.stats)
+        srv.shutdown()
+        srv.server_close()
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        Path(args.output).write_text(text, encoding='utf-8')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,417 @@
+#!/usr/bin/env python3
+"""Warm pool of resident models on one shared runtime.
+
+Keeps several models loaded at once in a single `ollama serve`, tracking per
+model whether it was warmed and when it was last used in
+`.continue/model-pool.json` (plus the PID of the runtime, when the pool
+started it). Models named in `agents-epic.json` can be preloaded before
+traffic arrives, and models idle for longer than their keep-alive are unloaded
+by `reap` (or continuously by `watch`).
+
+`start` reuses a runtime that already answers `/api/version`, otherwise
+launches one and waits (up to `--ready-timeout` seconds) for it to answer,
+then warms the model with an empty `/api/generate` carrying the keep-alive
+(ollama's preload), so the first real prompt does not pay the cold load.
+`stop` and `reap` unload models with `keep_alive: 0`; `shutdown` also stops a
+runtime the pool started.
+
+    python .continue/python/model_pool.py preload --mapping .continue/agents-epic.json --keep-alive 900
+    python .continue/python/model_pool.py touch qwen2.5-coder:1.5b
+    python .continue/python/model_pool.py watch --interval 30
+    python .continue/python/model_pool.py status
+
+Every read-modify-write of the state file holds `model-pool.json.lock`, so
+runners touching models in parallel and a concurrent `reap`/`stop` do not
+lose or resurrect entries.
+"""
+import argparse
+import contextlib
+import json
+import os
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+from ollama_client import OllamaClient, find_api_url
+from start_model import serve_command
+from stop_model import pid_alive, stop_pid
+
+DEFAULT_STATE = Path('.continue') / 'model-pool.json'
+DEFAULT_KEEP_ALIVE = 600.0
+DEFAULT_READY_TIMEOUT = 30.0
+# touches refresh lastUsed at this fraction of the keep-alive: a model may be reaped up to 1/10 early
+TOUCH_RESOLUTION = 10
+
+
+def atomic_write(path: Path, data: str):
+    # unique temp name: concurrent writers must not replace each other's temp file
+    fd, tmp = tempfile.mkstemp(dir=str(path.parent), prefix=path.name + '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp)
+        raise
+
+
+@contextlib.contextmanager
+def file_lock(path: Path):
+    """Exclusive advisory lock on `path` (created if missing), across processes.
+
+    Same helper as the backlog store's JSON backend (services/backlog/storage.py);
+    repeated here because these scripts run without the repository on sys.path.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'a+b') as fh:
+        if os.name == 'nt':
+            import msvcrt
+
+            fh.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(fh.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    time.sleep(0.05)
+            try:
+                yield
+            finally:
+                fh.seek(0)
+                msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+
+
+def models_from_mapping(path: Path):
+    """Unique model names from an agents-epic style mapping, in file order."""
+    if not path.exists():
+        return []
+    data = json.loads(path.read_text(encoding='utf-8-sig'))
+    agents = data.get('agents', []) if isinstance(data, dict) else data
+    seen = []
+    for a in agents:
+        model = a.get('model') or a.get('options', {}).get('model')
+        if model and model != 'none' and model not in seen:
+            seen.append(model)
+    return seen
+
+
+class ModelPool:
+    def __init__(self, state_path: Path = DEFAULT_STATE, runtime: str = 'ollama', api_url: str = None,
+                 launcher=None, clock=time.time, ready_timeout: float = DEFAULT_READY_TIMEOUT,
+                 ready_poll: float = 0.2):
+        self.state_path = Path(state_path)
+        self.lock_path = self.state_path.with_name(self.state_path.name + '.lock')
+        self.runtime = runtime
+        self.api_url = api_url
+        self.launcher = launcher or (lambda: serve_command(self.runtime))
+        self.clock = clock
+        self.ready_timeout = ready_timeout
+        self.ready_poll = ready_poll
+        self._fresh_until = {}  # model -> clock value before which touch() skips the file
+
+    def _load_state(self) -> dict:
+        try:
+            state = json.loads(self.state_path.read_text(encoding='utf-8-sig'))
+        except Exception:
+            return {'models': {}}
+        if not isinstance(state, dict) or not isinstance(state.get('models'), dict):
+            return {'models': {}}
+        return state
+
+    def _load(self) -> dict:
+        return self._load_state()['models']
+
+    def _save(self, state: dict):
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write(self.state_path, json.dumps(state, indent=2))
+
+    @contextlib.contextmanager
+    def _update(self):
+        """Yield the state dict (`runtime`, `models`) under the state lock; saved on exit if it changed."""
+        with file_lock(self.lock_path):
+            state = self._load_state()
+            before = json.dumps(state, sort_keys=True)
+            yield state
+            if json.dumps(state, sort_keys=True) != before:
+                self._save(state)
+
+    def _take(self, model: str, predicate=None):
+        """Remove and return `model`'s entry if it exists (and satisfies `predicate`)."""
+        with self._update() as state:
+            entry = state['models'].get(model)
+            if entry is None or (predicate is not None and not predicate(entry)):
+                return None
+            return state['models'].pop(model)
+
+    def _api(self, body: dict):
+        """Best-effort call to the runtime API; False when it is not reachable."""
+        if not self.api_url:
+            return False
+        try:
+            with contextlib.closing(OllamaClient(self.api_url, timeout=120)) as client:
+                client.request('POST', '/api/generate', body)
+            return True
+        except Exception:
+            return False
+
+    def _answers(self) -> bool:
+        """True when the runtime API responds to `/api/version`."""
+        if not self.api_url:
+            return False
+        try:
+            with contextlib.closing(OllamaClient(self.api_url, timeout=max(self.ready_poll, 1.0))) as client:
+                client.request('GET', '/api/version')
+            return True
+        except Exception:
+            return False
+
+    def _runtime_up(self, state: dict) -> bool:
+        """The runtime can take requests (by PID alone when the API is disabled)."""
+        if self.api_url:
+            return self._answers()
+        return pid_alive((state.get('runtime') or {}).get('pid'))
+
+    def _runtime_alive(self, state: dict) -> bool:
+        """The runtime answers, or the one the pool launched is still starting."""
+        return pid_alive((state.get('runtime') or {}).get('pid')) or self._runtime_up(state)
+
+    def _wait_ready(self, alive) -> bool:
+        """Poll the runtime API until it answers; False if `alive()` turns false or ready_timeout passes."""
+        if not self.api_url:
+            return False
+        deadline = time.monotonic() + self.ready_timeout
+        while alive():
+            if self._answers():
+                # still ours: a runtime that failed to bind (port taken) has exited by now
+                return alive()
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(self.ready_poll)
+        return False
+
+    def _launch(self, state: dict, dry_run: bool):
+        """Start the shared runtime unless one is already starting; returns (alive, error entry)."""
+        runtime = state.get('runtime') or {}
+        pid = runtime.get('pid')
+        if pid_alive(pid):
+            return (lambda: pid_alive(pid)), None
+        cmd = self.launcher()
+        if not cmd:
+            return None, {'action': 'unsupported-runtime', 'runtime': self.runtime}
+        if dry_run:
+            return None, {'action': 'dry-run', 'command': cmd}
+        try:
+            proc = subprocess.Popen(cmd)
+        except OSError as e:
+            return None, {'action': 'error', 'runtime': self.runtime, 'error': f'{type(e).__name__}: {e}'}
+        state['runtime'] = {'pid': proc.pid, 'runtime': self.runtime, 'started': self.clock()}
+        return (lambda: proc.poll() is None), None
+
+    def start(self, model: str, keep_alive: float = DEFAULT_KEEP_ALIVE, dry_run: bool = False) -> dict:
+        # probed before taking the lock: the request can take up to a second
+        up = self._runtime_up(self._load_state())
+        with self._update() as state:
+            models = state['models']
+            now = self.clock()
+            entry = models.get(model)
+            if up and entry and (entry.get('warmed') or not self.api_url):
+                entry['lastUsed'] = now
+                entry['keepAliveSeconds'] = keep_alive
+                return dict(entry, model=model, action='already-running')
+            alive = None
+            if not up:
+                alive, error = self._launch(state, dry_run)
+                if error:
+                    return dict(error, model=model)
+            if dry_run:
+                return {'model': model, 'action': 'dry-run', 'command': None}
+            entry = {'runtime': self.runtime, 'started': now, 'lastUsed': now,
+                     'keepAliveSeconds': keep_alive, 'warmed': False}
+            models[model] = entry
+        # warm outside the lock: a cold load can take minutes and runners touch the file meanwhile
+        ready = up or self._wait_ready(alive)
+        warmed = ready and self._api({'model': model, 'prompt': '', 'keep_alive': f'{int(keep_alive)}s'})
+        if warmed:
+            with self._update() as state:
+                current = state['models'].get(model)
+                if current and current.get('started') == entry['started']:
+                    current['warmed'] = True
+        return dict(entry, model=model, action='started', warmed=warmed)
+
+    def preload(self, model_names, keep_alive: float = DEFAULT_KEEP_ALIVE, dry_run: bool = False):
+        return [self.start(m, keep_alive, dry_run) for m in model_names]
+
+    def touch(self, model: str, force: bool = False) -> bool:
+        """Record a use of `model`, pushing back its idle unload.
+
+        The state file is only rewritten once the stored last use is older than
+        keep-alive / TOUCH_RESOLUTION, and this instance remembers when that
+        will be, so back-to-back requests neither lock nor read the file.
+        """
+        now = self.clock()
+        if not force and now < self._fresh_until.get(model, float('-inf')):
+            return True
+        if not self.state_path.exists():
+            return False
+        # unlocked read: atomic_write never exposes a partial file
+        entry = self._load().get(model)
+        if entry is None:
+            return False
+        interval = entry.get('keepAliveSeconds', DEFAULT_KEEP_ALIVE) / TOUCH_RESOLUTION
+        last = entry.get('lastUsed', 0)
+        if force or now - last >= interval:
+            with self._update() as state:
+                if model not in state['models']:
+                    return False
+                state['models'][model]['lastUsed'] = last = now
+        self._fresh_until[model] = last + interval
+        return True
+
+    def _unload(self, model: str, entry: dict) -> dict:
+        # the entry is already out of the state file, so a racing touch cannot bring it back
+        self._api({'model': model, 'keep_alive': 0})
+        return dict(entry, model=model, action='stopped')
+
+    def stop(self, model: str, dry_run: bool = False) -> dict:
+        if dry_run:
+            entry = self._load().get(model)
+            return dict(entry, model=model, action='dry-run-stop') if entry else {'model': model, 'action': 'not-found'}
+        entry = self._take(model)
+        self._fresh_until.pop(model, None)
+        if not entry:
+            return {'model': model, 'action': 'not-found'}
+        return self._unload(model, entry)
+
+    def shutdown(self, dry_run: bool = False) -> dict:
+        """Unload every pooled model and stop the runtime if this pool started it."""
+        state = self._load_state()
+        pid = (state.get('runtime') or {}).get('pid')
+        if dry_run:
+            return {'models': sorted(state['models']), 'runtimePid': pid, 'action': 'dry-run-shutdown'}
+        stopped = [self.stop(m)['model'] for m in sorted(state['models'])]
+        with self._update() as state:
+            runtime = state.pop('runtime', None) or {}
+        if pid_alive(runtime.get('pid')):
+            stop_pid(runtime['pid'])
+        return {'models': stopped, 'runtimePid': runtime.get('pid'), 'action': 'shutdown'}
+
+    def reap(self, dry_run: bool = False):
+        """Unload models idle past their keep-alive; forget every model once the runtime is gone."""
+        now = self.clock()
+        state = self._load_state()
+
+        def idle(entry):
+            return now - entry.get('lastUsed', 0) > entry.get('keepAliveSeconds', DEFAULT_KEEP_ALIVE)
+
+        if not state['models']:
+            return []
+        up = self._runtime_alive(state)
+        out = []
+        for model, entry in state['models'].items():
+            if not up:
+                rec = self._forget(model, 'exited')
+            elif not idle(entry):
+                continue
+            elif dry_run:
+                rec = dict(entry, model=model, action='dry-run-stop')
+            else:
+                # re-checked under the lock: a touch since the snapshot keeps the model
+                taken = self._take(model, idle)
+                rec = self._unload(model, taken) if taken else None
+            if rec:
+                out.append(rec)
+        return out
+
+    def _forget(self, model: str, action: str):
+        # re-probed under the lock so a runtime restarted meanwhile keeps its models
+        with self._update() as state:
+            if model not in state['models'] or self._runtime_alive(state):
+                return None
+            state.pop('runtime', None)
+            return dict(state['models'].pop(model), model=model, action=action)
+
+    def status(self) -> dict:
+        now = self.clock()
+        state = self._load_state()
+        up = self._runtime_alive(state)
+        runtime = dict(state.get('runtime') or {}, up=up)
+        models = []
+        for model, entry in sorted(state['models'].items()):
+            models.append(dict(entry, model=model, alive=up,
+                               idleSeconds=round(now - entry.get('lastUsed', now), 1)))
+        return {'ts': now, 'runtime': runtime, 'models': models}
+
+
+_pools = {}
+
+
+def touch_model(root: Path, model: str):
+    """Called by agent_runner after a runtime call; no-op unless a pool is active."""
+    state = root / DEFAULT_STATE
+    pool = _pools.get(state)
+    if pool is None:
+        if not state.exists():
+            return
+        pool = _pools.setdefault(state, ModelPool(state))
+    try:
+        pool.touch(model)
+    except Exception:
+        pass
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument('command', choices=['preload', 'start', 'stop', 'touch', 'reap', 'watch', 'status', 'shutdown'])
+    p.add_argument('models', nargs='*', help='Model names (start/stop/touch; preload adds them to --mapping models)')
+    p.add_argument('--mapping', default='.continue/agents-epic.json', help='Agents mapping used by preload')
+    p.add_argument('--state', default=str(DEFAULT_STATE))
+    p.add_argument('--runtime', choices=['ollama', 'docker'], default='ollama')
+    p.add_argument('--keep-alive', type=float, default=DEFAULT_KEEP_ALIVE, help='Idle seconds before a model is unloaded')
+    p.add_argument('--interval', type=float, default=30.0, help='watch: seconds between reaps')
+    p.add_argument('--no-api', action='store_true', help='Do not warm/unload models through the runtime API')
+    p.add_argument('--ready-timeout', type=float, default=DEFAULT_READY_TIMEOUT,
+                   help='Seconds to wait for a started runtime to answer before warming the model')
+    p.add_argument('--dry-run', action='store_true')
+    args = p.parse_args()
+
+    api_url = None if args.no_api else find_api_url(Path.cwd())
+    pool = ModelPool(Path(args.state), runtime=args.runtime, api_url=api_url, ready_timeout=args.ready_timeout)
+
+    if args.command == 'preload':
+        out = pool.preload(models_from_mapping(Path(args.mapping)) + args.models, args.keep_alive, args.dry_run)
+    elif args.command == 'start':
+        out = pool.preload(args.models, args.keep_alive, args.dry_run)
+    elif args.command == 'stop':
+        out = [pool.stop(m, args.dry_run) for m in args.models]
+    elif args.command == 'touch':
+        out = {m: pool.touch(m, force=True) for m in args.models}
+    elif args.command == 'shutdown':
+        out = pool.shutdown(args.dry_run)
+    elif args.command == 'reap':
+        out = pool.reap(args.dry_run)
+    elif args.command == 'watch':
+        try:
+            while True:
+                for rec in pool.reap(args.dry_run):
+                    print(json.dumps(rec), flush=True)
+                time.sleep(args.interval)
+        except KeyboardInterrupt:
+            print('stopped')
+        return
+    else:
+        out = pool.status()
+    print(json.dumps(out))
+
+
+if __name__ == '__main__':
+    main()
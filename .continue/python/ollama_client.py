@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""Keep-alive HTTP client for the local ollama runtime API.
+
+Used by `agent_runner.py` instead of spawning `ollama run` per prompt. One
+`OllamaClient` keeps a small pool of persistent HTTP/1.1 connections so that
+repeated calls (daemon, batch mode) skip TCP setup and CLI startup entirely.
+Only the standard library is used.
+"""
+import http.client
+import json
+import os
+import queue
+import threading
+from pathlib import Path
+from urllib.parse import urlsplit
+
+DEFAULT_API_URL = 'http://localhost:11434'
+
+# errors raised when a pooled keep-alive connection was closed by the server
+STALE_ERRORS = (http.client.RemoteDisconnected, http.client.CannotSendRequest,
+                http.client.BadStatusLine, BrokenPipeError, ConnectionResetError)
+
+
+class OllamaHTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(f'ollama api error {status}: {message}')
+        self.status = status
+        self.message = message
+
+
+def find_api_url(root: Path) -> str:
+    """Resolve the runtime API url.
+
+    Order: OLLAMA_API_URL env, OLLAMA_HOST env (ollama's own variable, may omit
+    the scheme), `.private/config.json` then `config.template.json` `ollama.api_url`.
+    """
+    env_url = os.environ.get('OLLAMA_API_URL')
+    if env_url:
+        return env_url.rstrip('/')
+    host = os.environ.get('OLLAMA_HOST')
+    if host:
+        if '://' not in host:
+            host = 'http://' + host
+        return host.rstrip('/')
+    for rel in (Path('.private') / 'config.json', Path('config.template.json')):
+        cfg = root / rel
+        if not cfg.exists():
+            continue
+        try:
+            url = json.loads(cfg.read_text(encoding='utf-8-sig')).get('ollama', {}).get('api_url')
+        except Exception:
+            url = None
+        if url:
+            return url.rstrip('/')
+    return DEFAULT_API_URL
+
+
+def _error_text(text: str) -> str:
+    try:
+        return json.loads(text).get('error', text)
+    except Exception:
+        return text
+
+
+class OllamaClient:
+    def __init__(self, api_url: str = DEFAULT_API_URL, timeout: float = 10.0, pool_size: int = 4):
+        parts = urlsplit(api_url if '://' in api_url else 'http://' + api_url)
+        self.api_url = api_url
+        self.scheme = parts.scheme or 'http'
+        self.host = parts.hostname or 'localhost'
+        self.port = parts.port or (443 if self.scheme == 'https' else 11434)
+        self.base_path = parts.path.rstrip('/')
+        self.timeout = timeout
+        self.pool_size = max(1, pool_size)
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self.connections_opened = 0
+
+    def _new_connection(self, timeout: float):
+        cls = http.client.HTTPSConnection if self.scheme == 'https' else http.client.HTTPConnection
+        with self._lock:
+            self.connections_opened += 1
+        return cls(self.host, self.port, timeout=timeout)
+
+    def _acquire(self, timeout: float):
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            return self._new_connection(timeout), False
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+        return conn, True
+
+    def _release(self, conn):
+        if self._idle.qsize() >= self.pool_size:
+            conn.close()
+            return
+        self._idle.put(conn)
+
+    def _send(self, conn, method: str, path: str, body):
+        headers = {'Connection': 'keep-alive'}
+        data = None
+        if body is not None:
+            data = json.dumps(body).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        conn.request(method, self.base_path + path, body=data, headers=headers)
+        return conn.getresponse()
+
+    def open(self, method: str, path: str, body=None, timeout: float = None):
+        """Send a request and return `(conn, response)` with the body unread.
+
+        The caller must read the response fully and then hand `conn` back via
+        `finish()`. A pooled connection that the server already closed is
+        retried once on a fresh one.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        conn, reused = self._acquire(timeout)
+        try:
+            return conn, self._send(conn, method, path, body)
+        except STALE_ERRORS:
+            conn.close()
+            if not reused:
+                raise
+        conn = self._new_connection(timeout)
+        try:
+            return conn, self._send(conn, method, path, body)
+        except Exception:
+            conn.close()
+            raise
+
+    def finish(self, conn, resp, reusable: bool = True):
+        if reusable and not resp.will_close:
+            self._release(conn)
+        else:
+            conn.close()
+
+    def request(self, method: str, path: str, body=None, timeout: float = None) -> dict:
+        conn, resp = self.open(method, path, body, timeout)
+        try:
+            payload = resp.read()
+        except Exception:
+            conn.close()
+            raise
+        self.finish(conn, resp)
+        text = payload.decode('utf-8', errors='replace')
+        if resp.status >= 400:
+            raise OllamaHTTPError(resp.status, _error_text(text))
+        return json.loads(text) if text else {}
+
+    def stream(self, method: str, path: str, body=None, timeout: float = None):
+        """Yield the NDJSON records of a streamed reply as they arrive.
+
+        Stopping iteration early (generator closed) drops the connection so the
+        runtime aborts the generation; a fully read stream is returned to the pool.
+        """
+        conn, resp = self.open(method, path, body, timeout)
+        if resp.status >= 400:
+            text = resp.read().decode('utf-8', errors='replace')
+            self.finish(conn, resp)
+            raise OllamaHTTPError(resp.status, _error_text(text))
+        complete = False
+        try:
+            for line in resp:
+                line = line.strip()
+                if not line:
+                    continue
+                rec = json.loads(line)
+                if rec.get('done'):
+                    complete = True
+                yield rec
+                if complete:
+                    break
+        finally:
+            if complete:
+                resp.read()
+                self.finish(conn, resp)
+            else:
+                conn.close()
+
+    def generate(self, model: str, prompt: str, options: dict = None, timeout: float = None) -> dict:
+        body = {'model': model, 'prompt': prompt, 'stream': False}
+        if options:
+            body['options'] = options
+        return self.request('POST', '/api/generate', body, timeout)
+
+    def generate_stream(self, model: str, prompt: str, options: dict = None, timeout: float = None):
+        body = {'model': model, 'prompt': prompt, 'stream': True}
+        if options:
+            body['options'] = options
+        return self.stream('POST', '/api/generate', body, timeout)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(api_url: str, timeout: float = 10.0) -> OllamaClient:
+    """Return a process-wide shared client (and connection pool) for `api_url`."""
+    with _clients_lock:
+        client = _clients.get(api_url)
+        if client is None:
+            client = OllamaClient(api_url, timeout=timeout)
+            _clients[api_url] = client
+        return client
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""Incremental sanitizer for terminal output from `ollama run`.
+
+Strips ANSI CSI sequences, braille spinner glyphs and non-printable
+characters (keeping tab and newline) with the same result as the original
+three-pass `remove_ansi`, but in one regex pass: CSI sequences, C0/C1
+controls and braille glyphs share one compiled pattern. The per-character
+`isprintable()` check only runs when the cleaned text still contains other
+non-printable characters (rare in model output), and then only on its
+non-ASCII runs.
+
+`OutputSanitizer.feed(chunk)` works on chunks as they arrive from a pipe: an
+escape sequence split across chunks is held back until it is complete.
+
+Usage: python output_sanitizer.py --bench [--mb 4]
+"""
+import argparse
+import re
+import time
+
+# Same CSI grammar as the original ANSI_RE, plus controls and braille in one alternation.
+# A lone ESC is matched on its own so a run of controls never swallows the ESC of
+# a following CSI sequence.
+NOISE_RE = re.compile(r'\x1b\[[0-9;?]*[ -/]*[@-~]|[\x00-\x08\x0b-\x1a\x1c-\x1f\x7f-\x9f\u2800-\u28FF]+|\x1b')
+NON_ASCII_RE = re.compile(r'[^\x00-\x7f]+')
+# tail of a chunk that may be the start of a CSI sequence
+PARTIAL_CSI_RE = re.compile(r'\x1b(?:\[[0-9;?]*[ -/]*)?\Z')
+MAX_PENDING = 64
+
+
+def _printable_run(m) -> str:
+    run = m.group()
+    if run.isprintable():
+        return run
+    return ''.join(ch for ch in run if ch.isprintable())
+
+
+def sanitize(s: str) -> str:
+    """Clean a complete piece of text (no final strip)."""
+    if not s:
+        return s
+    s = NOISE_RE.sub('', s)
+    # tab/newline are the only non-printables left in ASCII text; both are kept
+    if not s.isascii() and not s.replace('\n', '').replace('\t', '').isprintable():
+        s = NON_ASCII_RE.sub(_printable_run, s)
+    return s
+
+
+class OutputSanitizer:
+    """Stateful sanitizer: `feed()` chunks, then `flush()` the held-back tail."""
+
+    def __init__(self):
+        self._pending = ''
+
+    def feed(self, chunk: str) -> str:
+        if self._pending:
+            chunk = self._pending + chunk
+            self._pending = ''
+        if not chunk:
+            return ''
+        esc = chunk.rfind('\x1b', max(0, len(chunk) - MAX_PENDING))
+        if esc >= 0 and PARTIAL_CSI_RE.match(chunk, esc):
+            chunk, self._pending = chunk[:esc], chunk[esc:]
+        return sanitize(chunk)
+
+    def flush(self) -> str:
+        rest, self._pending = self._pending, ''
+        return sanitize(rest)
+
+
+def legacy_remove_ansi(s: str) -> str:
+    """The original three-pass implementation, kept as the benchmark/test reference."""
+    if not s:
+        return s
+    s = re.sub(r'\x1b\[[0-9;?]*[ -/]*[@-~]', '', s)
+    s = re.sub(r'[\u2800-\u28FF]', '', s)
+    s = ''.join(ch for ch in s if ch.isprintable() or ch in '\t\n')
+    return s.strip()
+
+
+def spinner_output(size: int) -> str:
+    """Synthetic `ollama run` output: one answer line every few spinner frames."""
+    frames = '\u280b\u2819\u2839\u2838\u283c\u2834\u2826\u2827\u2807\u280f'
+    parts, n, i = [], 0, 0
+    while n < size:
+        if i % 4:
+            piece = f'\x1b[?25l\x1b[?2026h\x1b[?25l\x1b[1G{frames[i % 10]} \x1b[K\x1b[?25h\x1b[?2026l'
+        else:
+            piece = f'token {i} of the generated answer, caf\u00e9 \u2713\n'
+        parts.append(piece)
+        n += len(piece)
+        i += 1
+    return ''.join(parts)
+
+
+def text_output(size: int) -> str:
+    """A long generation with only occasional colour codes."""
+    line = 'The quick brown fox jumps over the lazy dog; r\u00e9sum\u00e9 \u2713 \x1b[32mok\x1b[0m\n'
+    return line * (size // len(line) + 1)
+
+
+def benchmark(mb: float = 4.0, chunk: int = 4096, repeat: int = 3) -> dict:
+    """Seconds for the original remove_ansi vs sanitize() and chunked OutputSanitizer, per profile."""
+
+    def best(fn):
+        times = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - t0)
+        return min(times)
+
+    def streamed(text):
+        s = OutputSanitizer()
+        out = [s.feed(text[i:i + chunk]) for i in range(0, len(text), chunk)]
+        out.append(s.flush())
+        return ''.join(out).strip()
+
+    results = {}
+    for name, make in (('spinner', spinner_output), ('text', text_output)):
+        text = make(int(mb * 1024 * 1024))
+        assert streamed(text) == legacy_remove_ansi(text) == sanitize(text).strip()
+        legacy = best(lambda: legacy_remove_ansi(text))
+        single = best(lambda: sanitize(text).strip())
+        results[name] = {'inputMB': round(len(text) / 1048576, 2), 'legacySeconds': round(legacy, 4),
+                         'singlePassSeconds': round(single, 4), 'streamedSeconds': round(best(lambda: streamed(text)), 4),
+                         'speedup': round(legacy / single, 1) if single else None}
+    return results
+
+
+if __name__ == '__main__':
+    p = argparse.ArgumentParser()
+    p.add_argument('--bench', action='store_true', help='Compare against the original remove_ansi')
+    p.add_argument('--mb', type=float, default=4.0)
+    p.add_argument('--chunk', type=int, default=4096)
+    args = p.parse_args()
+    if args.bench:
+        import json
+        print(json.dumps(benchmark(args.mb, args.chunk)))
+    else:
+        import sys
+        s = OutputSanitizer()
+        for block in iter(lambda: sys.stdin.read(4096), ''):
+            sys.stdout.write(s.feed(block))
+        sys.stdout.write(s.flush())
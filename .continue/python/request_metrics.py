@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""Opt-in per-request latency breakdown for `agent_runner.py`.
+
+`Timings` collects monotonic phase durations for one request (imports,
+config, cache lookup, process spawn, model load, first token, generation,
+total). `agent_runner.py --timings` adds them to the envelope as `timings`;
+`--metrics` appends one JSONL record per request (agent, model, backend,
+outcome, timings) to `.continue/metrics/agent-runner.jsonl` with a single
+O_APPEND write, so parallel runners can share the file.
+
+    python .continue/python/request_metrics.py summary --by agent,model
+    python .continue/python/request_metrics.py summary --by model --phase firstToken --since-hours 24
+"""
+import argparse
+import json
+import os
+import time
+from pathlib import Path
+
+DEFAULT_METRICS_PATH = Path('.continue') / 'metrics' / 'agent-runner.jsonl'
+PHASES = ('imports', 'config', 'cache', 'spawn', 'modelLoad', 'firstToken', 'generation', 'runtime', 'total')
+# histogram upper bounds in seconds (the last bucket is open)
+BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class Timings:
+    """Phase durations for one request, measured from `origin` (a time.monotonic() value)."""
+
+    def __init__(self, origin: float = None, clock=time.monotonic):
+        self.clock = clock
+        self.origin = clock() if origin is None else origin
+        self.phases = {}
+        self.backend = None  # what answered: http, cli, cache, echo or noop
+        self._first_token = None
+
+    def add(self, phase: str, seconds: float):
+        self.phases[phase] = self.phases.get(phase, 0.0) + max(0.0, seconds)
+
+    def since(self, start: float, phase: str):
+        """Record `clock() - start` under `phase` and return the current clock."""
+        now = self.clock()
+        self.add(phase, now - start)
+        return now
+
+    def first_token(self):
+        """Mark the first generated token (only the first call counts)."""
+        if self._first_token is None:
+            self._first_token = self.clock()
+            self.phases['firstToken'] = self._first_token - self.origin
+
+    def finish_generation(self, end: float = None):
+        end = self.clock() if end is None else end
+        if self._first_token is not None:
+            self.phases['generation'] = end - self._first_token
+
+    def as_dict(self) -> dict:
+        out = {k: round(v, 6) for k, v in self.phases.items()}
+        out['total'] = round(self.clock() - self.origin, 6)
+        return out
+
+
+class MetricsSink:
+    def __init__(self, path: Path = DEFAULT_METRICS_PATH):
+        self.path = Path(path)
+
+    def append(self, record: dict):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        line = (json.dumps(record, ensure_ascii=True, separators=(',', ':')) + '\n').encode('utf-8')
+        fd = os.open(str(self.path), os.O_WRONLY | os.O_CREAT | os.O_APPEND | getattr(os, 'O_BINARY', 0), 0o644)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+
+    def records(self, since: float = None):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        continue
+                    if since is None or rec.get('ts', 0) >= since:
+                        yield rec
+        except FileNotFoundError:
+            return
+
+
+def request_record(envelope: dict, model: str = None, backend: str = None) -> dict:
+    return {
+        'ts': time.time(),
+        'agent': envelope.get('agent'),
+        'model': model,
+        'backend': backend,
+        'ok': envelope.get('ok'),
+        'exitCode': envelope.get('exitCode'),
+        'cached': bool(envelope.get('cached')),
+        'timings': envelope.get('timings') or {},
+    }
+
+
+def _percentile(ordered, q):
+    if not ordered:
+        return None
+    return ordered[max(0, min(len(ordered) - 1, int(round(q * len(ordered) + 0.5)) - 1))]
+
+
+def histogram(values):
+    counts = [0] * (len(BUCKETS) + 1)
+    for v in values:
+        i = 0
+        while i < len(BUCKETS) and v > BUCKETS[i]:
+            i += 1
+        counts[i] += 1
+    labels = [f'<={b}' for b in BUCKETS] + [f'>{BUCKETS[-1]}']
+    return {label: n for label, n in zip(labels, counts) if n}
+
+
+def aggregate(records, by=('agent', 'model'), phases=PHASES) -> dict:
+    """Per group (fields in `by` joined with '/'): count, errors, and per phase
+    count/mean/p50/p95/p99 and a seconds histogram."""
+    groups = {}
+    for rec in records:
+        key = '/'.join(str(rec.get(f)) for f in by)
+        g = groups.setdefault(key, {'count': 0, 'errors': 0, 'cached': 0, 'values': {}})
+        g['count'] += 1
+        g['errors'] += 0 if rec.get('ok') else 1
+        g['cached'] += 1 if rec.get('cached') else 0
+        for phase, v in (rec.get('timings') or {}).items():
+            if phase in phases and isinstance(v, (int, float)):
+                g['values'].setdefault(phase, []).append(float(v))
+    out = {}
+    for key, g in sorted(groups.items()):
+        stats = {}
+        for phase in phases:
+            values = sorted(g['values'].get(phase, []))
+            if not values:
+                continue
+            stats[phase] = {
+                'count': len(values),
+                'mean': round(sum(values) / len(values), 6),
+                'p50': _percentile(values, 0.5),
+                'p95': _percentile(values, 0.95),
+                'p99': _percentile(values, 0.99),
+                'histogram': histogram(values),
+            }
+        out[key] = {'count': g['count'], 'errors': g['errors'], 'cached': g['cached'], 'phases': stats}
+    return out
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument('command', choices=['summary', 'list'])
+    p.add_argument('--path', default=str(DEFAULT_METRICS_PATH))
+    p.add_argument('--by', default='agent,model', help='Comma-separated grouping fields (agent, model, backend, ok)')
+    p.add_argument('--phase', action='append', choices=PHASES, help='Only these phases (repeatable)')
+    p.add_argument('--since-hours', type=float, help='Only records from the last N hours')
+    args = p.parse_args()
+
+    sink = MetricsSink(Path(args.path))
+    since = time.time() - args.since_hours * 3600 if args.since_hours else None
+    if args.command == 'list':
+        for rec in sink.records(since):
+            print(json.dumps(rec))
+        return
+    by = tuple(f.strip() for f in args.by.split(',') if f.strip())
+    print(json.dumps(aggregate(sink.records(since), by, tuple(args.phase or PHASES)), indent=2))
+
+
+if __name__ == '__main__':
+    main()
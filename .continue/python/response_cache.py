@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""Opt-in on-disk response cache for `agent_runner.py`.
+
+Entries are keyed by a sha256 of (agent name, model, options, prompt) and kept
+in a SQLite database in WAL mode, so any number of runner processes can read
+and write concurrently. Eviction is by TTL (seconds since the entry was
+stored) and LRU (least recently read first) once `max_entries` or `max_bytes`
+is exceeded. Hit/miss counters are shared across processes.
+
+    python .continue/python/response_cache.py --stats
+"""
+import argparse
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+DEFAULT_CACHE_PATH = Path('.continue') / 'cache' / 'responses.sqlite'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    agent TEXT,
+    model TEXT,
+    response TEXT NOT NULL,
+    raw TEXT NOT NULL,
+    exit_code INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries(accessed);
+CREATE INDEX IF NOT EXISTS entries_created ON entries(created);
+CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+"""
+
+
+def cache_key(agent: str, model: str, options, prompt: str) -> str:
+    material = json.dumps([agent, model, options or {}, prompt], sort_keys=True, ensure_ascii=True)
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, path: Path = DEFAULT_CACHE_PATH, ttl_seconds: float = 86400.0,
+                 max_entries: int = 10000, max_bytes: int = 64 * 1024 * 1024):
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), timeout=30, isolation_level=None, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript(_SCHEMA)
+
+    def _bump(self, name: str):
+        self._db.execute('INSERT INTO stats(name, value) VALUES (?, 1) '
+                         'ON CONFLICT(name) DO UPDATE SET value = value + 1', (name,))
+
+    def get(self, key: str):
+        """Return `{'raw', 'cleaned', 'exitCode'}` for a live entry, else None."""
+        now = time.time()
+        with self._lock:
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                row = self._db.execute('SELECT response, raw, exit_code, created FROM entries WHERE key = ?',
+                                       (key,)).fetchone()
+                if row and self.ttl_seconds and now - row[3] > self.ttl_seconds:
+                    self._db.execute('DELETE FROM entries WHERE key = ?', (key,))
+                    self._bump('expired')
+                    row = None
+                if row:
+                    self._db.execute('UPDATE entries SET accessed = ? WHERE key = ?', (now, key))
+                self._bump('hits' if row else 'misses')
+                self._db.execute('COMMIT')
+            except Exception:
+                self._db.execute('ROLLBACK')
+                raise
+        if not row:
+            return None
+        return {'cleaned': row[0], 'raw': row[1], 'exitCode': row[2]}
+
+    def put(self, key: str, result: dict, agent: str = None, model: str = None):
+        now = time.time()
+        size = len(result['cleaned'].encode('utf-8')) + len(result['raw'].encode('utf-8'))
+        if self.max_bytes and size > self.max_bytes:
+            return
+        with self._lock:
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                self._db.execute('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                                 (key, agent, model, result['cleaned'], result['raw'], result['exitCode'],
+                                  size, now, now))
+                self._evict(now)
+                self._db.execute('COMMIT')
+            except Exception:
+                self._db.execute('ROLLBACK')
+                raise
+
+    def _evict(self, now: float):
+        evicted = 0
+        if self.ttl_seconds:
+            evicted += self._db.execute('DELETE FROM entries WHERE created < ?', (now - self.ttl_seconds,)).rowcount
+        count, total = self._db.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries').fetchone()
+        if self.max_entries and count > self.max_entries:
+            evicted += self._db.execute(
+                'DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY accessed LIMIT ?)',
+                (count - self.max_entries,)).rowcount
+            total = self._db.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        if self.max_bytes and total > self.max_bytes:
+            # walk from least recently used until enough bytes are freed
+            excess = total - self.max_bytes
+            victims = []
+            for key, size in self._db.execute('SELECT key, size FROM entries ORDER BY accessed'):
+                victims.append((key,))
+                excess -= size
+                if excess <= 0:
+                    break
+            self._db.executemany('DELETE FROM entries WHERE key = ?', victims)
+            evicted += len(victims)
+        if evicted:
+            self._db.execute('INSERT INTO stats(name, value) VALUES (\'evictions\', ?) '
+                             'ON CONFLICT(name) DO UPDATE SET value = value + excluded.value', (evicted,))
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = {'hits': 0, 'misses': 0, 'expired': 0, 'evictions': 0}
+            out.update(dict(self._db.execute('SELECT name, value FROM stats').fetchall()))
+            out['entries'], out['bytes'] = self._db.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries').fetchone()
+        return out
+
+    def clear(self):
+        with self._lock:
+            self._db.execute('DELETE FROM entries')
+            self._db.execute('DELETE FROM stats')
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument('--path', default=str(DEFAULT_CACHE_PATH))
+    p.add_argument('--stats', action='store_true', help='Print hit/miss counters and size as JSON')
+    p.add_argument('--clear', action='store_true', help='Drop all entries and counters')
+    args = p.parse_args()
+
+    cache = ResponseCache(Path(args.path))
+    if args.clear:
+        cache.clear()
+    print(json.dumps(cache.stats()))
+
+
+if __name__ == '__main__':
+    main()
@@ -9,6 +9,18 @@ def write_marker(path: Path, text: str):
     path.parent.mkdir(parents=True, exist_ok=True)
     path.write_text(text.replace('\n',' '), encoding='utf-8')
 
+def build_command(runtime: str, model: str):
+    """Return the argv that starts `model` on `runtime`, or None if unsupported."""
+    if runtime == 'ollama':
+        return ['ollama','serve','--model', model]
+    return None
+
+def serve_command(runtime: str):
+    """Return the argv that starts the shared model runtime, or None if unsupported."""
+    if runtime == 'ollama':
+        return ['ollama', 'serve']
+    return None
+
 def main():
     p = argparse.ArgumentParser()
     p.add_argument('--model', '-m', required=True)
@@ -23,8 +35,8 @@ def main():
     if args.dry_run:
         return
 
-    if args.runtime == 'ollama':
-        cmd = ['ollama','serve','--model', args.model]
+    cmd = build_command(args.runtime, args.model)
+    if cmd:
         proc = subprocess.Popen(cmd)
         write_marker(marker, f"Started ollama {args.model} pid={proc.pid}")
         pidfile.write_text(str(proc.pid), encoding='utf-8')
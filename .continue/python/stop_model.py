@@ -5,6 +5,34 @@ import signal
 import subprocess
 from pathlib import Path
 
+def pid_alive(pid: int) -> bool:
+    if not pid:
+        return False
+    if os.name == 'nt':
+        # os.kill(pid, 0) terminates the process on Windows; query it instead
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        code = ctypes.c_ulong()
+        ok = kernel32.GetExitCodeProcess(handle, ctypes.byref(code))
+        kernel32.CloseHandle(handle)
+        return bool(ok) and code.value == 259  # STILL_ACTIVE
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def stop_pid(pid: int):
+    try:
+        os.kill(pid, signal.SIGTERM)
+    except Exception:
+        pass
+
 def main():
     p = argparse.ArgumentParser()
     p.add_argument('--dry-run', action='store_true')
@@ -19,10 +47,7 @@ def main():
     print(f"Stopping pid={pid} dry_run={args.dry_run}")
     if args.dry_run:
         return
-    try:
-        os.kill(pid, signal.SIGTERM)
-    except Exception:
-        pass
+    stop_pid(pid)
     try:
         pidfile.unlink()
     except Exception:
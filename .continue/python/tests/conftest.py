@@ -0,0 +1,63 @@
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+class _GenerateHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.server.ports.add(self.client_address[1])
+        self.server.requests += 1
+        if body.get('model') == 'missing':
+            return self._send_json(404, {'error': 'model not found'})
+        text = f"gen: {body['prompt']}"
+        if not body.get('stream'):
+            return self._send_json(200, {'model': body['model'], 'response': text, 'done': True})
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        try:
+            for tok in text.split(' '):
+                self._write_chunk({'model': body['model'], 'response': tok + ' ', 'done': False})
+            self._write_chunk({'model': body['model'], 'response': '', 'done': True})
+            self.wfile.write(b'0\r\n\r\n')
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+    def _send_json(self, status, reply):
+        data = json.dumps(reply).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _write_chunk(self, rec):
+        data = (json.dumps(rec) + '\n').encode('utf-8')
+        self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+        self.wfile.flush()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def api_url():
+    """A minimal stand-in for the runtime's /api/generate endpoint."""
+    srv = ThreadingHTTPServer(('127.0.0.1', 0), _GenerateHandler)
+    srv.ports = set()
+    srv.requests = 0
+    t = threading.Thread(target=srv.serve_forever, args=(0.05,), daemon=True)
+    t.start()
+    yield f'http://127.0.0.1:{srv.server_address[1]}', srv
+    srv.shutdown()
+    srv.server_close()
@@ -0,0 +1,43 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+SCRIPT = Path(__file__).resolve().parents[1] / 'agent_runner.py'
+
+
+def run_stream(root, *extra, env=None):
+    cmd = [sys.executable, str(SCRIPT), '-a', 'Low-1', '--stream', *extra]
+    proc = subprocess.run(cmd, capture_output=True, text=True, cwd=root, env=env)
+    return [json.loads(line) for line in proc.stdout.splitlines()]
+
+
+def write_config(root):
+    (root / '.continue').mkdir()
+    cfg = {'agents': [{'name': 'Low-1', 'options': {'model': 'qwen2.5-coder:1.5b', 'mode': 'local'}}]}
+    (root / '.continue' / 'config.agent').write_text(json.dumps(cfg), encoding='utf-8')
+
+
+def test_stream_echo_emits_chunk_then_summary(tmp_path):
+    write_config(tmp_path)
+    recs = run_stream(tmp_path, '-p', 'hello', '--ci')
+    assert recs[0] == {'response': '[Low-1] Echo: hello', 'done': False}
+    final = recs[-1]
+    assert final['done'] is True
+    assert final['ok'] is True
+    assert final['exitCode'] == 0
+    assert final['response'] == '[Low-1] Echo: hello'
+
+
+def test_stream_http_tokens_with_short(api_url, tmp_path):
+    url, _ = api_url
+    write_config(tmp_path)
+    env = dict(os.environ, RUN_OLLAMA_INTEGRATION='1', OLLAMA_API_URL=url, AGENT_RUNNER_SHORT_CHARS='7')
+    env.pop('OLLAMA_DISABLED', None)
+    recs = run_stream(tmp_path, '-p', 'one two three', '--backend', 'http', '--short', env=env)
+    chunks = [r['response'] for r in recs if r['done'] is False]
+    assert len(chunks) > 1
+    assert ''.join(chunks) == 'gen: on'
+    assert recs[-1]['response'] == 'gen: on...'
+    assert recs[-1]['ok'] is True
@@ -0,0 +1,114 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+import agent_runner
+from agent_server import make_server, send_request
+
+
+@pytest.fixture
+def server(tmp_path):
+    (tmp_path / '.continue').mkdir()
+    cfg = {'default': 'Low-2', 'agents': [
+        {'name': 'Low-1', 'options': {'model': 'qwen2.5-coder:1.5b', 'mode': 'local'}},
+        {'name': 'Low-2', 'options': {'model': 'qwen2.5-coder:1.5b', 'mode': 'local'}},
+    ]}
+    (tmp_path / '.continue' / 'config.agent').write_text(json.dumps(cfg), encoding='utf-8')
+    srv = make_server('127.0.0.1:0', agent_runner.make_handler(tmp_path, ci=True), max_concurrency=2)
+    t = threading.Thread(target=srv.serve_forever, args=(0.05,), daemon=True)
+    t.start()
+    yield tmp_path, '127.0.0.1:%d' % srv.server_address[1]
+    srv.shutdown()
+    srv.server_close()
+
+
+def test_server_matches_cli_envelope(server):
+    root, address = server
+    resp = send_request(address, {'agent': 'Low-1', 'prompt': 'hi'})
+    cfg = agent_runner.find_config(root)
+    expected = agent_runner.run_prompt(root, agent_runner.select_agent(cfg, 'Low-1'), 'hi', ci=True)
+    assert resp == expected
+    assert send_request(address, {'prompt': 'x'})['agent'] == 'Low-2'
+    assert send_request(address, {'op': 'ping'}) == {'ok': True}
+    assert 'error' in send_request(address, {'agent': 'Low-1'})
+
+
+def test_server_handles_concurrent_clients(server):
+    _, address = server
+    with ThreadPoolExecutor(max_workers=8) as ex:
+        results = list(ex.map(lambda i: send_request(address, {'agent': 'Low-1', 'prompt': f'p{i}', 'noop': True}), range(20)))
+    assert [r['response'] for r in results] == [f'[noop] p{i}' for i in range(20)]
+
+
+def test_cli_connect_mode(server):
+    root, address = server
+    script = Path(__file__).resolve().parents[1] / 'agent_runner.py'
+    cmd = [sys.executable, str(script), '-a', 'Low-1', '-p', 'via server', '--connect', '--address', address]
+    proc = subprocess.run(cmd, capture_output=True, text=True, cwd=root, env=dict(os.environ, OLLAMA_DISABLED='1'))
+    res = json.loads(proc.stdout)
+    assert res['ok'] is True
+    assert res['response'] == '[Low-1] Echo: via server'
+
+
+def test_server_streams_chunks(server):
+    _, address = server
+    chunks = []
+    resp = send_request(address, {'agent': 'Low-1', 'prompt': 'hi', 'stream': True}, on_chunk=chunks.append)
+    assert chunks == [{'response': '[Low-1] Echo: hi', 'done': False}]
+    assert resp['done'] is True
+    assert resp['response'] == '[Low-1] Echo: hi'
+
+
+def test_server_rejects_non_object_requests(server):
+    import socket
+
+    _, address = server
+    host, port = address.rsplit(':', 1)
+    with socket.create_connection((host, int(port)), timeout=5) as sock, sock.makefile('rwb') as f:
+        f.write(b'[1, 2]\n"hi"\n{"op": "ping"}\n')
+        f.flush()
+        replies = [json.loads(f.readline()) for _ in range(3)]
+    assert replies == [{'error': 'request must be a JSON object'}] * 2 + [{'ok': True}]
+
+
+def _misbehaving_server(reply):
+    import socketserver
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            self.rfile.readline()
+            if reply is not None:
+                self.wfile.write(reply)
+
+    srv = socketserver.ThreadingTCPServer(('127.0.0.1', 0), Handler)
+    srv.daemon_threads = True
+    threading.Thread(target=srv.serve_forever, args=(0.05,), daemon=True).start()
+    return srv
+
+
+def test_cli_connect_survives_broken_servers(server):
+    root, _ = server
+    script = Path(__file__).resolve().parents[1] / 'agent_runner.py'
+    env = dict(os.environ, OLLAMA_DISABLED='1')
+    results = {}
+    for name, reply in (('closed', None), ('garbage', b'not json\n')):
+        srv = _misbehaving_server(reply)
+        try:
+            cmd = [sys.executable, str(script), '-a', 'Low-1', '-p', 'hi', '--connect',
+                   '--address', '127.0.0.1:%d' % srv.server_address[1]]
+            proc = subprocess.run(cmd, capture_output=True, text=True, cwd=root, env=env, timeout=60)
+        finally:
+            srv.shutdown()
+            srv.server_close()
+        assert proc.returncode == 0, proc.stderr
+        results[name] = json.loads(proc.stdout)
+    # a server that hangs up before answering falls back to running in-process
+    assert results['closed']['ok'] is True and results['closed']['response'] == '[Low-1] Echo: hi'
+    # an unparseable reply is reported, not a traceback
+    assert results['garbage']['ok'] is False and 'invalid reply' in results['garbage']['error']
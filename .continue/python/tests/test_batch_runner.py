@@ -0,0 +1,110 @@
+import io
+import json
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+from batch_runner import run_batch
+
+SCRIPT = Path(__file__).resolve().parents[1] / 'agent_runner.py'
+
+
+def test_per_model_cap_and_completion_order():
+    active = {}
+    peak = {}
+    lock = threading.Lock()
+
+    def handler(req):
+        m = req.get('model')
+        with lock:
+            active[m] = active.get(m, 0) + 1
+            peak[m] = max(peak.get(m, 0), active[m])
+        time.sleep(0.05 if req['prompt'] == 'slow' else 0.01)
+        with lock:
+            active[m] -= 1
+        return {'response': req['prompt'], 'ok': True}
+
+    lines = [json.dumps({'prompt': 'slow', 'model': 'a'})]
+    lines += [json.dumps({'prompt': f'p{i}', 'model': 'a' if i % 2 else 'b'}) for i in range(8)]
+    lines += ['', 'not json', '"bare prompt"']
+    out = io.StringIO()
+    summary = run_batch(iter(lines), handler, out, lambda r: r.get('model'), max_concurrency=4, per_model=2)
+    recs = [json.loads(l) for l in out.getvalue().splitlines()]
+    assert summary == {'total': 11, 'ok': 10, 'failed': 1}
+    assert sorted(r['index'] for r in recs) == [0, 1, 2, 3, 4, 5, 6, 7, 8, 10, 11]
+    assert max(peak.values()) <= 2
+    # results are written as they complete: the slow first record is not first
+    assert recs[0]['index'] != 0
+    assert next(r for r in recs if r['index'] == 10)['error'] == 'invalid json'
+    assert next(r for r in recs if r['index'] == 11)['response'] == 'bare prompt'
+
+
+def test_cli_batch_with_prompt_field(tmp_path):
+    src = tmp_path / 'requests.jsonl'
+    src.write_text('\n'.join(json.dumps({'request_id': f'r{i}', 'body': f'task {i}'}) for i in range(5)), encoding='utf-8')
+    cmd = [sys.executable, str(SCRIPT), '--ci', '-a', 'Low-1', '--batch', str(src), '--prompt-field', 'body']
+    proc = subprocess.run(cmd, capture_output=True, text=True, cwd=tmp_path)
+    assert proc.returncode == 0
+    recs = sorted((json.loads(l) for l in proc.stdout.splitlines()), key=lambda r: r['index'])
+    assert [r['response'] for r in recs] == [f'[echo] Echo: task {i}' for i in range(5)]
+    assert json.loads(proc.stderr) == {'total': 5, 'ok': 5, 'failed': 0}
+
+
+def test_busy_model_does_not_block_other_models():
+    release = threading.Event()
+    started = []
+    done = set()
+
+    def handler(req):
+        started.append(req['prompt'])
+        if req.get('model') == 'a':
+            release.wait(5)
+        return {'response': req['prompt'], 'ok': True}
+
+    def fast_done():
+        # the 'b' request finishes while both 'a' requests hold their model's slot
+        deadline = time.monotonic() + 5
+        while 'b0' not in done and time.monotonic() < deadline:
+            time.sleep(0.01)
+        release.set()
+
+    class Out(io.StringIO):
+        def write(self, s):
+            done.add(json.loads(s)['response'])
+            return super().write(s)
+
+    lines = [json.dumps({'prompt': f'a{i}', 'model': 'a'}) for i in range(4)] + [json.dumps({'prompt': 'b0', 'model': 'b'})]
+    waiter = threading.Thread(target=fast_done)
+    waiter.start()
+    summary = run_batch(iter(lines), handler, Out(), lambda r: r.get('model'), max_concurrency=3, per_model=2)
+    waiter.join()
+    assert summary == {'total': 5, 'ok': 5, 'failed': 0}
+    # 'b0' ran before the queued 'a' requests instead of waiting behind them
+    assert started.index('b0') < started.index('a2')
+
+
+def test_failed_result_write_is_raised_not_hung():
+    def handler(req):
+        time.sleep(0.01)
+        # the third result cannot be serialized
+        return {'response': object() if req['prompt'] == 'p2' else req['prompt'], 'ok': True}
+
+    lines = [json.dumps({'prompt': f'p{i}', 'model': 'a' if i % 2 else 'b'}) for i in range(20)]
+    out = io.StringIO()
+    raised = []
+
+    def run():
+        try:
+            run_batch(iter(lines), handler, out, lambda r: r.get('model'), max_concurrency=2, per_model=1)
+        except Exception as e:
+            raised.append(e)
+
+    t = threading.Thread(target=run, daemon=True)
+    t.start()
+    t.join(10)
+    assert not t.is_alive()
+    assert len(raised) == 1 and isinstance(raised[0], TypeError)
+    # dispatch stopped: the remaining requests were never started
+    assert len(out.getvalue().splitlines()) < 19
@@ -0,0 +1,61 @@
+import threading
+from pathlib import Path
+
+import pytest
+
+from fake_runtime import FakeRuntime, start_in_thread
+from load_generator import make_target, percentile, run_load, synthetic_requests
+from ollama_client import OllamaClient, OllamaHTTPError
+
+
+@pytest.fixture
+def fake():
+    servers = []
+
+    def start(**kw):
+        srv = start_in_thread(FakeRuntime(**kw))
+        servers.append(srv)
+        return srv
+    yield start
+    for srv in servers:
+        srv.shutdown()
+        srv.server_close()
+
+
+def test_generate_chat_and_load_once(fake):
+    srv = fake(load_time=0.1, first_token_delay=0, tokens_per_second=0, tokens=3, parallel=2)
+    client = OllamaClient(srv.url)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(client.generate('m', 'a b'))) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert [r['response'] for r in results] == ['a b a'] * 4
+    assert srv.runtime.stats['loads'] == 1
+    toks = [r.get('message', {}).get('content') for r in client.stream('POST', '/api/chat', {
+        'model': 'm', 'messages': [{'role': 'user', 'content': 'hi'}], 'options': {'num_predict': 2}})]
+    assert toks[:2] == ['hi', ' hi'] and toks[-1] == ''
+    # empty prompt with keep_alive 0 unloads, like model_pool stop
+    client.request('POST', '/api/generate', {'model': 'm', 'keep_alive': 0})
+    assert client.request('GET', '/api/tags')['models'] == []
+
+
+def test_injected_errors(fake):
+    srv = fake(error_rate=1.0)
+    with pytest.raises(OllamaHTTPError) as exc:
+        OllamaClient(srv.url).generate('m', 'x')
+    assert exc.value.status == 500
+
+
+def test_load_generator_reports_percentiles(fake, tmp_path, monkeypatch):
+    srv = fake(first_token_delay=0.02, tokens_per_second=500, tokens=5, parallel=2)
+    monkeypatch.setenv('OLLAMA_API_URL', srv.url)
+    monkeypatch.delenv('OLLAMA_DISABLED', raising=False)
+    monkeypatch.setenv('RUN_OLLAMA_INTEGRATION', '1')
+    call = make_target('inprocess', Path(tmp_path), model='m', timeout=10)
+    report = run_load(synthetic_requests(12), call, rate=100, concurrency=4)
+    assert report['requests'] == report['ok'] == 12 and report['echoFallbacks'] == 0
+    assert 0.02 <= report['ttft']['p50'] <= report['latency']['p50'] <= report['latency']['p99']
+    assert srv.runtime.stats['tokens'] == 60
+    assert percentile([3, 1, 2, 4], 0.5) == 2 and percentile([], 0.5) is None
@@ -0,0 +1,172 @@
+import json
+import sys
+
+from model_pool import ModelPool, models_from_mapping
+from stop_model import pid_alive
+
+
+def sleeper():
+    return [sys.executable, '-c', 'import time; time.sleep(30)']
+
+
+def test_models_from_mapping(tmp_path):
+    mapping = tmp_path / 'agents-epic.json'
+    mapping.write_text(json.dumps([
+        {'name': 'Low-1', 'model': 'qwen2.5-coder:1.5b'},
+        {'name': 'Low-2', 'model': 'qwen2.5-coder:1.5b'},
+        {'name': 'Turbo', 'model': 'qwen2.5-coder:32b'},
+        {'name': 'Echo', 'model': 'none'},
+    ]), encoding='utf-8')
+    assert models_from_mapping(mapping) == ['qwen2.5-coder:1.5b', 'qwen2.5-coder:32b']
+
+
+def test_preload_touch_and_reap_idle(tmp_path):
+    clock = [1000.0]
+    pool = ModelPool(tmp_path / 'pool.json', launcher=sleeper, clock=lambda: clock[0])
+    started = pool.preload(['a', 'b'], keep_alive=60)
+    try:
+        assert [s['action'] for s in started] == ['started', 'started']
+        assert pool.start('a', keep_alive=60)['action'] == 'already-running'
+        status = pool.status()
+        assert [m['model'] for m in status['models']] == ['a', 'b']
+        assert all(m['alive'] for m in status['models'])
+        # both models share the one runtime process
+        assert pid_alive(status['runtime']['pid'])
+
+        clock[0] += 50
+        assert pool.touch('a')
+        clock[0] += 20
+        reaped = pool.reap()
+        assert [(r['model'], r['action']) for r in reaped] == [('b', 'stopped')]
+        assert [m['model'] for m in pool.status()['models']] == ['a']
+    finally:
+        runtime = pool.shutdown()
+    assert runtime['models'] == ['a']
+    assert pool.status()['models'] == [] and 'pid' not in pool.status()['runtime']
+
+
+def test_dry_run_starts_nothing(tmp_path):
+    pool = ModelPool(tmp_path / 'pool.json', launcher=sleeper)
+    res = pool.start('a', dry_run=True)
+    assert res['action'] == 'dry-run'
+    assert pool.status()['models'] == []
+
+
+def test_parallel_touches_keep_every_update(tmp_path):
+    import threading
+
+    state = tmp_path / 'pool.json'
+    names = [f'm{i}' for i in range(8)]
+    state.write_text(json.dumps({'models': {m: {'pid': None, 'lastUsed': 0} for m in names}}), encoding='utf-8')
+    errors = []
+
+    def runner(model):
+        pool = ModelPool(state, clock=lambda: 100.0)
+        try:
+            for _ in range(25):
+                assert pool.touch(model)
+        except Exception as e:  # a lost temp file used to surface here
+            errors.append(e)
+
+    threads = [threading.Thread(target=runner, args=(m,)) for m in names]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    models = ModelPool(state).status()['models']
+    assert [(m['model'], m['lastUsed']) for m in models] == [(m, 100.0) for m in names]
+    assert [p.name for p in tmp_path.iterdir() if p.suffix == '.tmp'] == []
+
+    # a stopped model is not written back by a later touch
+    pool = ModelPool(state)
+    assert pool.stop('m0')['action'] == 'stopped'
+    assert not pool.touch('m0')
+    assert 'm0' not in {m['model'] for m in pool.status()['models']}
+
+
+def test_start_warms_only_after_runtime_answers(tmp_path):
+    import socket
+    from pathlib import Path
+
+    from ollama_client import OllamaClient
+
+    def free_port():
+        with socket.socket() as s:
+            s.bind(('127.0.0.1', 0))
+            return s.getsockname()[1]
+
+    port = free_port()
+    fake = Path(__file__).resolve().parents[1] / 'fake_runtime.py'
+    # the runtime takes a moment to start listening, like a real `ollama serve`
+    boot = ('import runpy, sys, time; time.sleep(0.5); '
+            f'sys.argv = ["fake_runtime.py", "--address", "127.0.0.1:{port}"]; '
+            f'runpy.run_path({str(fake)!r}, run_name="__main__")')
+    url = f'http://127.0.0.1:{port}'
+    pool = ModelPool(tmp_path / 'pool.json', api_url=url, launcher=lambda: [sys.executable, '-c', boot],
+                     ready_timeout=10, ready_poll=0.05)
+    started = pool.start('m')
+    try:
+        assert started['warmed'] is True
+        assert OllamaClient(url).request('GET', '/api/stats')['loaded'] == ['m']
+        assert pool.status()['models'][0]['warmed'] is True
+        # a second model is warmed on the same runtime instead of launching another
+        assert pool.start('n')['warmed'] is True
+        assert OllamaClient(url).request('GET', '/api/stats')['loaded'] == ['m', 'n']
+        assert pool.stop('m')['action'] == 'stopped'
+        assert OllamaClient(url).request('GET', '/api/stats')['loaded'] == ['n']
+    finally:
+        pool.shutdown()
+
+    # a runtime that exits before answering is not warmed (and start does not hang)
+    pool = ModelPool(tmp_path / 'pool2.json', api_url=f'http://127.0.0.1:{free_port()}', launcher=lambda: [sys.executable, '-c', 'pass'],
+                     ready_timeout=10, ready_poll=0.05)
+    assert pool.start('m')['warmed'] is False
+
+
+def test_existing_runtime_is_reused_and_missing_binary_reported(tmp_path):
+    from fake_runtime import FakeRuntime, start_in_thread
+    from ollama_client import OllamaClient
+
+    srv = start_in_thread(FakeRuntime())
+    try:
+        def no_launch():
+            raise AssertionError('a runtime already answers')
+
+        pool = ModelPool(tmp_path / 'pool.json', api_url=srv.url, launcher=no_launch)
+        started = pool.preload(['a', 'b'])
+        assert [(s['action'], s['warmed']) for s in started] == [('started', True), ('started', True)]
+        assert OllamaClient(srv.url).request('GET', '/api/stats')['loaded'] == ['a', 'b']
+        assert pool.start('a')['action'] == 'already-running'
+        assert 'pid' not in pool.status()['runtime']
+    finally:
+        srv.shutdown()
+        srv.server_close()
+
+    # nothing answers and the runtime binary is missing: an error entry, not a traceback
+    pool = ModelPool(tmp_path / 'pool2.json', api_url=srv.url,
+                     launcher=lambda: [str(tmp_path / 'no-such-runtime')])
+    out = pool.preload(['a'])
+    assert out[0]['action'] == 'error' and 'FileNotFoundError' in out[0]['error']
+    assert pool.status()['models'] == []
+
+
+def test_touch_only_rewrites_stale_last_use(tmp_path):
+    state = tmp_path / 'pool.json'
+    state.write_text(json.dumps({'models': {'m': {'lastUsed': 100.0, 'keepAliveSeconds': 600}}}), encoding='utf-8')
+    clock = [110.0]
+    pool = ModelPool(state, clock=lambda: clock[0])
+
+    def last_used():
+        return json.loads(state.read_text(encoding='utf-8'))['models']['m']['lastUsed']
+
+    # within keep-alive / 10 of the stored use: nothing is written
+    assert pool.touch('m') and last_used() == 100.0
+    clock[0] = 170.0
+    assert pool.touch('m') and last_used() == 170.0
+    # and until then this instance does not even read the file
+    state.unlink()
+    clock[0] = 200.0
+    assert pool.touch('m')
+    clock[0] = 231.0
+    assert not pool.touch('m')
@@ -0,0 +1,52 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from ollama_client import OllamaClient, OllamaHTTPError
+
+
+def test_generate_reuses_connection(api_url):
+    url, srv = api_url
+    client = OllamaClient(url)
+    for i in range(3):
+        assert client.generate('m', f'p{i}')['response'] == f'gen: p{i}'
+    assert client.connections_opened == 1
+    assert len(srv.ports) == 1
+    client.close()
+
+
+def test_generate_http_error(api_url):
+    url, _ = api_url
+    client = OllamaClient(url)
+    with pytest.raises(OllamaHTTPError) as ei:
+        client.generate('missing', 'x')
+    assert ei.value.status == 404
+    assert ei.value.message == 'model not found'
+
+
+def test_generate_stream_then_reuse(api_url):
+    url, _ = api_url
+    client = OllamaClient(url)
+    toks = [rec['response'] for rec in client.generate_stream('m', 'a b c')]
+    assert ''.join(toks).strip() == 'gen: a b c'
+    assert client.generate('m', 'x')['response'] == 'gen: x'
+    assert client.connections_opened == 1
+
+
+def test_agent_runner_http_backend(api_url, tmp_path):
+    url, _ = api_url
+    (tmp_path / '.continue').mkdir()
+    cfg = {'agents': [{'name': 'Low-1', 'options': {'model': 'qwen2.5-coder:1.5b', 'mode': 'local'}}]}
+    (tmp_path / '.continue' / 'config.agent').write_text(json.dumps(cfg), encoding='utf-8')
+    env = dict(os.environ, RUN_OLLAMA_INTEGRATION='1', OLLAMA_API_URL=url)
+    env.pop('OLLAMA_DISABLED', None)
+    script = Path(__file__).resolve().parents[1] / 'agent_runner.py'
+    proc = subprocess.run([sys.executable, str(script), '-a', 'Low-1', '-p', 'hello', '--backend', 'http'],
+                          capture_output=True, text=True, cwd=tmp_path, env=env)
+    res = json.loads(proc.stdout)
+    assert res['ok'] is True
+    assert res['response'] == 'gen: hello'
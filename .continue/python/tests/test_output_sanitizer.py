@@ -0,0 +1,50 @@
+import os
+import random
+import stat
+import sys
+
+import agent_runner
+from output_sanitizer import OutputSanitizer, legacy_remove_ansi, sanitize, spinner_output
+
+ALPHABET = ['a', ' ', '\n', '\t', '\r', '\x00', '\x07', '\x1b', '[', '?', '2', ';', 'm', 'K', ' ', '\x85',
+            '⠀', '⠋', 'é', '✓', '​', ' ', '', '\U0001F600']
+
+
+def test_single_pass_matches_original_three_passes():
+    rnd = random.Random(7)
+    for _ in range(2000):
+        s = ''.join(rnd.choice(ALPHABET) for _ in range(rnd.randint(0, 40)))
+        assert sanitize(s).strip() == legacy_remove_ansi(s)
+        assert agent_runner.remove_ansi(s) == legacy_remove_ansi(s)
+    text = spinner_output(20000)
+    assert agent_runner.remove_ansi(text) == legacy_remove_ansi(text)
+
+
+def test_escape_split_across_chunks():
+    text = 'ab\x1b[?25l⠋ \x1b[K\x1b[2Dcd\x1b[32mok\x1b[0m\n\x1b'
+    expected = legacy_remove_ansi(text)
+    for size in range(1, 8):
+        s = OutputSanitizer()
+        out = ''.join(s.feed(text[i:i + size]) for i in range(0, len(text), size)) + s.flush()
+        assert out.strip() == expected
+    s = OutputSanitizer()
+    assert s.feed('x\x1b[3') == 'x'  # held back until the final byte arrives
+    assert s.feed('1mred') == 'red'
+
+
+def test_stream_cli_reads_chunks_from_pipe(tmp_path, monkeypatch):
+    fake = tmp_path / 'ollama'
+    fake.write_text(
+        f'#!{sys.executable}\n'
+        'import sys, time\n'
+        'out = sys.stdout.buffer\n'
+        'for piece in [b"\\x1b[?25l\\xe2\\xa0", b"\\x8b \\x1b[", b"K\\x1b[2Dhello ", b"caf\\xc3", b"\\xa9 world\\n"]:\n'
+        '    out.write(piece); out.flush(); time.sleep(0.01)\n',
+        encoding='utf-8')
+    fake.chmod(fake.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv('PATH', str(tmp_path) + os.pathsep + os.environ.get('PATH', ''))
+    chunks = []
+    result = agent_runner.stream_ollama_cli('m', 'p', 10, lambda t: chunks.append(t) or True)
+    assert result['exitCode'] == 0
+    assert result['cleaned'] == 'hello café world'
+    assert len(chunks) > 1 and ''.join(chunks).strip() == 'hello café world'
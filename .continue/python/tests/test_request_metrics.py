@@ -0,0 +1,80 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from agent_runner import make_handler
+from fake_runtime import FakeRuntime, start_in_thread
+from ollama_client import get_client
+from request_metrics import MetricsSink, Timings, aggregate, histogram
+
+SCRIPT = Path(__file__).resolve().parents[1] / 'agent_runner.py'
+
+
+def _config(root: Path):
+    (root / '.continue').mkdir()
+    (root / '.continue' / 'config.agent').write_text(json.dumps(
+        {'default': 'coder', 'agents': [{'name': 'coder', 'options': {'model': 'm'}}]}), encoding='utf-8')
+
+
+def test_timings_phases_with_fake_runtime(tmp_path, monkeypatch):
+    srv = start_in_thread(FakeRuntime(load_time=0.05, first_token_delay=0.02, tokens_per_second=0, tokens=4))
+    try:
+        monkeypatch.setenv('OLLAMA_API_URL', srv.url)
+        monkeypatch.delenv('OLLAMA_DISABLED', raising=False)
+        monkeypatch.setenv('RUN_OLLAMA_INTEGRATION', '1')
+        _config(tmp_path)
+        sink = MetricsSink(tmp_path / 'metrics.jsonl')
+        handler = make_handler(tmp_path, backend='http', metrics=sink)
+        streamed = handler({'prompt': 'a b', 'timings': True}, emit=lambda text: True)
+        plain = handler({'prompt': 'c d'})
+    finally:
+        # drop pooled keep-alive connections so no server thread outlives the test
+        get_client(srv.url).close()
+        srv.shutdown()
+        srv.server_close()
+    t = streamed['timings']
+    assert streamed['ok'] and t['modelLoad'] >= 0.05
+    assert 0.07 <= t['firstToken'] <= t['total'] and t['generation'] <= t['runtime'] <= t['total']
+    # only requested envelopes carry timings, but every request reaches the sink
+    assert 'timings' not in plain
+    records = list(sink.records())
+    assert [(r['agent'], r['model'], r['backend'], r['ok']) for r in records] == [('coder', 'm', 'http', True)] * 2
+    assert 'generation' in records[1]['timings'] and 'firstToken' not in records[1]['timings']
+
+
+def test_cli_timings_and_metrics(tmp_path):
+    env = dict(os.environ, OLLAMA_DISABLED='1')
+    proc = subprocess.run([sys.executable, str(SCRIPT), '-a', 'x', '-p', 'hi', '--timings', '--metrics'],
+                          cwd=tmp_path, env=env, capture_output=True, text=True, check=True)
+    t = json.loads(proc.stdout)['timings']
+    assert {'imports', 'config', 'total'} <= set(t) and t['imports'] + t['config'] <= t['total']
+    rec = json.loads((tmp_path / '.continue' / 'metrics' / 'agent-runner.jsonl').read_text(encoding='utf-8'))
+    assert rec['agent'] == 'echo' and rec['backend'] == 'echo' and rec['timings'] == t
+
+
+def test_aggregate_by_agent_and_model():
+    records = [{'agent': 'a', 'model': 'm1', 'ok': True, 'timings': {'total': v, 'firstToken': v / 2}}
+               for v in (0.1, 0.2, 0.3, 4.0)]
+    records.append({'agent': 'b', 'model': 'm2', 'ok': False, 'cached': True, 'timings': {'total': 0.02}})
+    out = aggregate(records)
+    a = out['a/m1']
+    assert a['count'] == 4 and a['errors'] == 0
+    assert a['phases']['total']['p50'] == 0.2 and a['phases']['total']['p99'] == 4.0
+    assert a['phases']['total']['histogram'] == {'<=0.1': 1, '<=0.25': 1, '<=0.5': 1, '<=5': 1}
+    assert out['b/m2'] == {'count': 1, 'errors': 1, 'cached': 1, 'phases': {'total': {
+        'count': 1, 'mean': 0.02, 'p50': 0.02, 'p95': 0.02, 'p99': 0.02, 'histogram': {'<=0.025': 1}}}}
+    assert list(aggregate(records, by=('model',))) == ['m1', 'm2']
+    assert histogram([100]) == {'>60': 1}
+
+
+def test_timings_first_token_counts_once():
+    now = [10.0]
+    t = Timings(clock=lambda: now[0])
+    now[0] = 10.5
+    t.first_token()
+    now[0] = 11.0
+    t.first_token()
+    t.finish_generation()
+    assert t.as_dict() == {'firstToken': 0.5, 'generation': 0.5, 'total': 1.0}
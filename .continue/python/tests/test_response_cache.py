@@ -0,0 +1,88 @@
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from response_cache import ResponseCache, cache_key
+
+SCRIPT = Path(__file__).resolve().parents[1] / 'agent_runner.py'
+
+
+def result(text):
+    return {'cleaned': text, 'raw': text + '\n', 'exitCode': 0}
+
+
+def test_key_covers_agent_model_options_prompt():
+    base = cache_key('Low-1', 'm', {'mode': 'local'}, 'p')
+    assert base == cache_key('Low-1', 'm', {'mode': 'local'}, 'p')
+    assert base != cache_key('Low-2', 'm', {'mode': 'local'}, 'p')
+    assert base != cache_key('Low-1', 'm2', {'mode': 'local'}, 'p')
+    assert base != cache_key('Low-1', 'm', {'mode': 'echo'}, 'p')
+    assert base != cache_key('Low-1', 'm', {'mode': 'local'}, 'q')
+
+
+def test_hit_miss_and_ttl(tmp_path, monkeypatch):
+    cache = ResponseCache(tmp_path / 'c.sqlite', ttl_seconds=60)
+    assert cache.get('k') is None
+    cache.put('k', result('hello'))
+    assert cache.get('k') == result('hello')
+    now = time.time()
+    monkeypatch.setattr(time, 'time', lambda: now + 120)
+    assert cache.get('k') is None
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['expired'], stats['entries']) == (1, 2, 1, 0)
+
+
+def test_lru_eviction(tmp_path, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(time, 'time', lambda: clock[0])
+    cache = ResponseCache(tmp_path / 'c.sqlite', ttl_seconds=0, max_entries=2)
+    for k in ('a', 'b'):
+        clock[0] += 1
+        cache.put(k, result(k))
+    clock[0] += 1
+    cache.get('a')  # 'b' is now least recently used
+    clock[0] += 1
+    cache.put('c', result('c'))
+    assert cache.get('b') is None
+    assert cache.get('a') is not None
+    assert cache.stats()['evictions'] == 1
+
+
+def _writer(args):
+    path, worker = args
+    cache = ResponseCache(Path(path))
+    for i in range(20):
+        cache.put(f'{worker}-{i}', result(str(i)))
+        cache.get(f'{worker}-{i}')
+    return True
+
+
+def test_concurrent_processes(tmp_path):
+    path = str(tmp_path / 'c.sqlite')
+    ResponseCache(Path(path))
+    with ProcessPoolExecutor(max_workers=4) as ex:
+        assert all(ex.map(_writer, [(path, w) for w in range(4)]))
+    stats = ResponseCache(Path(path)).stats()
+    assert stats['entries'] == 80
+    assert stats['hits'] == 80
+
+
+def test_agent_runner_cache_skips_runtime(api_url, tmp_path):
+    url, srv = api_url
+    (tmp_path / '.continue').mkdir()
+    cfg = {'agents': [{'name': 'Low-1', 'options': {'model': 'qwen2.5-coder:1.5b', 'mode': 'local'}}]}
+    (tmp_path / '.continue' / 'config.agent').write_text(json.dumps(cfg), encoding='utf-8')
+    env = dict(os.environ, RUN_OLLAMA_INTEGRATION='1', OLLAMA_API_URL=url)
+    env.pop('OLLAMA_DISABLED', None)
+    cmd = [sys.executable, str(SCRIPT), '-a', 'Low-1', '-p', 'same prompt', '--backend', 'http', '--cache']
+    first = json.loads(subprocess.run(cmd, capture_output=True, text=True, cwd=tmp_path, env=env).stdout)
+    second = json.loads(subprocess.run(cmd, capture_output=True, text=True, cwd=tmp_path, env=env).stdout)
+    assert srv.requests == 1
+    assert 'cached' not in first
+    assert second['cached'] is True
+    assert second['response'] == first['response'] == 'gen: same prompt'
+    assert second['rawResponse'] == first['rawResponse']
@@ -3,13 +3,18 @@
 Simple Autoscale Controller Prototype
 Reads .continue/agents-epic.json and .continue/agent-roles.json and suggests
 recommended MaxParallel and MaxVramGB given an available VRAM budget.
+Agents are placed on the VRAM/RAM/CPU budget by priority (bin packing), and
+the suggestion lists the admitted set, the queue order and any preemptions.
 
 This is a lightweight prototype intended for CI and local experimentation.
 """
 import argparse
+import hashlib
 import json
+import time
 from pathlib import Path
-import statistics
+
+from telemetry_store import DEFAULT_WINDOW, TelemetryRing, sample_from, stable_change
 
 def load_json(path: Path):
     if not path.exists():
@@ -18,34 +23,286 @@ def load_json(path: Path):
     return json.loads(path.read_text(encoding='utf-8-sig'))
 
 
-def recommend(agents, roles, available_vram_gb, min_parallel=1, max_parallel=16):
-    vram_list = []
+PRIORITY_RANK = {'critical': 0, 'high': 1, 'medium': 2, 'low': 3}
+DIMENSIONS = ('vramGB', 'memoryGB', 'cpus')
+DEFAULT_AGENT_RESOURCES = {'vramGB': 2, 'memoryGB': 4, 'cpus': 2}
+
+
+class RoleIndex:
+    """Role definitions compiled once per roles load for O(1) lookups.
+
+    Keyed by agent name, label and skill. Per skill, agents are pre-sorted by
+    cost (vramGB, memoryGB, cpus) so the cheapest capable agent is a lookup.
+    """
+
+    def __init__(self, roles=None, defaults=None):
+        roles = roles or {}
+        # the roles file nests agents under agentRoles.agents; accept a flat list too
+        entries = roles.get('agentRoles', {}).get('agents') or roles.get('agents', [])
+        self.by_name = {}
+        self.by_label = {}
+        self.by_skill = {}
+        for r in entries:
+            name = r.get('name')
+            if name is None:
+                continue
+            self.by_name[name] = r
+            for label in r.get('labels', []):
+                self.by_label.setdefault(label, []).append(r)
+            for skill in r.get('skills', []):
+                self.by_skill.setdefault(skill, []).append(r)
+        self._cost = {n: self.cost(r, defaults) for n, r in self.by_name.items()}
+        for agents in self.by_skill.values():
+            agents.sort(key=lambda r: (self._cost[r['name']], r['name']))
+
+    @staticmethod
+    def cost(role, defaults=None):
+        demand = agent_demand({}, role, defaults)
+        return tuple(demand[d] for d in DIMENSIONS)
+
+    def __len__(self):
+        return len(self.by_name)
+
+    def get(self, name):
+        return self.by_name.get(name)
+
+    def with_label(self, label):
+        return list(self.by_label.get(label, []))
+
+    def with_skill(self, skill):
+        """Agents having `skill`, cheapest first."""
+        return list(self.by_skill.get(skill, []))
+
+    def cheapest_with_skill(self, skill, exclude=()):
+        for r in self.by_skill.get(skill, []):
+            if r['name'] not in exclude:
+                return r
+        return None
+
+    def cheapest_with_skills(self, skills, exclude=()):
+        """Cheapest agent having every skill in `skills` (scans the rarest skill's list only)."""
+        skills = list(skills)
+        if not skills:
+            return None
+        rarest = min(skills, key=lambda sk: len(self.by_skill.get(sk, [])))
+        for r in self.by_skill.get(rarest, []):
+            if r['name'] in exclude:
+                continue
+            if all(sk in r.get('skills', []) for sk in skills):
+                return r
+        return None
+
+
+def agent_demand(agent, role, defaults=None):
+    """Resource demand of one agent: explicit mapping vram, else role resources, else defaults."""
+    defaults = defaults or DEFAULT_AGENT_RESOURCES
+    res = dict((role or {}).get('resources', {}))
+    demand = {}
+    for dim in DIMENSIONS:
+        v = res.get(dim)
+        demand[dim] = float(defaults.get(dim, 0) if v is None else v)
+    if agent.get('vram'):
+        demand['vramGB'] = float(agent['vram'])
+    return demand
+
+
+def place(candidates, vram_bins, memory_gb=None, cpus=None, max_parallel=None):
+    """Pack agents onto the host budget.
+
+    `candidates` are dicts with name, demand, rank (0 = most important) and
+    running. VRAM is packed best-fit into `vram_bins` (one per GPU, an agent
+    must fit on a single card); memory and cpus are host-wide (None = not
+    constrained). Agents are taken by priority, currently running agents first
+    within a priority (no churn), then smallest dominant share first so more
+    agents fit. Returns admitted (with gpu index), queue and preempt lists.
+    """
+    free = [float(b) for b in vram_bins]
+    totals = {'vramGB': sum(free) or 1.0, 'memoryGB': memory_gb, 'cpus': cpus}
+    mem_left = memory_gb
+    cpu_left = cpus
+
+    def share(c):
+        # dominant resource share: the scarcest dimension this agent would use
+        return max(c['demand'][d] / totals[d] for d in DIMENSIONS if totals[d])
+
+    order = sorted(candidates, key=lambda c: (c['rank'], not c['running'], share(c), c['name']))
+    admitted, rejected = [], []
+    for c in order:
+        d = c['demand']
+        fits_host = (mem_left is None or d['memoryGB'] <= mem_left) and (cpu_left is None or d['cpus'] <= cpu_left)
+        gpu = None
+        if fits_host and (max_parallel is None or len(admitted) < max_parallel):
+            # best fit: the card with the least VRAM left that still fits
+            fitting = [i for i, f in enumerate(free) if d['vramGB'] <= f]
+            if fitting:
+                gpu = min(fitting, key=lambda i: free[i])
+        if gpu is None:
+            rejected.append(c)
+            continue
+        free[gpu] -= d['vramGB']
+        if mem_left is not None:
+            mem_left -= d['memoryGB']
+        if cpu_left is not None:
+            cpu_left -= d['cpus']
+        admitted.append(dict(c, gpu=gpu))
+
+    preempt = [c for c in rejected if c['running']]
+    queue = [c for c in rejected if not c['running']]
+    return {
+        'admitted': admitted,
+        'queue': queue,
+        'preempt': preempt,
+        'free': {'vramGB': free, 'memoryGB': mem_left, 'cpus': cpu_left},
+    }
+
+
+def recommend(agents, roles, available_vram_gb, min_parallel=1, max_parallel=16,
+              available_memory_gb=None, available_cpus=None, defaults=None, vram_bins=None):
+    """Recommend MaxParallel from an explicit placement of the agents on the budget.
+
+    `roles` is a RoleIndex (or the raw roles document, compiled on the fly).
+    `vram_bins` splits `available_vram_gb` across GPUs (default: one card).
+    Agents with status 'running' in the mapping are kept in place unless
+    higher-priority work needs their resources; those are listed in `preempt`.
+    """
+    index = roles if isinstance(roles, RoleIndex) else RoleIndex(roles, defaults)
+    candidates = []
     for a in agents:
-        # prefer explicit vram if present, else 0
-        v = a.get('vram')
-        if v is None:
-            # try role mapping
-            r = next((rr for rr in (roles or {}).get('agents', []) if rr.get('name') == a.get('name')), None)
-            if r:
-                v = r.get('resources', {}).get('vramGB', 0)
-            else:
-                v = 0
-        vram_list.append(int(v or 0))
-
-    if not vram_list:
+        role = index.get(a.get('name'))
+        priority = (a.get('priority') or (role or {}).get('priority') or 'medium').lower()
+        candidates.append({
+            'name': a.get('name'),
+            'demand': agent_demand(a, role, defaults),
+            'priority': priority,
+            'rank': PRIORITY_RANK.get(priority, PRIORITY_RANK['medium']),
+            'running': a.get('status') == 'running',
+        })
+
+    if not candidates:
         return {'MaxParallel': min_parallel, 'MaxVramGB': available_vram_gb, 'reason': 'no agents'}
 
-    median_vram = max(1, int(statistics.median(vram_list)))
-    # conservative parallelism: floor available_vram / median per-agent vram
-    recommended_parallel = max(min_parallel, min(max_parallel, available_vram_gb // median_vram))
-    # ensure at least 1
-    recommended_parallel = max(1, recommended_parallel)
+    bins = vram_bins or [available_vram_gb]
+    plan = place(candidates, bins, available_memory_gb, available_cpus, max_parallel)
+    admitted = plan['admitted']
+    recommended_parallel = max(1, max(min_parallel, min(max_parallel, len(admitted))))
+
+    newcomer_ranks = [a['rank'] for a in admitted if not a['running']]
+
+    def brief(c, **extra):
+        out = {'name': c['name'], 'priority': c['priority']}
+        out.update({d: c['demand'][d] for d in DIMENSIONS})
+        out.update(extra)
+        return out
 
     return {
         'MaxParallel': recommended_parallel,
         'MaxVramGB': available_vram_gb,
-        'medianAgentVramGB': median_vram,
-        'agentCount': len(vram_list),
+        'usedVramGB': round(sum(a['demand']['vramGB'] for a in admitted), 2),
+        'agentCount': len(candidates),
+        'admitted': [brief(a, gpu=a['gpu']) for a in admitted],
+        'queue': [c['name'] for c in plan['queue']],
+        'preempt': [brief(c, reason='higher-priority work' if any(r < c['rank'] for r in newcomer_ranks)
+                          else 'insufficient resources')
+                    for c in plan['preempt']],
+    }
+
+
+class DocCache:
+    """Parsed JSON inputs cached between ticks.
+
+    A file is only re-read when its (mtime, size) stamp moves, and only
+    re-parsed when its content hash differs, so a touch or an identical rewrite
+    from the orchestrator costs one stat (plus one read) and no recompute.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self.version = 0
+
+    @staticmethod
+    def stamp(path: Path):
+        try:
+            st = path.stat()
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def stale(self, path: Path) -> bool:
+        """True when the file's stat stamp differs from the cached one (stat only)."""
+        entry = self._entries.get(path)
+        return entry is None or entry['stamp'] != self.stamp(path)
+
+    def refresh(self, path: Path) -> bool:
+        """Re-read `path` if its stamp moved; True when the content actually changed."""
+        stamp = self.stamp(path)
+        entry = self._entries.get(path)
+        if entry is not None and entry['stamp'] == stamp:
+            return False
+        data = path.read_bytes() if stamp is not None else None
+        digest = hashlib.sha256(data).hexdigest() if data is not None else None
+        if entry is not None and entry['hash'] == digest:
+            entry['stamp'] = stamp
+            return False
+        try:
+            doc = json.loads(data.decode('utf-8-sig')) if data is not None else None
+        except ValueError:
+            # half-written file: keep the last good document, retry next change
+            doc = entry['doc'] if entry else None
+            digest = None
+        self._entries[path] = {'stamp': stamp, 'hash': digest, 'doc': doc}
+        self.version += 1
+        return True
+
+    def get(self, path: Path):
+        self.refresh(path)
+        return self._entries[path]['doc']
+
+
+def wait_for_change(cache: DocCache, paths, poll=0.5, debounce=1.0, sleep=time.sleep, clock=time.monotonic,
+                    timeout=None):
+    """Block until one of `paths` has new content.
+
+    Polls stat stamps every `poll` seconds; once something moves, waits until
+    the stamps have been quiet for `debounce` seconds so a burst of writes
+    yields a single recompute. Returns the paths whose content changed, or []
+    once `timeout` seconds pass without a change.
+    """
+    deadline = None if timeout is None else clock() + timeout
+    while True:
+        if deadline is not None and clock() >= deadline:
+            return []
+        if any(cache.stale(p) for p in paths):
+            last = [cache.stamp(p) for p in paths]
+            quiet_since = clock()
+            while clock() - quiet_since < debounce:
+                sleep(poll)
+                now = [cache.stamp(p) for p in paths]
+                if now != last:
+                    last = now
+                    quiet_since = clock()
+            changed = [p for p in paths if cache.refresh(p)]
+            if changed:
+                return changed
+        sleep(poll)
+
+
+def live_budget(head, running_demand, fallback_vram_gb):
+    """Turn sampled headroom into a placement budget.
+
+    Agents already running are part of the sampled usage, so their demand is
+    added back (VRAM onto the busiest card, where they most likely live) before
+    place() re-admits them. Unknown dimensions fall back to the static budget.
+    """
+    bins = list(head.get('vramBins') or [fallback_vram_gb])
+    if head.get('vramBins'):
+        busiest = min(range(len(bins)), key=lambda i: bins[i])
+        bins[busiest] += running_demand['vramGB']
+    memory = head.get('memoryGB')
+    cpus = head.get('cpus')
+    return {
+        'vram_bins': bins,
+        'memoryGB': None if memory is None else memory + running_demand['memoryGB'],
+        'cpus': None if cpus is None else cpus + running_demand['cpus'],
     }
 
 
@@ -55,20 +312,33 @@ def atomic_write(path: Path, data: str):
     tmp.replace(path)
 
 
-def append_telemetry(log_path: Path, record: dict):
-    log_path.parent.mkdir(parents=True, exist_ok=True)
-    with log_path.open('a', encoding='utf-8') as f:
-        f.write(json.dumps(record, ensure_ascii=False) + "\n")
-
-
 def main():
     p = argparse.ArgumentParser()
     p.add_argument('--available-vram', type=int, default=int(( __import__('os').environ.get('AVAILABLE_VRAM_GB', '24') )), help='Available VRAM in GB')
+    p.add_argument('--available-memory', type=float, default=None, help='Host RAM budget in GB (default: unconstrained)')
+    p.add_argument('--available-cpus', type=float, default=None, help='CPU budget (default: unconstrained)')
+    p.add_argument('--gpus', default=None, help='Comma-separated VRAM GB per GPU, e.g. 24,12 (default: one card with --available-vram)')
+    p.add_argument('--config', default='config.template.json', help='Config providing agent_defaults resources and monitor thresholds')
+    p.add_argument('--live', action='store_true',
+                   help='Budget from live headroom (resource_sampler) minus monitor pressure thresholds instead of fixed numbers')
+    p.add_argument('--gpu-source', default='nvidia-smi', help="--live GPU memory source: nvidia-smi | static[:GB] | fake:TOTAL/USED,...")
+    p.add_argument('--live-interval', type=float, default=30.0,
+                   help='--on-change with --live: re-sample headroom at least this often (seconds)')
+    p.add_argument('--match-skill', action='append', default=[],
+                   help='Also report the cheapest agent having this skill (repeatable; all must match)')
     p.add_argument('--min-parallel', type=int, default=1)
     p.add_argument('--max-parallel', type=int, default=16)
     p.add_argument('--mapping', default='.continue/agents-epic.json')
     p.add_argument('--roles', default='.continue/agent-roles.json')
     p.add_argument('--watch', type=int, default=0, help='Watch interval seconds (0 = run once)')
+    p.add_argument('--on-change', action='store_true',
+                   help='Event-driven watch: recompute only when the mapping or roles file content changes')
+    p.add_argument('--poll', type=float, default=0.5, help='--on-change: seconds between stat checks')
+    p.add_argument('--debounce', type=float, default=1.0, help='--on-change: quiet seconds required after a write burst')
+    p.add_argument('--telemetry', default=str(Path('.continue') / 'autoscale-metrics.ring'),
+                   help='Ring-buffer telemetry store (fixed size, see telemetry_store.py)')
+    p.add_argument('--window', type=float, default=None,
+                   help='Hysteresis window in seconds (default: monitor.RollingWindow from --config)')
     p.add_argument('--apply', action='store_true', help='Write suggestion to .continue/autoscale-suggestion.json')
     p.add_argument('--signal', action='store_true', help='When used with --apply, create an apply request file to signal the monitor')
     args = p.parse_args()
@@ -76,71 +346,102 @@ def main():
     mapping_path = Path(args.mapping)
     roles_path = Path(args.roles)
     out_path = Path('.continue') / 'autoscale-suggestion.json'
-    telemetry_path = Path('.continue') / 'autoscale-metrics.log'
+    telemetry_path = Path(args.telemetry)
     apply_request = Path('.continue') / 'autoscale-apply.request'
 
+    prev_cache = {}
+
     def load_prev():
-        if out_path.exists():
-            try:
-                return json.loads(out_path.read_text(encoding='utf-8-sig'))
-            except Exception:
-                return None
-        return None
+        # read the previous suggestion once; afterwards we know what we wrote
+        if 'doc' not in prev_cache:
+            prev_cache['doc'] = None
+            if out_path.exists():
+                try:
+                    prev_cache['doc'] = json.loads(out_path.read_text(encoding='utf-8-sig'))
+                except Exception:
+                    pass
+        return prev_cache['doc']
 
-    def significant_change(prev, cur, pct_threshold=0.2, abs_parallel=1):
-        if not prev:
-            return True
-        try:
-            p1 = prev.get('recommendation', {}).get('MaxParallel', 0)
-            p2 = cur.get('recommendation', {}).get('MaxParallel', 0)
-            if abs(p2 - p1) >= abs_parallel:
-                return True
-            v1 = prev.get('recommendation', {}).get('MaxVramGB', 0)
-            v2 = cur.get('recommendation', {}).get('MaxVramGB', 0)
-            # percent change
-            if v1 == 0:
-                return True
-            if abs(v2 - v1) / max(1, v1) >= pct_threshold:
-                return True
-        except Exception:
-            return True
-        return False
+    config = load_json(Path(args.config)) or {}
+    window = args.window if args.window is not None else float((config.get('monitor') or {}).get('RollingWindow', DEFAULT_WINDOW))
+    ring = None
+    try:
+        ring = TelemetryRing(telemetry_path)
+    except Exception:
+        pass
+    defaults = config.get('agent_defaults') or DEFAULT_AGENT_RESOURCES
+    vram_bins = [float(v) for v in args.gpus.split(',')] if args.gpus else None
+    available_vram = int(sum(vram_bins)) if vram_bins else args.available_vram
+
+    docs = DocCache()
+    role_cache = {}
 
+    def load_roles():
+        # compile the role index once per roles document, reused across watch ticks
+        doc = docs.get(roles_path)
+        if role_cache.get('doc') is not doc or 'index' not in role_cache:
+            role_cache['index'] = RoleIndex(doc or {}, defaults)
+            role_cache['doc'] = doc
+        return role_cache['index']
+
+    sampler = gpu_source = None
+    if args.live:
+        from resource_sampler import ProcSampler, gpu_source_from_spec, headroom, snapshot
+        sampler = ProcSampler()
+        gpu_source = gpu_source_from_spec(args.gpu_source, args.available_vram)
 
     def run_once():
-        mapping = load_json(mapping_path) or []
-        roles = load_json(roles_path) or {}
-        rec = recommend(mapping, roles, args.available_vram, args.min_parallel, args.max_parallel)
+        mapping = docs.get(mapping_path) or []
+        roles = load_roles()
+        budget = {'vram_bins': vram_bins, 'memoryGB': args.available_memory, 'cpus': args.available_cpus}
+        head = None
+        if args.live:
+            head = headroom(snapshot(sampler, gpu_source), config.get('monitor'))
+            running = [agent_demand(a, roles.get(a.get('name')), defaults) for a in mapping if a.get('status') == 'running']
+            running_demand = {d: sum(r[d] for r in running) for d in DIMENSIONS}
+            budget = live_budget(head, running_demand, available_vram)
+            # explicit CLI limits still cap the live numbers
+            if args.available_memory is not None and budget['memoryGB'] is not None:
+                budget['memoryGB'] = min(budget['memoryGB'], args.available_memory)
+            budget['memoryGB'] = args.available_memory if budget['memoryGB'] is None else budget['memoryGB']
+            budget['cpus'] = args.available_cpus if budget['cpus'] is None else budget['cpus']
+        vram_total = int(sum(budget['vram_bins'])) if budget['vram_bins'] else available_vram
+        rec = recommend(mapping, roles, vram_total, args.min_parallel, args.max_parallel,
+                        available_memory_gb=budget['memoryGB'], available_cpus=budget['cpus'],
+                        defaults=defaults, vram_bins=budget['vram_bins'])
         out = {
-            'available_vram_gb': args.available_vram,
+            'available_vram_gb': vram_total,
             'recommendation': rec,
             'summary': {
                 'agents_inspected': len(mapping),
             }
         }
+        if head is not None:
+            out['headroom'] = head
+        if args.match_skill:
+            match = roles.cheapest_with_skills(args.match_skill)
+            out['skillMatch'] = {'skills': args.match_skill, 'agent': match.get('name') if match else None}
+        # telemetry sample, then rolling aggregates over the window for hysteresis
+        stats = {}
+        if ring is not None:
+            try:
+                ring.append(sample_from(out))
+                stats = ring.window_stats(window)
+                out['telemetry'] = {'window': window, 'stats': stats}
+            except Exception:
+                pass
         s = json.dumps(out)
         print(s)
 
-        # telemetry record
-        telemetry = {
-            'ts': __import__('datetime').datetime.utcnow().isoformat() + 'Z',
-            'available_vram_gb': args.available_vram,
-            'recommendation': rec,
-            'agents_inspected': len(mapping),
-        }
-        try:
-            append_telemetry(telemetry_path, telemetry)
-        except Exception:
-            pass
-
         prev = load_prev()
-        changed = significant_change(prev, out, pct_threshold=float(__import__('os').environ.get('AUTOSCALE_CHANGE_PCT','0.2')), abs_parallel=int(__import__('os').environ.get('AUTOSCALE_MIN_PAR_CHANGE','1')))
+        changed = stable_change(prev, out, stats, pct_threshold=float(__import__('os').environ.get('AUTOSCALE_CHANGE_PCT','0.2')), abs_parallel=int(__import__('os').environ.get('AUTOSCALE_MIN_PAR_CHANGE','1')))
 
         if args.apply and changed:
             out_path.parent.mkdir(parents=True, exist_ok=True)
             atomic_write(out_path, s)
+            prev_cache['doc'] = out
 
-        if args.apply and args.watch == 0 and args.signal and changed:
+        if args.apply and args.watch == 0 and not args.on_change and args.signal and changed:
             # write a simple apply request file (atomic)
             apply_payload = {
                 'ts': __import__('datetime').datetime.utcnow().isoformat() + 'Z',
@@ -151,8 +452,16 @@ def main():
 
         return out
 
-    if args.watch and args.watch > 0:
-        import time
+    if args.on_change:
+        try:
+            run_once()
+            while True:
+                wait_for_change(docs, [mapping_path, roles_path], poll=args.poll, debounce=args.debounce,
+                                timeout=args.live_interval if args.live else None)
+                run_once()
+        except KeyboardInterrupt:
+            print('stopped')
+    elif args.watch and args.watch > 0:
         try:
             while True:
                 run_once()
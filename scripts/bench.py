@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Microbenchmarks for the project's hot paths, with baseline regression checks.
+
+Suites:
+  backlog      BacklogStore add/claim/get/list_open per backend at --sizes items
+  contention   Controller.claim_next from --procs processes on one store
+  recommend    autoscale_controller.recommend with hundreds of agents/roles
+  sanitize     agent_runner.remove_ansi on large captured outputs
+  runner       agent_runner --noop / echo end to end (includes interpreter startup)
+  impediments  DialogManager._raise_impediment with a large impediment log
+
+Every metric is seconds (per operation unless the name says otherwise) and
+goes to a JSON results file. With a baseline (written by --save-baseline on a
+known-good tree), a metric slower than baseline * threshold (and by more than
+--min-delta seconds) is a regression and the exit code is 1.
+
+Usage: python scripts/bench.py [--suite backlog --suite runner] [--quick] [--save-baseline]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+AGENT_PY = ROOT / '.continue' / 'python'
+for p in (ROOT, ROOT / 'scripts', AGENT_PY):
+    if str(p) not in sys.path:
+        sys.path.insert(0, str(p))
+
+DEFAULT_RESULTS = ROOT / 'logs' / 'bench' / 'results.json'
+DEFAULT_BASELINE = ROOT / 'logs' / 'bench' / 'baseline.json'
+DEFAULT_THRESHOLD = 1.5
+SUITES = ('backlog', 'contention', 'recommend', 'sanitize', 'runner', 'impediments')
+BACKENDS = {'json': '.json', 'journal': '.journal', 'sqlite': '.sqlite'}
+
+
+def timed(fn, repeat):
+    """Median seconds of `repeat` calls (fn receives the call index)."""
+    times = []
+    for i in range(repeat):
+        t0 = time.perf_counter()
+        fn(i)
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times)
+
+
+def bench_backlog(sizes, ops, backends=tuple(BACKENDS)):
+    from services.backlog.backlog_store import BacklogStore
+
+    out = {}
+    for backend in backends:
+        for n in sizes:
+            # the JSON backend rewrites the whole file per write; keep its op count bounded
+            k = max(3, min(ops, ops * 1000 // n)) if backend == 'json' else ops
+            with tempfile.TemporaryDirectory() as tmp:
+                store = BacklogStore(Path(tmp) / f'bench{BACKENDS[backend]}')
+                store.add_many({'title': f'task {i}', 'priority': ('low', 'medium', 'high')[i % 3]} for i in range(n))
+                rnd = random.Random(n)
+                ids = rnd.sample(range(1, n + 1), min(n, k))
+                prefix = f'backlog.{backend}.n{n}'
+                out[f'{prefix}.add'] = timed(lambda i: store.add(f'extra {i}'), k)
+                out[f'{prefix}.get'] = timed(lambda i: store.get(ids[i % len(ids)]), k)
+                out[f'{prefix}.claim'] = timed(lambda i: store.claim(ids[i % len(ids)], 'bench', 300), min(k, len(ids)))
+                out[f'{prefix}.list_open'] = timed(lambda i: store.list_open(), max(3, k // 10))
+                store.close()
+    return out
+
+
+def _claim_worker(db, owner, start, counts):
+    from services.backlog.controller import Controller
+
+    ctl = Controller(Path(db), roles_path=Path(db).with_suffix('.roles-none.json'))
+    start.wait()
+    n = 0
+    while ctl.claim_next(owner) is not None:
+        n += 1
+    ctl.close()
+    counts.put(n)
+
+
+def bench_contention(items, procs, backends=('journal', 'sqlite')):
+    from services.backlog.backlog_store import BacklogStore
+
+    out = {}
+    ctx = multiprocessing.get_context('spawn')
+    for backend in backends:
+        with tempfile.TemporaryDirectory() as tmp:
+            db = Path(tmp) / f'claims{BACKENDS[backend]}'
+            store = BacklogStore(db)
+            store.add_many({'title': f'task {i}'} for i in range(items))
+            store.close()
+            start, counts = ctx.Event(), ctx.Queue()
+            workers = [ctx.Process(target=_claim_worker, args=(str(db), f'agent-{i}', start, counts))
+                       for i in range(procs)]
+            for w in workers:
+                w.start()
+            time.sleep(0.5)  # let every worker import and open the store
+            t0 = time.perf_counter()
+            start.set()
+            claimed = sum(counts.get(timeout=600) for _ in workers)
+            elapsed = time.perf_counter() - t0
+            for w in workers:
+                w.join()
+            if claimed != items:
+                raise RuntimeError(f'{backend}: {claimed} claims for {items} items')
+            out[f'contention.{backend}.p{procs}.claim_next'] = elapsed / items
+            out[f'contention.{backend}.p{procs}.total_seconds'] = elapsed
+    return out
+
+
+def bench_recommend(agents, roles, repeat):
+    from autoscale_controller import RoleIndex, recommend
+
+    rnd = random.Random(1)
+    skills = [f'skill-{i}' for i in range(40)]
+    doc = {'agentRoles': {'agents': [
+        {'name': f'role-{i}', 'priority': rnd.choice(['critical', 'high', 'medium', 'low']),
+         'skills': rnd.sample(skills, 3),
+         'resources': {'vramGB': rnd.choice([1, 2, 4, 8]), 'memoryGB': rnd.choice([2, 4, 8]), 'cpus': rnd.choice([1, 2, 4])}}
+        for i in range(roles)]}}
+    mapping = [{'name': f'role-{rnd.randrange(roles)}', 'status': rnd.choice(['running', 'queued'])} for _ in range(agents)]
+    index = RoleIndex(doc)
+    prefix = f'recommend.a{agents}.r{roles}'
+    return {
+        f'{prefix}.index': timed(lambda i: RoleIndex(doc), repeat),
+        f'{prefix}.recommend': timed(lambda i: recommend(mapping, index, 96, 1, 64, available_memory_gb=256,
+                                                         available_cpus=64, vram_bins=[48, 24, 24]), repeat),
+    }
+
+
+def bench_sanitize(mb, repeat):
+    from agent_runner import remove_ansi
+    from output_sanitizer import spinner_output, text_output
+
+    out = {}
+    for name, make in (('spinner', spinner_output), ('text', text_output)):
+        text = make(int(mb * 1024 * 1024))
+        out[f'sanitize.remove_ansi.{name}.{mb:g}mb'] = timed(lambda i: remove_ansi(text), repeat)
+    return out
+
+
+def bench_runner(repeat):
+    out = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, OLLAMA_DISABLED='1')
+        for mode, extra in (('noop', ['--noop']), ('echo', ['--ci'])):
+            cmd = [sys.executable, str(AGENT_PY / 'agent_runner.py'), '-a', 'bench', '-p', 'hello', *extra]
+
+            def run(i):
+                subprocess.run(cmd, cwd=tmp, env=env, capture_output=True, check=True)
+
+            out[f'runner.{mode}.end_to_end'] = timed(run, repeat)
+    return out
+
+
+def bench_impediments(existing, ops):
+    from services.comm.impediments import ImpedimentLog
+    from services.comm.dialog_manager import DialogManager
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log = ImpedimentLog(Path(tmp) / 'impediments.jsonl', max_bytes=0)
+        line = json.dumps({'reason': 'too_many_invalid_replies', 'context': {'options': ['A', 'B']}, 'ts': 0}) + '\n'
+        log.path.write_text(line * existing, encoding='utf-8')
+        dm = DialogManager(impediments=log)
+        ctx = {'options': ['Start task', 'Defer task', 'Cancel']}
+        return {f'impediments.raise.n{existing}': timed(lambda i: dm._raise_impediment('bench', ctx), ops)}
+
+
+def run_suites(suites, quick=False, sizes=None, procs=4):
+    sizes = sizes or ([1000, 10000] if quick else [1000, 10000, 100000])
+    results = {}
+    if 'backlog' in suites:
+        results.update(bench_backlog(sizes, ops=20 if quick else 100))
+    if 'contention' in suites:
+        results.update(bench_contention(items=200 if quick else 2000, procs=procs))
+    if 'recommend' in suites:
+        results.update(bench_recommend(agents=200 if quick else 500, roles=100 if quick else 300, repeat=5 if quick else 20))
+    if 'sanitize' in suites:
+        results.update(bench_sanitize(mb=1 if quick else 8, repeat=3))
+    if 'runner' in suites:
+        results.update(bench_runner(repeat=3 if quick else 10))
+    if 'impediments' in suites:
+        results.update(bench_impediments(existing=10000 if quick else 200000, ops=50 if quick else 500))
+    return results
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD, min_delta=0.0005):
+    """Rows (name, baseline, current, ratio, status) for every current metric.
+
+    A metric regresses when current > baseline * threshold and the absolute
+    slowdown exceeds `min_delta` seconds (sub-millisecond noise is ignored).
+    The baseline may override thresholds per metric under "thresholds".
+    """
+    base = (baseline or {}).get('results', {})
+    overrides = (baseline or {}).get('thresholds', {})
+    rows = []
+    for name, cur in sorted(results.items()):
+        ref = base.get(name)
+        if ref is None:
+            rows.append((name, None, cur, None, 'new'))
+            continue
+        ratio = cur / ref if ref else float('inf')
+        limit = overrides.get(name, threshold)
+        status = 'REGRESSION' if ratio > limit and cur - ref > min_delta else 'ok'
+        rows.append((name, ref, cur, ratio, status))
+    return rows
+
+
+def write_json(path: Path, doc):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + '.tmp')
+    tmp.write_text(json.dumps(doc, indent=2, sort_keys=True), encoding='utf-8')
+    tmp.replace(path)
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser()
+    p.add_argument('--suite', action='append', choices=SUITES, help='Run only these suites (repeatable)')
+    p.add_argument('--quick', action='store_true', help='Smaller sizes for a fast local check')
+    p.add_argument('--sizes', help='Backlog sizes, comma separated (default 1000,10000,100000)')
+    p.add_argument('--procs', type=int, default=4, help='Contention: claiming processes')
+    p.add_argument('--output', default=str(DEFAULT_RESULTS))
+    p.add_argument('--baseline', default=str(DEFAULT_BASELINE))
+    p.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                   help='Fail when a metric is slower than baseline * threshold')
+    p.add_argument('--min-delta', type=float, default=0.0005, help='Ignore slowdowns smaller than this (seconds)')
+    p.add_argument('--save-baseline', action='store_true', help='Store these results as the new baseline')
+    args = p.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(',')] if args.sizes else None
+    results = run_suites(args.suite or SUITES, quick=args.quick, sizes=sizes, procs=args.procs)
+    doc = {
+        'meta': {'ts': time.strftime('%Y-%m-%dT%H:%M:%S%z'), 'python': platform.python_version(),
+                 'platform': platform.platform(), 'quick': args.quick},
+        'results': results,
+    }
+    write_json(Path(args.output), doc)
+
+    baseline_path = Path(args.baseline)
+    baseline = json.loads(baseline_path.read_text(encoding='utf-8')) if baseline_path.exists() else None
+    rows = compare(results, baseline, args.threshold, args.min_delta)
+    regressions = [r for r in rows if r[4] == 'REGRESSION']
+    for name, ref, cur, ratio, status in rows:
+        ref_s = f'{ref * 1000:10.3f}' if ref is not None else '         -'
+        ratio_s = f'{ratio:6.2f}x' if ratio is not None else '      -'
+        print(f'{status:10} {name:48} {ref_s} ms -> {cur * 1000:10.3f} ms {ratio_s}')
+    if args.save_baseline:
+        if baseline:
+            # keep hand-tuned per-metric thresholds
+            doc['thresholds'] = baseline.get('thresholds', {})
+        write_json(baseline_path, doc)
+        print(f'baseline saved to {baseline_path}')
+        return 0
+    if regressions:
+        print(f'\n{len(regressions)} regression(s) against {baseline_path}', file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
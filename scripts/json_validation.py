@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Reusable JSON / JSONL schema validation for repository artifacts.
+
+- Compiled Draft7 validators are cached per process, keyed by the schema's
+  content hash, so a schema shared by many files is parsed and compiled once.
+- `.jsonl` inputs (requests.jsonl, telemetry logs) are validated as a stream,
+  one document per line, without loading the whole file.
+- With a pass cache, a (content hash, schema hash) pair that already passed is
+  skipped; only new or edited files (or files under an edited schema) are
+  validated again.
+- Large artifact sets are spread across a process pool.
+
+scripts/validate-json.py is the CLI entry point; this module is importable
+from the scripts directory like resource_sampler.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+DEFAULT_MAPPING = {
+    '.continue/config.json': 'schemas/config.schema.json',
+    '.continue/agent-roles.json': 'schemas/skills.schema.json',
+    '.continue/oneagent-config.json': 'schemas/oneagent-skills.schema.json'
+}
+DEFAULT_PASS_CACHE = Path('.continue') / 'cache' / 'validate-json.json'
+MAX_MESSAGES = 50
+# below this many files a pool costs more to start than it saves
+POOL_THRESHOLD = 8
+
+_VALIDATORS = {}
+
+
+def file_hash(path: Path, chunk=1 << 20):
+    h = hashlib.sha256()
+    with Path(path).open('rb') as f:
+        for block in iter(lambda: f.read(chunk), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def get_validator(schema_path: Path, schema_hash=None):
+    """Compiled validator for `schema_path`, cached by schema content hash."""
+    data = Path(schema_path).read_bytes()
+    key = schema_hash or hashlib.sha256(data).hexdigest()
+    validator = _VALIDATORS.get(key)
+    if validator is None:
+        from jsonschema import Draft7Validator
+        # read with utf-8-sig to tolerate BOMs
+        schema = json.loads(data.decode('utf-8-sig'))
+        Draft7Validator.check_schema(schema)
+        validator = _VALIDATORS[key] = Draft7Validator(schema)
+    return validator
+
+
+def document_errors(validator, doc, prefix=''):
+    return [f'{prefix}{list(e.path)}: {e.message}'
+            for e in sorted(validator.iter_errors(doc), key=lambda e: list(e.path))]
+
+
+def iter_jsonl(path: Path):
+    """(line number, document or ValueError) per non-blank line, streamed."""
+    with Path(path).open('r', encoding='utf-8-sig') as f:
+        for n, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                yield n, json.loads(line)
+            except ValueError as e:
+                yield n, e
+
+
+def validate_file(json_path, schema_path, content_hash=None, schema_hash=None):
+    """Validate one file; returns a result dict (path, schema, ok, message, hashes, documents)."""
+    json_path, schema_path = Path(json_path), Path(schema_path)
+    result = {'path': str(json_path), 'schema': str(schema_path), 'ok': False, 'message': '',
+              'content_hash': content_hash, 'schema_hash': schema_hash, 'documents': 0}
+    if not schema_path.exists():
+        result['message'] = f'schema missing: {schema_path}'
+        return result
+    try:
+        validator = get_validator(schema_path, schema_hash)
+    except ImportError:
+        # jsonschema missing is an environment problem, not a schema error
+        raise
+    except Exception as e:
+        result['message'] = f'schema parse error: {e}'
+        return result
+
+    msgs = []
+    if json_path.suffix == '.jsonl':
+        for n, doc in iter_jsonl(json_path):
+            result['documents'] += 1
+            if isinstance(doc, ValueError):
+                msgs.append(f'line {n}: parse error: {doc}')
+            else:
+                msgs.extend(document_errors(validator, doc, f'line {n}: '))
+            if len(msgs) >= MAX_MESSAGES:
+                msgs.append('... (more errors not shown)')
+                break
+    else:
+        try:
+            doc = json.loads(json_path.read_text(encoding='utf-8-sig'))
+        except Exception as e:
+            result['message'] = f'parse error: {e}'
+            return result
+        result['documents'] = 1
+        msgs = document_errors(validator, doc)
+    result['ok'] = not msgs
+    result['message'] = '\n'.join(msgs)
+    return result
+
+
+def _validate_task(args):
+    return validate_file(*args)
+
+
+class PassCache:
+    """(content hash, schema hash) pairs that already validated clean, persisted as JSON."""
+
+    def __init__(self, path: Path = DEFAULT_PASS_CACHE):
+        self.path = Path(path)
+        self._keys = set()
+        try:
+            self._keys = set(json.loads(self.path.read_text(encoding='utf-8')).get('passed', []))
+        except (OSError, ValueError, AttributeError):
+            pass
+        self._dirty = False
+
+    @staticmethod
+    def key(content_hash, schema_hash):
+        return f'{content_hash}:{schema_hash}'
+
+    def __contains__(self, pair):
+        return self.key(*pair) in self._keys
+
+    def add(self, content_hash, schema_hash):
+        k = self.key(content_hash, schema_hash)
+        if k not in self._keys:
+            self._keys.add(k)
+            self._dirty = True
+
+    def save(self):
+        if not self._dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + '.tmp')
+        tmp.write_text(json.dumps({'passed': sorted(self._keys)}), encoding='utf-8')
+        tmp.replace(self.path)
+        self._dirty = False
+
+
+def validate_many(pairs, jobs=None, pass_cache=None):
+    """Validate (json path, schema path) pairs; missing JSON files are ignored.
+
+    Returns result dicts in input order; entries skipped through `pass_cache`
+    have `skipped: True`. `jobs` > 1 (or None = cpu count) uses a process pool
+    once there are enough files to make it worthwhile.
+    """
+    results, todo = [], []
+    schema_hashes = {}
+    for json_path, schema_path in pairs:
+        json_path, schema_path = Path(json_path), Path(schema_path)
+        if not json_path.exists():
+            # skip missing files, not an error here
+            continue
+        content_hash = file_hash(json_path)
+        schema_hash = None
+        if schema_path.exists():
+            if schema_path not in schema_hashes:
+                schema_hashes[schema_path] = file_hash(schema_path)
+            schema_hash = schema_hashes[schema_path]
+        if pass_cache is not None and schema_hash and (content_hash, schema_hash) in pass_cache:
+            results.append({'path': str(json_path), 'schema': str(schema_path), 'ok': True, 'skipped': True,
+                            'message': '', 'content_hash': content_hash, 'schema_hash': schema_hash})
+            continue
+        slot = len(results)
+        results.append(None)
+        todo.append((slot, (json_path, schema_path, content_hash, schema_hash)))
+
+    workers = jobs if jobs is not None else (os.cpu_count() or 1)
+    if workers > 1 and len(todo) >= POOL_THRESHOLD:
+        with ProcessPoolExecutor(max_workers=min(workers, len(todo))) as pool:
+            done = pool.map(_validate_task, [t for _, t in todo], chunksize=max(1, len(todo) // (workers * 4)))
+            for (slot, _), res in zip(todo, done):
+                results[slot] = res
+    else:
+        for slot, task in todo:
+            results[slot] = _validate_task(task)
+
+    if pass_cache is not None:
+        for r in results:
+            if r['ok'] and not r.get('skipped') and r['schema_hash']:
+                pass_cache.add(r['content_hash'], r['schema_hash'])
+        pass_cache.save()
+    return results
+
+
+def parse_pair(spec):
+    json_path, sep, schema_path = spec.partition('=')
+    if not sep:
+        raise argparse.ArgumentTypeError(f'expected JSON=SCHEMA, got {spec!r}')
+    return json_path, schema_path
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description='Validate repository JSON/JSONL artifacts against their schemas.')
+    p.add_argument('--file', action='append', type=parse_pair, default=[], metavar='JSON=SCHEMA',
+                   help='Validate this file (.json or .jsonl) against SCHEMA (repeatable; default: the known config files)')
+    p.add_argument('--root', default='.')
+    p.add_argument('--jobs', type=int, default=None, help='Worker processes (default: CPU count, 1 = in-process)')
+    p.add_argument('--incremental', action='store_true',
+                   help='Skip files whose (content, schema) pair already passed (cache in .continue/cache)')
+    p.add_argument('--cache', default=None, help='Pass cache path (default: .continue/cache/validate-json.json under --root)')
+    args = p.parse_args(argv)
+
+    root = Path(args.root)
+    mapping = args.file or list(DEFAULT_MAPPING.items())
+    pairs = [(root / j, root / s) for j, s in mapping]
+    cache = None
+    if args.incremental:
+        cache = PassCache(Path(args.cache) if args.cache else root / DEFAULT_PASS_CACHE)
+    results = validate_many(pairs, jobs=args.jobs, pass_cache=cache)
+
+    failures = []
+    for r in results:
+        rel_json = os.path.relpath(r['path'], root)
+        rel_schema = os.path.relpath(r['schema'], root)
+        if r.get('skipped'):
+            print(f'[SKIP] {rel_json} -> {rel_schema} (unchanged, passed before)')
+        elif r['ok']:
+            print(f'[OK] {rel_json} -> {rel_schema}')
+        else:
+            failures.append((rel_json, r['message']))
+
+    if failures:
+        print('\nValidation failures:')
+        for path, message in failures:
+            print('-', path)
+            print('   ', message)
+        return 2
+
+    print('\nAll validated files OK')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
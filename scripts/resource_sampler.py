@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Live host resource sampler for autoscale decisions.
+
+Reads /proc for per-PID CPU, RSS, threads and I/O and emits rows with the
+same columns as logs/ollama-monitor.csv (written by scripts/monitor-ollama.ps1),
+plus host memory/CPU and GPU memory from a pluggable source. `headroom()`
+turns a snapshot into the budget autoscale_controller packs agents into,
+honouring monitor.MemoryPressureThresholdGB and monitor.CpuPressurePercent
+from config.template.json.
+
+Usage: python scripts/resource_sampler.py --process-name ollama --role ollama --csv logs/ollama-monitor.csv
+"""
+import argparse
+import csv
+import datetime
+import json
+import os
+import shutil
+import subprocess
+import time
+from pathlib import Path
+
+COLUMNS = ['Timestamp', 'PID', 'Role', 'ProcessName', 'CPUPercent', 'WorkingSetMB', 'PrivateMB', 'VirtualMB',
+           'Threads', 'Handles', 'IOReadBytes', 'IOWriteBytes', 'Alive', 'StartTime']
+DEFAULT_THRESHOLDS = {'MemoryPressureThresholdGB': 6, 'CpuPressurePercent': 80}
+
+
+def _now_iso():
+    return datetime.datetime.now().astimezone().isoformat()
+
+
+def _read(path: Path):
+    try:
+        return path.read_text(encoding='utf-8', errors='replace')
+    except OSError:
+        return None
+
+
+def _kv(text, scale=1):
+    """Parse 'Key:   123 kB' style files into {key: number}."""
+    out = {}
+    for line in (text or '').splitlines():
+        key, _, rest = line.partition(':')
+        parts = rest.split()
+        if parts and parts[0].lstrip('-').isdigit():
+            out[key.strip()] = int(parts[0]) * scale
+    return out
+
+
+class ProcSampler:
+    """Per-process and host samples from a /proc tree (Linux).
+
+    Host CPU is always a delta between two readings: the first host() call
+    takes a priming reading `prime_seconds` before the real one, so a one-shot
+    run reports current load rather than the average since boot.
+    """
+
+    def __init__(self, proc_root='/proc', clock=time.monotonic, prime_seconds=0.2, sleep=time.sleep):
+        self.proc = Path(proc_root)
+        self.clock = clock
+        self.prime_seconds = prime_seconds
+        self.sleep = sleep
+        try:
+            self.ticks = os.sysconf('SC_CLK_TCK')
+        except (AttributeError, ValueError, OSError):
+            self.ticks = 100
+        self._prev_cpu = {}
+        self._prev_host = None
+
+    @property
+    def available(self):
+        return (self.proc / 'stat').exists()
+
+    def _boot_time(self):
+        for line in (_read(self.proc / 'stat') or '').splitlines():
+            if line.startswith('btime '):
+                return int(line.split()[1])
+        return None
+
+    def find_pids(self, name):
+        pids = []
+        try:
+            entries = list(self.proc.iterdir())
+        except OSError:
+            return pids
+        for d in entries:
+            if d.name.isdigit() and (_read(d / 'comm') or '').strip() == name:
+                pids.append(int(d.name))
+        return sorted(pids)
+
+    def sample_pid(self, pid, role=''):
+        row = dict.fromkeys(COLUMNS)
+        row.update({'Timestamp': _now_iso(), 'PID': pid, 'Role': role, 'Alive': False})
+        base = self.proc / str(pid)
+        stat = _read(base / 'stat')
+        if not stat:
+            self._prev_cpu.pop(pid, None)
+            return row
+        # comm may contain spaces/parens: fields resume after the last ')'
+        rest = stat[stat.rindex(')') + 2:].split()
+        cpu_ticks = int(rest[11]) + int(rest[12])
+        start_ticks = int(rest[19])
+        now = self.clock()
+        prev = self._prev_cpu.get(pid)
+        if prev and now > prev[1]:
+            cpu = (cpu_ticks - prev[0]) / self.ticks / (now - prev[1]) * 100
+        else:
+            # first sample: average since the process started
+            uptime = float((_read(self.proc / 'uptime') or '0').split()[0])
+            lifetime = uptime - start_ticks / self.ticks
+            cpu = cpu_ticks / self.ticks / lifetime * 100 if lifetime > 0 else None
+        self._prev_cpu[pid] = (cpu_ticks, now)
+
+        status = _kv(_read(base / 'status'))
+        io = _kv(_read(base / 'io'))
+        try:
+            handles = len(os.listdir(base / 'fd'))
+        except OSError:
+            handles = None
+        boot = self._boot_time()
+        row.update({
+            'ProcessName': (_read(base / 'comm') or '').strip() or None,
+            'CPUPercent': round(cpu, 2) if cpu is not None else None,
+            'WorkingSetMB': round(status['VmRSS'] / 1024, 2) if 'VmRSS' in status else None,
+            'PrivateMB': round(status['RssAnon'] / 1024, 2) if 'RssAnon' in status else None,
+            'VirtualMB': round(status['VmSize'] / 1024, 2) if 'VmSize' in status else None,
+            'Threads': status.get('Threads', int(rest[17])),
+            'Handles': handles,
+            'IOReadBytes': io.get('read_bytes'),
+            'IOWriteBytes': io.get('write_bytes'),
+            'Alive': True,
+            'StartTime': (datetime.datetime.fromtimestamp(boot + start_ticks / self.ticks).astimezone().isoformat()
+                          if boot is not None else None),
+        })
+        return row
+
+    def _cpu_times(self):
+        """(idle, total) jiffies from the aggregate cpu line, or None."""
+        line = (_read(self.proc / 'stat') or '').split('\n', 1)[0].split()
+        if not line or line[0] != 'cpu':
+            return None
+        vals = [int(v) for v in line[1:]]
+        return vals[3] + (vals[4] if len(vals) > 4 else 0), sum(vals)
+
+    def host(self):
+        """Host memory (GB) and CPU busy percent since the previous call (None if unmeasured)."""
+        mem = _kv(_read(self.proc / 'meminfo'))
+        out = {
+            'memoryTotalGB': round(mem['MemTotal'] / 1024 ** 2, 2) if 'MemTotal' in mem else None,
+            'memoryAvailableGB': round(mem['MemAvailable'] / 1024 ** 2, 2) if 'MemAvailable' in mem else None,
+            'cpus': os.cpu_count(),
+            'cpuPercent': None,
+        }
+        if self._prev_host is None:
+            self._prev_host = self._cpu_times()
+            if self._prev_host is not None and self.prime_seconds:
+                self.sleep(self.prime_seconds)
+        cur = self._cpu_times()
+        if cur is not None:
+            if self._prev_host and cur[1] > self._prev_host[1]:
+                busy = 1 - (cur[0] - self._prev_host[0]) / (cur[1] - self._prev_host[1])
+                out['cpuPercent'] = round(busy * 100, 2)
+            self._prev_host = cur
+        return out
+
+
+class StaticGpuSource:
+    """A fixed VRAM budget (the old --available-vram behaviour)."""
+
+    def __init__(self, total_gb, used_gb=0):
+        self.total_gb = total_gb
+        self.used_gb = used_gb
+
+    def query(self):
+        return [{'index': 0, 'totalGB': float(self.total_gb), 'usedGB': float(self.used_gb),
+                 'freeGB': float(self.total_gb) - float(self.used_gb)}]
+
+
+class FakeGpuSource(StaticGpuSource):
+    """Scriptable GPU source for tests: `cards` is a list of (totalGB, usedGB)."""
+
+    def __init__(self, cards):
+        self.cards = list(cards)
+
+    def query(self):
+        return [{'index': i, 'totalGB': float(t), 'usedGB': float(u), 'freeGB': float(t) - float(u)}
+                for i, (t, u) in enumerate(self.cards)]
+
+
+class NvidiaSmiSource:
+    def __init__(self, exe='nvidia-smi'):
+        self.exe = exe
+
+    def query(self):
+        if not shutil.which(self.exe):
+            return []
+        try:
+            out = subprocess.run([self.exe, '--query-gpu=index,memory.total,memory.used',
+                                  '--format=csv,noheader,nounits'], capture_output=True, text=True, timeout=5).stdout
+        except (OSError, subprocess.SubprocessError):
+            return []
+        cards = []
+        for line in out.splitlines():
+            parts = [p.strip() for p in line.split(',')]
+            if len(parts) == 3 and all(p.replace('.', '').isdigit() for p in parts):
+                total, used = float(parts[1]) / 1024, float(parts[2]) / 1024
+                cards.append({'index': int(parts[0]), 'totalGB': round(total, 2), 'usedGB': round(used, 2),
+                              'freeGB': round(total - used, 2)})
+        return cards
+
+
+def gpu_source_from_spec(spec, fallback_vram_gb=24):
+    """'nvidia-smi', 'static' or 'static:24', 'fake:24/4,12/0' (total/used per card)."""
+    kind, _, arg = (spec or 'nvidia-smi').partition(':')
+    if kind == 'fake':
+        return FakeGpuSource([tuple(float(x) for x in card.split('/')) for card in arg.split(',') if card])
+    if kind == 'static':
+        return StaticGpuSource(float(arg) if arg else fallback_vram_gb)
+    return NvidiaSmiSource()
+
+
+def snapshot(sampler: ProcSampler, gpu_source, pids=(), role=''):
+    return {
+        'CollectedAt': _now_iso(),
+        'Host': sampler.host() if sampler.available else {},
+        'Gpus': gpu_source.query(),
+        'Samples': [sampler.sample_pid(pid, role) for pid in pids],
+    }
+
+
+def headroom(snap, thresholds=None):
+    """Budget left for new agents: free VRAM per card, RAM above the pressure
+    reserve, and CPUs below the CPU pressure ceiling (None = unknown)."""
+    thresholds = dict(DEFAULT_THRESHOLDS, **(thresholds or {}))
+    host = snap.get('Host') or {}
+    bins = [max(0.0, g['freeGB']) for g in snap.get('Gpus') or []]
+    mem = host.get('memoryAvailableGB')
+    cpus, cpu_pct = host.get('cpus'), host.get('cpuPercent')
+    out = {
+        'vramGB': round(sum(bins), 2) if bins else None,
+        'vramBins': bins or None,
+        'memoryGB': round(max(0.0, mem - thresholds['MemoryPressureThresholdGB']), 2) if mem is not None else None,
+        'cpus': (round(max(0.0, cpus * (thresholds['CpuPressurePercent'] - cpu_pct) / 100), 2)
+                 if cpus and cpu_pct is not None else None),
+    }
+    out['pressure'] = out['memoryGB'] == 0 or out['cpus'] == 0
+    return out
+
+
+def append_csv(path: Path, rows):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    new = not path.exists()
+    with path.open('a', encoding='utf-8', newline='') as f:
+        w = csv.DictWriter(f, fieldnames=COLUMNS)
+        if new:
+            w.writeheader()
+        for r in rows:
+            w.writerow({k: ('' if r.get(k) is None else r.get(k)) for k in COLUMNS})
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument('--pids', default='', help='Comma-separated PIDs to sample')
+    p.add_argument('--process-name', help='Sample every process with this name (e.g. ollama)')
+    p.add_argument('--role', default='')
+    p.add_argument('--gpu-source', default='nvidia-smi', help="nvidia-smi | static[:GB] | fake:TOTAL/USED,...")
+    p.add_argument('--config', default='config.template.json', help='Config providing monitor thresholds')
+    p.add_argument('--csv', help='Append rows to this CSV (ollama-monitor.csv columns)')
+    p.add_argument('--json', help='Write the snapshot to this JSON file')
+    p.add_argument('--interval', type=float, default=0, help='Seconds between samples (0 = once)')
+    args = p.parse_args()
+
+    cfg_path = Path(args.config)
+    cfg = json.loads(cfg_path.read_text(encoding='utf-8-sig')) if cfg_path.exists() else {}
+    sampler = ProcSampler()
+    gpu = gpu_source_from_spec(args.gpu_source)
+    while True:
+        pids = [int(x) for x in args.pids.split(',') if x.strip()]
+        if args.process_name:
+            pids += sampler.find_pids(args.process_name)
+        snap = snapshot(sampler, gpu, pids, args.role)
+        snap['Headroom'] = headroom(snap, cfg.get('monitor'))
+        if args.csv:
+            append_csv(Path(args.csv), snap['Samples'])
+        if args.json:
+            Path(args.json).write_text(json.dumps(snap, indent=2), encoding='utf-8')
+        print(json.dumps(snap))
+        if not args.interval:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Rolling-window telemetry store for autoscale decisions.
+
+A fixed-size ring buffer on disk: a small header followed by `capacity`
+fixed-width binary records, so the file never grows and writing a sample is
+one seek + two small writes. Each record holds the recommended MaxParallel,
+the VRAM budget and the sampled headroom (NaN when not sampled).
+
+`stats()` computes mean, p50, p95 and rate of change (units per second,
+first-to-last over the window) for one field over the last `window` seconds,
+defaulting to monitor.RollingWindow from config.template.json.
+autoscale_controller uses the windowed median for hysteresis so a single
+noisy sample does not trigger a reconfiguration.
+
+Usage: python scripts/telemetry_store.py --path .continue/autoscale-metrics.ring --window 300
+"""
+import argparse
+import json
+import math
+import os
+import struct
+import threading
+import time
+from pathlib import Path
+
+MAGIC = b'ASTR'
+VERSION = 1
+HEADER = struct.Struct('<4sHxxIQQ')  # magic, version, capacity, next write index, total written
+FIELDS = ('ts', 'MaxParallel', 'MaxVramGB', 'usedVramGB', 'headroomVramGB', 'headroomMemoryGB', 'headroomCpus',
+          'agents')
+RECORD = struct.Struct('<' + 'd' * len(FIELDS))
+DEFAULT_CAPACITY = 4096
+DEFAULT_WINDOW = 60.0
+
+
+def percentile(sorted_values, q):
+    """Linear-interpolated percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    pos = (len(sorted_values) - 1) * q
+    lo = int(pos)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (pos - lo)
+
+
+class TelemetryRing:
+    """Fixed-capacity sample ring persisted at `path` (oldest samples overwritten).
+
+    Appends and reads hold a per-instance lock, so threads sharing one ring never
+    see a record slot and the header from different appends.
+    """
+
+    def __init__(self, path: Path, capacity=None):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self.capacity = capacity or self.stored_capacity(self.path) or DEFAULT_CAPACITY
+        self._open()
+
+    @staticmethod
+    def stored_capacity(path: Path):
+        try:
+            with Path(path).open('rb') as f:
+                magic, version, capacity, _, _ = HEADER.unpack(f.read(HEADER.size))
+        except (OSError, struct.error):
+            return None
+        return capacity if magic == MAGIC and version == VERSION else None
+
+    def _open(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fresh = not self.path.exists() or self.path.stat().st_size < HEADER.size
+        if not fresh:
+            with self.path.open('rb') as f:
+                magic, version, capacity, head, total = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC or version != VERSION:
+                fresh = True
+            elif capacity != self.capacity:
+                # keep the newest samples when the configured capacity changes
+                old = TelemetryRing.__new__(TelemetryRing)
+                old.path, old.capacity, old._lock = self.path, capacity, threading.Lock()
+                keep = old.records()[-self.capacity:]
+                self._reset()
+                for rec in keep:
+                    self.append(rec)
+                return
+        if fresh:
+            self._reset()
+
+    def _reset(self):
+        tmp = self.path.with_suffix(self.path.suffix + '.tmp')
+        with tmp.open('wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, self.capacity, 0, 0))
+            f.truncate(HEADER.size + RECORD.size * self.capacity)
+        tmp.replace(self.path)
+
+    def _header(self, f):
+        f.seek(0)
+        _, _, _, head, total = HEADER.unpack(f.read(HEADER.size))
+        return head, total
+
+    def append(self, sample: dict):
+        values = []
+        for name in FIELDS:
+            v = sample.get(name)
+            values.append(float('nan') if v is None else float(v))
+        with self._lock, self.path.open('r+b') as f:
+            head, total = self._header(f)
+            f.seek(HEADER.size + RECORD.size * head)
+            f.write(RECORD.pack(*values))
+            # the header moves only after the record is in place
+            f.seek(0)
+            f.write(HEADER.pack(MAGIC, VERSION, self.capacity, (head + 1) % self.capacity, total + 1))
+
+    def __len__(self):
+        with self._lock, self.path.open('rb') as f:
+            return min(self._header(f)[1], self.capacity)
+
+    def records(self, since=None):
+        """Samples oldest first (only those with ts >= `since` when given)."""
+        with self._lock, self.path.open('rb') as f:
+            head, total = self._header(f)
+            count = min(total, self.capacity)
+            start = (head - count) % self.capacity
+            f.seek(HEADER.size)
+            raw = f.read(RECORD.size * self.capacity)
+        out = []
+        for i in range(count):
+            slot = (start + i) % self.capacity
+            rec = dict(zip(FIELDS, RECORD.unpack_from(raw, slot * RECORD.size)))
+            if since is not None and rec['ts'] < since:
+                continue
+            out.append({k: (None if isinstance(v, float) and math.isnan(v) else v) for k, v in rec.items()})
+        return out
+
+    def stats(self, field, window=DEFAULT_WINDOW, now=None):
+        """Aggregates of `field` over the last `window` seconds."""
+        now = time.time() if now is None else now
+        points = [(r['ts'], r[field]) for r in self.records(since=now - window) if r[field] is not None]
+        return summarize(points)
+
+    def window_stats(self, window=DEFAULT_WINDOW, now=None, fields=('MaxParallel', 'MaxVramGB', 'headroomVramGB')):
+        now = time.time() if now is None else now
+        recs = self.records(since=now - window)
+        return {f: summarize([(r['ts'], r[f]) for r in recs if r[f] is not None]) for f in fields}
+
+
+def summarize(points):
+    """count/mean/p50/p95/min/max and rate (per second) of (ts, value) points in time order."""
+    if not points:
+        return {'count': 0, 'mean': None, 'p50': None, 'p95': None, 'min': None, 'max': None, 'rate': None}
+    values = sorted(v for _, v in points)
+    span = points[-1][0] - points[0][0]
+    return {
+        'count': len(values),
+        'mean': sum(values) / len(values),
+        'p50': percentile(values, 0.5),
+        'p95': percentile(values, 0.95),
+        'min': values[0],
+        'max': values[-1],
+        'rate': (points[-1][1] - points[0][1]) / span if span > 0 else 0.0,
+    }
+
+
+def sample_from(out):
+    """Ring sample from an autoscale_controller output document."""
+    rec = out.get('recommendation') or {}
+    head = out.get('headroom') or {}
+    return {
+        'ts': time.time(),
+        'MaxParallel': rec.get('MaxParallel'),
+        'MaxVramGB': rec.get('MaxVramGB'),
+        'usedVramGB': rec.get('usedVramGB'),
+        'headroomVramGB': head.get('vramGB'),
+        'headroomMemoryGB': head.get('memoryGB'),
+        'headroomCpus': head.get('cpus'),
+        'agents': rec.get('agentCount'),
+    }
+
+
+def stable_change(prev, cur, window_stats, pct_threshold=0.2, abs_parallel=1):
+    """Hysteresis check: reconfigure only when the windowed median of MaxParallel
+    (or MaxVramGB) moved away from the applied suggestion `prev` by the
+    threshold and the current sample points the same way."""
+    if not prev:
+        return True
+    try:
+        applied = prev.get('recommendation', {})
+        now = cur.get('recommendation', {})
+
+        def moved(field, significant):
+            before, current = applied.get(field, 0), now.get(field, 0)
+            median = (window_stats.get(field) or {}).get('p50')
+            median = current if median is None else median
+            return significant(before, median) and (current - before) * (median - before) > 0
+
+        if moved('MaxParallel', lambda a, b: abs(b - a) >= abs_parallel):
+            return True
+        if not applied.get('MaxVramGB', 0):
+            return True
+        return moved('MaxVramGB', lambda a, b: abs(b - a) / max(1, a) >= pct_threshold)
+    except Exception:
+        return True
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument('--path', default=os.path.join('.continue', 'autoscale-metrics.ring'))
+    p.add_argument('--window', type=float, default=None, help='Seconds (default: monitor.RollingWindow)')
+    p.add_argument('--config', default='config.template.json')
+    p.add_argument('--field', action='append', default=[], help='Field to aggregate (repeatable)')
+    p.add_argument('--raw', action='store_true', help='Print the samples in the window instead of aggregates')
+    args = p.parse_args()
+
+    window = args.window
+    if window is None:
+        cfg = Path(args.config)
+        monitor = json.loads(cfg.read_text(encoding='utf-8-sig')).get('monitor', {}) if cfg.exists() else {}
+        window = float(monitor.get('RollingWindow', DEFAULT_WINDOW))
+    path = Path(args.path)
+    if not path.exists():
+        print(json.dumps({'window': window, 'count': 0}))
+        return
+    ring = TelemetryRing(path)
+    if args.raw:
+        for rec in ring.records(since=time.time() - window):
+            print(json.dumps(rec))
+        return
+    fields = tuple(args.field) or ('MaxParallel', 'MaxVramGB', 'headroomVramGB')
+    print(json.dumps({'window': window, 'stats': ring.window_stats(window, fields=fields)}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
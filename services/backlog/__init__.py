@@ -1,3 +1,3 @@
 """Backlog service package."""
 
-__all__ = ["backlog_store", "jira_stub"]
+__all__ = ["backlog_store", "bulk", "jira_stub", "server", "storage"]
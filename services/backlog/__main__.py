@@ -2,34 +2,76 @@
 from __future__ import annotations
 
 import argparse
+import json
+import sys
 from pathlib import Path
+from services.backlog import bulk
 from services.backlog.backlog_store import BacklogStore
+from services.backlog.jira_stub import JiraStub, mirror_items
 
 
 def main(argv=None):
     p = argparse.ArgumentParser()
-    p.add_argument("command", choices=["list", "add", "status"], help="command")
+    p.add_argument("command", choices=["list", "add", "status", "import", "export", "compact", "jira-sync"], help="command")
     p.add_argument("--title", help="title for add")
     p.add_argument("--description", help="description for add")
     p.add_argument("--id", type=int, help="id for status update")
     p.add_argument("--status", help="new status")
+    p.add_argument("--priority", default="medium", choices=["critical", "high", "medium", "low"], help="priority for add")
+    p.add_argument("--skills", default="", help="comma-separated skills an agent needs to claim the item (add)")
+    p.add_argument("--cost", type=float, help="estimated VRAM GB the work needs (add)")
+    p.add_argument("--db", default=str(Path.cwd() / "services" / "backlog" / "backlog_store.json"),
+                   help="store path; .sqlite/.sqlite3/.db selects SQLite, .journal the snapshot + journal backend")
+    p.add_argument("--file", help="import/export file: .json replaces/dumps the whole store, "
+                                  ".jsonl/.csv stream records ('-' for stdin/stdout with --format)")
+    p.add_argument("--format", choices=["jsonl", "csv"], help="record format when --file has no suffix or is '-'")
+    p.add_argument("--batch-size", type=int, default=1000, help="records per write when importing")
+    p.add_argument("--filter-status", default="open", help="jira-sync: mirror items with this status ('' for all)")
     args = p.parse_args(argv)
 
-    store = BacklogStore(path=Path.cwd() / "services" / "backlog" / "backlog_store.json")
+    store = BacklogStore(path=Path(args.db))
 
     if args.command == "list":
-        for it in store.list():
-            print(f"{it.id}: {it.title} ({it.status})")
+        for it in store.iter_all():
+            print(f"{it.id}: {it.title} ({it.status}, {it.priority})")
     elif args.command == "add":
         if not args.title:
             p.error("--title required for add")
-        item = store.add(args.title, args.description)
+        skills = [s.strip() for s in args.skills.split(",") if s.strip()]
+        item = store.add(args.title, args.description, priority=args.priority, required_skills=skills,
+                         estimated_cost=args.cost)
         print(f"added {item.id}")
     elif args.command == "status":
         if not args.id or not args.status:
             p.error("--id and --status required for status")
         ok = store.update_status(args.id, args.status)
         print("ok" if ok else "not found")
+    elif args.command == "compact":
+        store.compact()
+        print("ok")
+    elif args.command == "jira-sync":
+        items = [i for i in store.iter_all() if not args.filter_status or i.status == args.filter_status]
+        print(json.dumps(mirror_items(JiraStub(), items)))
+    elif args.command in ("import", "export"):
+        if not args.file:
+            p.error(f"--file required for {args.command}")
+        path = Path(args.file)
+        if args.file == "-":
+            fmt = args.format or "jsonl"
+            if args.command == "import":
+                print(f"imported {bulk.import_stream(store, sys.stdin, fmt, args.batch_size)}", file=sys.stderr)
+            else:
+                bulk.write_items(sys.stdout, store.iter_all(), fmt)
+        elif path.suffix.lower() == ".json" and not args.format:
+            if args.command == "import":
+                print(f"imported {store.import_json(path)}")
+            else:
+                print(f"exported {store.export_json(path)}")
+        elif args.command == "import":
+            print(f"imported {bulk.import_file(store, path, args.format, args.batch_size)}")
+        else:
+            print(f"exported {bulk.export_file(store, path, args.format)}")
+    store.close()
 
 
 if __name__ == "__main__":
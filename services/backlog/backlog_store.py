@@ -1,90 +1,125 @@
-"""Simple JSON-backed backlog store."""
+"""Backlog store over a pluggable storage backend (JSON file, journal or SQLite)."""
 from __future__ import annotations
 
 import json
-from dataclasses import dataclass, asdict
+import time
 from pathlib import Path
-from typing import List, Optional
+from typing import FrozenSet, Iterable, Iterator, List, Mapping, Optional, Tuple, Union
+
+from services.backlog.storage import BacklogItem, StorageBackend, item_from_dict, item_to_dict, open_backend
 
 DEFAULT_DB = Path.cwd() / "services" / "backlog" / "backlog_store.json"
 
-@dataclass
-class BacklogItem:
-    id: int
-    title: str
-    description: Optional[str] = None
-    status: str = "open"
-    owner: Optional[str] = None
+__all__ = ["BacklogItem", "BacklogStore", "DEFAULT_DB"]
 
 
 class BacklogStore:
-    def __init__(self, path: Optional[Path] = None):
+    def __init__(self, path: Optional[Path] = None, backend: Optional[StorageBackend] = None, clock=time.time):
         self.path = Path(path) if path else DEFAULT_DB
-        self._items: List[BacklogItem] = []
-        self._load()
-
-    def _load(self):
-        if not self.path.exists():
-            self._items = []
-            return
-        try:
-            data = json.loads(self.path.read_text(encoding="utf-8-sig"))
-            self._items = [BacklogItem(**it) for it in data]
-        except Exception:
-            self._items = []
-
-    def _persist(self):
-        self.path.write_text(json.dumps([asdict(i) for i in self._items], indent=2), encoding="utf-8")
-
-    def list(self) -> List[BacklogItem]:
-        return list(self._items)
-
-    def list_open(self) -> List[BacklogItem]:
-        return [i for i in self._items if i.status == "open"]
-
-    def add(self, title: str, description: Optional[str] = None) -> BacklogItem:
-        nid = 1 if not self._items else max(i.id for i in self._items) + 1
-        item = BacklogItem(id=nid, title=title, description=description)
-        self._items.append(item)
-        self._persist()
-        return item
+        self.backend = backend or open_backend(self.path)
+        self.clock = clock
+
+    def _lease(self, lease_seconds: Optional[float]) -> Optional[float]:
+        return None if lease_seconds is None else self.clock() + lease_seconds
+
+    def list(self, offset: int = 0, limit: Optional[int] = None) -> List[BacklogItem]:
+        if offset or limit is not None:
+            return self.backend.page(offset, limit)
+        return self.backend.all()
+
+    def list_open(self, offset: int = 0, limit: Optional[int] = None) -> List[BacklogItem]:
+        if offset or limit is not None:
+            return self.backend.page(offset, limit, "open")
+        return self.backend.by_status("open")
+
+    def iter_all(self) -> Iterator[BacklogItem]:
+        return self.backend.iter_status()
+
+    def iter_open(self) -> Iterator[BacklogItem]:
+        """Open items in id order without materializing them all (SQLite reads in batches)."""
+        return self.backend.iter_status("open")
+
+    def list_owned(self, owner: str) -> List[BacklogItem]:
+        return self.backend.by_owner(owner)
+
+    def add(self, title: str, description: Optional[str] = None, priority: str = "medium",
+            required_skills: Optional[Iterable[str]] = None, estimated_cost: Optional[float] = None) -> BacklogItem:
+        return self.backend.insert(title, description, priority=priority,
+                                   required_skills=sorted(set(required_skills or ())), estimated_cost=estimated_cost)
+
+    def add_many(self, records: Iterable[Mapping]) -> List[BacklogItem]:
+        """Add one item per record (keys as for add()) and persist once for the whole batch."""
+        batch = []
+        for rec in records:
+            if not rec.get("title"):
+                raise ValueError(f"record without title: {dict(rec)!r}")
+            skills = rec.get("required_skills") or ()
+            if isinstance(skills, str):
+                skills = skills.split(",")
+            batch.append({
+                "title": rec["title"],
+                "description": rec.get("description"),
+                "priority": rec.get("priority") or "medium",
+                "required_skills": sorted({s.strip() for s in skills if s.strip()}),
+                "estimated_cost": rec.get("estimated_cost"),
+            })
+        return self.backend.insert_many(batch)
+
+    def update_many(self, updates: Union[Mapping[int, dict], Iterable[Tuple[int, dict]]]) -> int:
+        """Apply `{item_id: changes}` in one write; returns how many items were found."""
+        pairs = updates.items() if isinstance(updates, Mapping) else updates
+        return self.backend.update_many((int(i), dict(c)) for i, c in pairs)
 
     def get(self, item_id: int) -> Optional[BacklogItem]:
-        for it in self._items:
-            if it.id == item_id:
-                return it
-        return None
+        return self.backend.get(item_id)
 
     def update_status(self, item_id: int, status: str) -> bool:
-        it = self.get(item_id)
-        if not it:
-            return False
-        it.status = status
-        self._persist()
-        return True
-
-    def claim(self, item_id: int, owner: str) -> bool:
-        it = self.get(item_id)
-        if not it or it.status != "open":
-            return False
-        it.status = "claimed"
-        it.owner = owner
-        self._persist()
-        return True
-
-    def release(self, item_id: int) -> bool:
-        it = self.get(item_id)
-        if not it or it.status != "claimed":
-            return False
-        it.status = "open"
-        it.owner = None
-        self._persist()
-        return True
+        return self.backend.update(item_id, status=status)
+
+    def claim(self, item_id: int, owner: str, lease_seconds: Optional[float] = None) -> bool:
+        return self.backend.update(item_id, expect_status="open", status="claimed", owner=owner,
+                                   lease_expires=self._lease(lease_seconds))
+
+    def claim_batch(self, owner: str, n: int, lease_seconds: Optional[float] = None,
+                    skills: Optional[FrozenSet[str]] = None, capacity: Optional[float] = None) -> List[BacklogItem]:
+        """Atomically claim up to `n` open items, best priority then oldest first.
+
+        Only items whose required skills are all in `skills` and whose
+        estimated cost fits `capacity` qualify (None disables either check).
+        Expired leases are reclaimed first.
+        """
+        return self.backend.claim_open(owner, n, self._lease(lease_seconds), self.clock(), skills, capacity)
+
+    def heartbeat(self, item_id: int, owner: str, lease_seconds: float) -> bool:
+        """Extend `owner`'s lease; False if the item was released, reclaimed or finished."""
+        return self.backend.update(item_id, expect_status="claimed", expect_owner=owner,
+                                   lease_expires=self._lease(lease_seconds))
+
+    def expire_leases(self) -> int:
+        return self.backend.expire_leases(self.clock())
+
+    def release(self, item_id: int, owner: Optional[str] = None) -> bool:
+        return self.backend.update(item_id, expect_status="claimed", expect_owner=owner, status="open", owner=None,
+                                   lease_expires=None)
 
     def complete(self, item_id: int) -> bool:
-        it = self.get(item_id)
-        if not it:
-            return False
-        it.status = "done"
-        self._persist()
-        return True
+        return self.backend.update(item_id, status="done", lease_expires=None)
+
+    def import_json(self, path: Path) -> int:
+        """Replace the store's contents with a backlog_store.json style file."""
+        data = json.loads(Path(path).read_text(encoding="utf-8-sig"))
+        return self.backend.replace_all(item_from_dict(it) for it in data)
+
+    def export_json(self, path: Path) -> int:
+        items = [item_to_dict(i) for i in self.iter_all()]
+        Path(path).write_text(json.dumps(items, indent=2), encoding="utf-8")
+        return len(items)
+
+    def compact(self):
+        self.backend.compact()
+
+    def flush(self):
+        self.backend.flush()
+
+    def close(self):
+        self.backend.close()
@@ -0,0 +1,86 @@
+"""Streaming JSONL/CSV import and export for the backlog store.
+
+Import reads records one line at a time and adds them in batches through
+`BacklogStore.add_many`, so seeding thousands of items costs one write per
+batch instead of one process launch and one full rewrite per item.
+"""
+from __future__ import annotations
+
+import csv
+import json
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, TextIO
+
+from services.backlog.storage import FIELD_NAMES, BacklogItem, item_to_dict
+
+FIELDS = list(FIELD_NAMES)
+_NUMERIC = {"id": int, "estimated_cost": float, "lease_expires": float}
+
+
+def detect_format(path: Path, fmt: str = None) -> str:
+    fmt = fmt or Path(path).suffix.lower().lstrip(".")
+    if fmt not in ("jsonl", "csv"):
+        raise ValueError(f"unsupported format {fmt!r}: use .jsonl or .csv")
+    return fmt
+
+
+def read_records(fh: TextIO, fmt: str) -> Iterator[Dict]:
+    """Yield one dict per JSONL line / CSV row; empty CSV cells become None."""
+    if fmt == "jsonl":
+        for line in fh:
+            if line.strip():
+                yield json.loads(line)
+        return
+    for row in csv.DictReader(fh):
+        rec = {k: (v if v != "" else None) for k, v in row.items() if k}
+        for k, cast in _NUMERIC.items():
+            if rec.get(k) is not None:
+                rec[k] = cast(rec[k])
+        yield rec
+
+
+def write_items(fh: TextIO, items: Iterable[BacklogItem], fmt: str) -> int:
+    count = 0
+    if fmt == "csv":
+        w = csv.DictWriter(fh, fieldnames=FIELDS)
+        w.writeheader()
+    for it in items:
+        rec = item_to_dict(it)
+        if fmt == "jsonl":
+            fh.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        else:
+            rec["required_skills"] = ",".join(rec["required_skills"])
+            w.writerow(rec)
+        count += 1
+    return count
+
+
+def _batches(records: Iterable[Dict], size: int) -> Iterator[list]:
+    batch = []
+    for rec in records:
+        batch.append(rec)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def import_stream(store, fh: TextIO, fmt: str, batch_size: int = 1000) -> int:
+    """Add every record read from `fh` as a new open item; returns the count."""
+    added = 0
+    for batch in _batches(read_records(fh, fmt), batch_size):
+        added += len(store.add_many(batch))
+    return added
+
+
+def import_file(store, path: Path, fmt: str = None, batch_size: int = 1000) -> int:
+    fmt = detect_format(path, fmt)
+    with open(path, encoding="utf-8-sig", newline="") as fh:
+        return import_stream(store, fh, fmt, batch_size)
+
+
+def export_file(store, path: Path, fmt: str = None) -> int:
+    fmt = detect_format(path, fmt)
+    with open(path, "w", encoding="utf-8", newline="") as fh:
+        return write_items(fh, store.iter_all(), fmt)
@@ -1,28 +1,78 @@
 """Minimal controller wrapping BacklogStore for local agents."""
 from __future__ import annotations
 
-from typing import Optional
+import json
+import time
+from typing import Dict, FrozenSet, List, Optional, Tuple
 from services.backlog.backlog_store import BacklogStore, BacklogItem
 from pathlib import Path
 
+# Seconds a claim stays valid without a heartbeat; None disables expiry.
+DEFAULT_LEASE_SECONDS = 300.0
+DEFAULT_ROLES = Path.cwd() / ".continue" / "agent-roles.json"
+
+
+def load_agent_profiles(path: Path) -> Optional[Dict[str, Tuple[FrozenSet[str], Optional[float]]]]:
+    """Map agent name -> (skills, vramGB) from agent-roles.json; None if the file is absent."""
+    if not path.exists():
+        return None
+    data = json.loads(path.read_text(encoding="utf-8-sig"))
+    roles = data.get("agentRoles", {}) if isinstance(data, dict) else data
+    agents = roles.get("agents", []) if isinstance(roles, dict) else roles
+    return {a["name"]: (frozenset(a.get("skills", [])), (a.get("resources") or {}).get("vramGB"))
+            for a in agents if a.get("name")}
+
 
 class Controller:
-    def __init__(self, db_path: Optional[Path] = None):
+    def __init__(self, db_path: Optional[Path] = None, lease_seconds: Optional[float] = DEFAULT_LEASE_SECONDS,
+                 roles_path: Optional[Path] = None):
         self.store = BacklogStore(path=db_path)
+        self.lease_seconds = lease_seconds
+        self.roles_path = Path(roles_path) if roles_path else DEFAULT_ROLES
+        self._profiles = None
+        self._profiles_loaded = False
+
+    def profile(self, owner: str) -> Tuple[Optional[FrozenSet[str]], Optional[float]]:
+        """(skills, capacity) for `owner`: unrestricted without a roles file,
+        skill-free work only for agents the roles file does not list."""
+        if not self._profiles_loaded:
+            self._profiles = load_agent_profiles(self.roles_path)
+            self._profiles_loaded = True
+        if self._profiles is None:
+            return None, None
+        return self._profiles.get(owner, (frozenset(), None))
 
-    def claim_next(self, owner: str) -> Optional[BacklogItem]:
-        opens = self.store.list_open()
-        if not opens:
-            return None
-        item = opens[0]
-        ok = self.store.claim(item.id, owner)
-        return self.store.get(item.id) if ok else None
+    def claim_next(self, owner: str, wait: float = 0) -> Optional[BacklogItem]:
+        items = self.claim_batch(owner, 1, wait)
+        return items[0] if items else None
 
-    def release(self, item_id: int) -> bool:
-        return self.store.release(item_id)
+    def claim_batch(self, owner: str, n: int, wait: float = 0, poll: float = 0.5) -> List[BacklogItem]:
+        """Claim up to `n` items, polling the store for up to `wait` seconds
+        (the backlog server long-polls instead, see server.py)."""
+        skills, capacity = self.profile(owner)
+        deadline = time.monotonic() + wait
+        while True:
+            items = self.store.claim_batch(owner, n, self.lease_seconds, skills, capacity)
+            if items or time.monotonic() >= deadline:
+                return items
+            time.sleep(min(poll, max(0.0, deadline - time.monotonic())))
+
+    def heartbeat(self, item_id: int, owner: str) -> bool:
+        return self.store.heartbeat(item_id, owner, self.lease_seconds)
+
+    def release(self, item_id: int, owner: Optional[str] = None) -> bool:
+        return self.store.release(item_id, owner)
 
     def complete(self, item_id: int) -> bool:
         return self.store.complete(item_id)
 
     def list_open(self):
         return self.store.list_open()
+
+    def iter_open(self, offset: int = 0, limit: Optional[int] = None):
+        if offset or limit is not None:
+            return iter(self.store.list_open(offset, limit))
+        return self.store.iter_open()
+
+    def close(self):
+        self.store.close()
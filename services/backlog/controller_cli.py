@@ -1,42 +1,91 @@
-"""CLI for controller: claim-next, list-open, release, complete."""
+"""CLI for controller: claim-next, claim-batch, heartbeat, list-open, release, complete."""
 from __future__ import annotations
 
 import argparse
 import json
-from services.backlog.controller import Controller
+import os
+import sys
+from services.backlog.controller import DEFAULT_LEASE_SECONDS, Controller
+from services.backlog.storage import item_to_dict
 from pathlib import Path
 
 
+def write_items(out, items, jsonl: bool = False):
+    """Stream items as they are read: JSONL, or a JSON array laid out like json.dumps(indent=2)."""
+    if jsonl:
+        for it in items:
+            out.write(json.dumps(item_to_dict(it)) + "\n")
+        return
+    sep = "[\n"
+    for it in items:
+        out.write(sep + "\n".join("  " + line for line in json.dumps(item_to_dict(it), indent=2).splitlines()))
+        sep = ",\n"
+    out.write("[]\n" if sep == "[\n" else "\n]\n")
+
+
 def main(argv=None):
     p = argparse.ArgumentParser()
+    p.add_argument("--db", default=str(Path.cwd() / "services" / "backlog" / "backlog_store.json"),
+                   help="store path; .sqlite/.sqlite3/.db selects SQLite, .journal the snapshot + journal backend")
+    p.add_argument("--roles", help="agent-roles.json used to match owner skills (default .continue/agent-roles.json)")
+    p.add_argument("--lease", type=float, default=DEFAULT_LEASE_SECONDS,
+                   help="claim lease in seconds; 0 means claims never expire")
+    p.add_argument("--server", default=os.environ.get("BACKLOG_SERVER"),
+                   help="address of a running `python -m services.backlog.server` (host:port or unix:/path)")
     sub = p.add_subparsers(dest="cmd")
 
     s_claim = sub.add_parser("claim-next")
     s_claim.add_argument("--owner", required=True)
+    s_claim.add_argument("--wait", type=float, default=0, help="seconds to wait for claimable work")
+
+    s_batch = sub.add_parser("claim-batch")
+    s_batch.add_argument("--owner", required=True)
+    s_batch.add_argument("-n", type=int, default=5)
+    s_batch.add_argument("--wait", type=float, default=0, help="seconds to wait for claimable work")
+
+    s_beat = sub.add_parser("heartbeat")
+    s_beat.add_argument("id", type=int)
+    s_beat.add_argument("--owner", required=True)
 
     s_list = sub.add_parser("list-open")
+    s_list.add_argument("--offset", type=int, default=0)
+    s_list.add_argument("--limit", type=int)
+    s_list.add_argument("--jsonl", action="store_true", help="one compact JSON object per line")
 
     s_release = sub.add_parser("release")
     s_release.add_argument("id", type=int)
+    s_release.add_argument("--owner", help="only release if still held by this owner")
 
     s_complete = sub.add_parser("complete")
     s_complete.add_argument("id", type=int)
 
     args = p.parse_args(argv)
-    controller = Controller(db_path=Path.cwd() / "services" / "backlog" / "backlog_store.json")
+    if args.server:
+        from services.backlog.server import RemoteController
+
+        controller = RemoteController(args.server)
+    else:
+        controller = Controller(db_path=Path(args.db), lease_seconds=args.lease or None,
+                                roles_path=Path(args.roles) if args.roles else None)
 
     if args.cmd == "claim-next":
-        it = controller.claim_next(args.owner)
-        print(json.dumps({"claimed": it is not None, "item": it.__dict__ if it else None}, indent=2))
+        it = controller.claim_next(args.owner, args.wait)
+        print(json.dumps({"claimed": it is not None, "item": item_to_dict(it) if it else None}, indent=2))
+    elif args.cmd == "claim-batch":
+        items = controller.claim_batch(args.owner, args.n, args.wait)
+        print(json.dumps({"claimed": len(items), "items": [item_to_dict(i) for i in items]}, indent=2))
+    elif args.cmd == "heartbeat":
+        ok = controller.heartbeat(args.id, args.owner)
+        print("ok" if ok else "lost")
     elif args.cmd == "list-open":
-        items = controller.list_open()
-        print(json.dumps([i.__dict__ for i in items], indent=2))
+        write_items(sys.stdout, controller.iter_open(args.offset, args.limit), args.jsonl)
     elif args.cmd == "release":
-        ok = controller.release(args.id)
+        ok = controller.release(args.id, args.owner)
         print("ok" if ok else "not found")
     elif args.cmd == "complete":
         ok = controller.complete(args.id)
         print("ok" if ok else "not found")
+    controller.close()
 
 
 if __name__ == "__main__":
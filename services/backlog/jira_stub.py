@@ -5,7 +5,7 @@ This module simulates creating issues and returning an ID.
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Dict, Optional
+from typing import Dict, Iterable, List, Optional, Tuple
 
 
 @dataclass
@@ -27,5 +27,16 @@ class JiraStub:
         self._issues[key] = issue
         return issue
 
+    def create_issues(self, issues: Iterable[Tuple[str, Optional[str]]]) -> List[JiraIssue]:
+        """Bulk create from `(summary, description)` pairs in one call."""
+        return [self.create_issue(summary, description) for summary, description in issues]
+
     def get_issue(self, key: str) -> Optional[JiraIssue]:
         return self._issues.get(key)
+
+
+def mirror_items(jira: JiraStub, items) -> Dict[int, str]:
+    """Create one issue per backlog item in a single bulk call; returns item id -> issue key."""
+    items = list(items)
+    issues = jira.create_issues((it.title, it.description) for it in items)
+    return {it.id: issue.key for it, issue in zip(items, issues)}
@@ -0,0 +1,463 @@
+"""Resident backlog server and client.
+
+Keeps one Controller/BacklogStore open and serves it over local HTTP
+(`host:port`) or a Unix socket (`unix:/path`), so agents neither pay process
+startup nor re-parse the store on every poll. Mutations go through the
+store's backend as usual; the server adds change notifications on top.
+
+Endpoints (JSON in and out):
+
+    GET  /health
+    GET  /items?status=open&owner=NAME     list items (also &offset=N&limit=M)
+    GET  /items/ID
+    POST /items                            {"title": ...} or a list of them
+    POST /claim                            {"owner", "n": 1, "wait": 0} -> {"items": [...]}
+    POST /items/ID/release                 {"owner": optional}
+    POST /items/ID/complete
+    POST /items/ID/heartbeat               {"owner"}
+    GET  /wait?since=V&timeout=S           long-poll until an item opens after version V
+
+`/claim` with `wait` > 0 blocks until an item the owner may take appears.
+Items opened by other processes writing the same store (and expired leases)
+are noticed by a watcher that polls every `poll` seconds. The watcher keeps
+the open ids and lease deadlines from the server's own mutations and only
+rescans the store when the backend's change stamp shows another writer.
+
+    python -m services.backlog.server --db backlog.sqlite --address 127.0.0.1:8766
+"""
+from __future__ import annotations
+
+import argparse
+import heapq
+import http.client
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Optional
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+from services.backlog.controller import DEFAULT_LEASE_SECONDS, Controller
+from services.backlog.storage import item_from_dict, item_to_dict
+
+DEFAULT_ADDRESS = "127.0.0.1:8766"
+
+
+class BacklogService:
+    def __init__(self, controller: Controller, poll: float = 1.0):
+        self.controller = controller
+        self.store = controller.store
+        self.poll = poll
+        self.version = 0
+        self.open_version = 0
+        self._store_lock = threading.Lock()
+        self._cond = threading.Condition()
+        self._open_ids = set()
+        self._leases = []  # heap of (lease_expires, id) for claimed items; stale entries are skipped
+        self._stamp = None
+        self._stop = threading.Event()
+        self._watcher = None
+        with self._store_lock:
+            self._rescan()
+
+    def _rescan(self):
+        """Rebuild the open ids and lease deadlines from the store (store lock held)."""
+        self._stamp = self.store.backend.change_stamp()
+        open_ids, leases = set(), []
+        for it in self.store.iter_all():
+            if it.status == "open":
+                open_ids.add(it.id)
+            elif it.status == "claimed" and it.lease_expires is not None:
+                leases.append((it.lease_expires, it.id))
+        heapq.heapify(leases)
+        new, self._open_ids, self._leases = open_ids - self._open_ids, open_ids, leases
+        return new
+
+    def _track_lease(self, item):
+        if item is not None and item.status == "claimed" and item.lease_expires is not None:
+            heapq.heappush(self._leases, (item.lease_expires, item.id))
+
+    def _changed(self, opened: bool):
+        with self._cond:
+            self.version += 1
+            if opened:
+                self.open_version = self.version
+            self._cond.notify_all()
+
+    def _call(self, fn, *args, opened: bool = False, notify: bool = True):
+        with self._store_lock:
+            result = fn(*args)
+        if notify and result:
+            self._changed(opened)
+        return result
+
+    def check_external(self):
+        """Expire due leases and notice items opened by other writers of the same store."""
+        with self._store_lock:
+            new = set()
+            stamp = self.store.backend.change_stamp()
+            if stamp is None or stamp != self._stamp:
+                new = self._rescan()
+            now = self.store.clock()
+            if self._leases and self._leases[0][0] <= now:
+                due = set()
+                while self._leases and self._leases[0][0] <= now:
+                    due.add(heapq.heappop(self._leases)[1])
+                # a claim may already have reopened some of them, so check every due id
+                self.store.expire_leases()
+                for item_id in due:
+                    it = self.store.get(item_id)
+                    if it is not None and it.status == "open":
+                        if item_id not in self._open_ids:
+                            self._open_ids.add(item_id)
+                            new.add(item_id)
+                    else:
+                        # heartbeat moved the deadline (or another writer did)
+                        self._track_lease(it)
+        if new:
+            self._changed(True)
+
+    def start_watcher(self):
+        def run():
+            while not self._stop.wait(self.poll):
+                try:
+                    self.check_external()
+                except Exception:
+                    pass
+
+        self._watcher = threading.Thread(target=run, daemon=True)
+        self._watcher.start()
+
+    def stop(self):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+
+    def wait_for_open(self, since: int, timeout: float) -> int:
+        """Block until an item opens after version `since`; returns the open version."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self.open_version <= since and not self._stop.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            return self.open_version
+
+    def items(self, status: Optional[str] = None, owner: Optional[str] = None, offset: int = 0,
+              limit: Optional[int] = None):
+        with self._store_lock:
+            if owner:
+                items = [i for i in self.store.list_owned(owner) if not status or i.status == status]
+                return items[offset:None if limit is None else offset + limit]
+            return self.store.backend.page(offset, limit, status or None)
+
+    def get(self, item_id: int):
+        with self._store_lock:
+            return self.store.get(item_id)
+
+    def add(self, records):
+        def add_many(records):
+            items = self.store.add_many(records)
+            self._open_ids.update(i.id for i in items)
+            return items
+        return self._call(add_many, records, opened=True)
+
+    def claim(self, owner: str, n: int = 1, wait: float = 0):
+        deadline = time.monotonic() + wait
+        while True:
+            since = self.open_version
+            items = self._call(self._claim_batch, owner, n)
+            remaining = deadline - time.monotonic()
+            if items or remaining <= 0 or self._stop.is_set():
+                return items
+            self.wait_for_open(since, remaining)
+
+    def _claim_batch(self, owner: str, n: int):
+        items = self.controller.claim_batch(owner, n)
+        for it in items:
+            self._open_ids.discard(it.id)
+            self._track_lease(it)
+        return items
+
+    def _release(self, item_id: int, owner: Optional[str]):
+        ok = self.controller.release(item_id, owner)
+        if ok:
+            self._open_ids.add(item_id)
+        return ok
+
+    def _complete(self, item_id: int):
+        ok = self.controller.complete(item_id)
+        if ok:
+            self._open_ids.discard(item_id)
+        return ok
+
+    def _heartbeat(self, item_id: int, owner: str):
+        ok = self.controller.heartbeat(item_id, owner)
+        if ok:
+            self._track_lease(self.store.get(item_id))
+        return ok
+
+    def release(self, item_id: int, owner: Optional[str] = None) -> bool:
+        return self._call(self._release, item_id, owner, opened=True)
+
+    def complete(self, item_id: int) -> bool:
+        return self._call(self._complete, item_id)
+
+    def heartbeat(self, item_id: int, owner: str) -> bool:
+        return self._call(self._heartbeat, item_id, owner, notify=False)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "backlog/1"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def address_string(self):
+        return str(self.client_address[0] if isinstance(self.client_address, tuple) else "unix")
+
+    def _send(self, status: int, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}") if length else {}
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def _dispatch(self, method: str):
+        url = urlsplit(self.path)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        parts = [p for p in url.path.split("/") if p]
+        try:
+            status, payload = self._route(method, parts, query, self._body() if method == "POST" else {})
+        except (ValueError, TypeError, KeyError) as e:
+            status, payload = 400, {"error": f"{type(e).__name__}: {e}"}
+        self._send(status, payload)
+
+    def _route(self, method, parts, query, body):
+        svc: BacklogService = self.server.service
+        if parts == ["health"]:
+            return 200, {"ok": True, "version": svc.version}
+        if parts == ["wait"] and method == "GET":
+            since = int(query.get("since", svc.open_version))
+            version = svc.wait_for_open(since, float(query.get("timeout", 30)))
+            return 200, {"version": version, "opened": version > since}
+        if parts == ["claim"] and method == "POST":
+            items = svc.claim(body["owner"], int(body.get("n", 1)), float(body.get("wait", 0)))
+            return 200, {"items": [item_to_dict(i) for i in items]}
+        if parts == ["items"]:
+            if method == "GET":
+                limit = query.get("limit")
+                items = svc.items(query.get("status"), query.get("owner"), int(query.get("offset", 0)),
+                                  None if limit is None else int(limit))
+                return 200, [item_to_dict(i) for i in items]
+            records = body if isinstance(body, list) else [body]
+            return 200, {"items": [item_to_dict(i) for i in svc.add(records)]}
+        if len(parts) >= 2 and parts[0] == "items":
+            item_id = int(parts[1])
+            if len(parts) == 2 and method == "GET":
+                it = svc.get(item_id)
+                return (200, item_to_dict(it)) if it else (404, {"error": "not found"})
+            if len(parts) == 3 and method == "POST":
+                action = parts[2]
+                if action == "release":
+                    ok = svc.release(item_id, body.get("owner"))
+                elif action == "complete":
+                    ok = svc.complete(item_id)
+                elif action == "heartbeat":
+                    ok = svc.heartbeat(item_id, body["owner"])
+                else:
+                    return 404, {"error": f"unknown action {action}"}
+                return 200, {"ok": ok}
+        return 404, {"error": "unknown route"}
+
+
+class _ServerMixin:
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 64
+    verbose = False
+
+
+class TCPServer(_ServerMixin, ThreadingHTTPServer):
+    pass
+
+
+# Windows builds of CPython have no Unix stream servers; only host:port works there
+if hasattr(socketserver, "UnixStreamServer"):
+    class UnixServer(_ServerMixin, socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        pass
+else:
+    UnixServer = None
+
+
+def make_server(address: str, service: BacklogService, verbose: bool = False):
+    if address.startswith("unix:"):
+        if UnixServer is None:
+            raise OSError(f"unix socket addresses are not supported on this platform: {address}")
+        path = address[len("unix:"):]
+        if os.path.exists(path):
+            os.unlink(path)
+        srv = UnixServer(path, _Handler)
+    else:
+        host, _, port = address.rpartition(":")
+        srv = TCPServer((host or "127.0.0.1", int(port)), _Handler)
+    srv.service = service
+    srv.verbose = verbose
+    return srv
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path: str, timeout=None):
+        super().__init__("localhost", timeout=timeout)
+        self.unix_path = path
+
+    def connect(self):
+        if not hasattr(socket, "AF_UNIX"):
+            raise OSError(f"unix socket addresses are not supported on this platform: unix:{self.unix_path}")
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.unix_path)
+
+
+class BacklogClient:
+    """Thin client for the endpoints above; one connection per call."""
+
+    def __init__(self, address: str = DEFAULT_ADDRESS, timeout: Optional[float] = 60):
+        self.address = address
+        self.timeout = timeout
+
+    def _connection(self, timeout):
+        if self.address.startswith("unix:"):
+            return _UnixHTTPConnection(self.address[len("unix:"):], timeout=timeout)
+        host, _, port = self.address.rpartition(":")
+        return http.client.HTTPConnection(host or "127.0.0.1", int(port), timeout=timeout)
+
+    def request(self, method: str, path: str, body=None, wait: float = 0):
+        timeout = None if self.timeout is None else self.timeout + wait
+        conn = self._connection(timeout)
+        try:
+            data = None if body is None else json.dumps(body).encode("utf-8")
+            conn.request(method, path, body=data, headers={"Content-Type": "application/json"})
+            resp = conn.getresponse()
+            payload = json.loads(resp.read() or b"null")
+        finally:
+            conn.close()
+        if resp.status >= 400 and resp.status != 404:
+            raise RuntimeError(payload.get("error") if isinstance(payload, dict) else payload)
+        return payload
+
+    def list(self, status: Optional[str] = None, owner: Optional[str] = None, offset: int = 0,
+             limit: Optional[int] = None):
+        params = (("status", status), ("owner", owner), ("offset", offset or None), ("limit", limit))
+        query = urlencode({k: v for k, v in params if v is not None})
+        return self.request("GET", "/items" + (f"?{query}" if query else ""))
+
+    def add(self, records):
+        return self.request("POST", "/items", records)["items"]
+
+    def claim(self, owner: str, n: int = 1, wait: float = 0):
+        return self.request("POST", "/claim", {"owner": owner, "n": n, "wait": wait}, wait=wait)["items"]
+
+    def release(self, item_id: int, owner: Optional[str] = None) -> bool:
+        return self.request("POST", f"/items/{item_id}/release", {"owner": owner}).get("ok", False)
+
+    def complete(self, item_id: int) -> bool:
+        return self.request("POST", f"/items/{item_id}/complete", {}).get("ok", False)
+
+    def heartbeat(self, item_id: int, owner: str) -> bool:
+        return self.request("POST", f"/items/{item_id}/heartbeat", {"owner": owner}).get("ok", False)
+
+    def wait(self, since: int, timeout: float = 30):
+        return self.request("GET", f"/wait?since={since}&timeout={timeout}", wait=timeout)
+
+
+class RemoteController:
+    """Controller interface backed by a running server (used by controller_cli --server)."""
+
+    def __init__(self, address: str):
+        self.client = BacklogClient(address)
+
+    def claim_next(self, owner: str, wait: float = 0):
+        items = self.claim_batch(owner, 1, wait)
+        return items[0] if items else None
+
+    def claim_batch(self, owner: str, n: int, wait: float = 0):
+        return [item_from_dict(i) for i in self.client.claim(owner, n, wait)]
+
+    def heartbeat(self, item_id: int, owner: str) -> bool:
+        return self.client.heartbeat(item_id, owner)
+
+    def release(self, item_id: int, owner: Optional[str] = None) -> bool:
+        return self.client.release(item_id, owner)
+
+    def complete(self, item_id: int) -> bool:
+        return self.client.complete(item_id)
+
+    def list_open(self):
+        return [item_from_dict(i) for i in self.client.list(status="open")]
+
+    def iter_open(self, offset: int = 0, limit: Optional[int] = None, page: int = 500):
+        """Fetch open items page by page."""
+        while limit is None or limit > 0:
+            size = page if limit is None else min(page, limit)
+            batch = self.client.list(status="open", offset=offset, limit=size)
+            yield from (item_from_dict(i) for i in batch)
+            if len(batch) < size:
+                return
+            offset += len(batch)
+            if limit is not None:
+                limit -= len(batch)
+
+    def close(self):
+        pass
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser()
+    p.add_argument("--db", default=str(Path.cwd() / "services" / "backlog" / "backlog_store.json"),
+                   help="store path; .sqlite/.sqlite3/.db selects SQLite, .journal the snapshot + journal backend")
+    p.add_argument("--address", default=os.environ.get("BACKLOG_SERVER", DEFAULT_ADDRESS),
+                   help="host:port or unix:/path to listen on")
+    p.add_argument("--roles", help="agent-roles.json used to match owner skills (default .continue/agent-roles.json)")
+    p.add_argument("--lease", type=float, default=DEFAULT_LEASE_SECONDS,
+                   help="claim lease in seconds; 0 means claims never expire")
+    p.add_argument("--poll", type=float, default=1.0, help="seconds between checks for external changes and expired leases")
+    p.add_argument("--verbose", action="store_true")
+    args = p.parse_args(argv)
+
+    controller = Controller(db_path=Path(args.db), lease_seconds=args.lease or None,
+                            roles_path=Path(args.roles) if args.roles else None)
+    service = BacklogService(controller, poll=args.poll)
+    service.start_watcher()
+    srv = make_server(args.address, service, args.verbose)
+    print(json.dumps({"listening": args.address, "db": args.db}), flush=True)
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.stop()
+        srv.server_close()
+        controller.store.close()
+
+
+if __name__ == "__main__":
+    main()
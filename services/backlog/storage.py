@@ -0,0 +1,759 @@
+"""Storage backends for BacklogStore.
+
+`JsonBackend` keeps the original single-file JSON format (the whole list is
+rewritten on every mutation). `SqliteBackend` stores one row per item in a WAL
+database with indexes on status and owner, so lookups and mutations touch a
+single row. `JournalBackend` appends one JSONL record per changed item and
+periodically compacts the journal into a snapshot. `open_backend` picks one
+from the file suffix.
+
+Both backends are safe to share between processes: JSON mutations run under
+an exclusive lock file and re-read the file first, SQLite mutations run in
+`BEGIN IMMEDIATE` transactions. Claims may carry a lease (`lease_expires`,
+epoch seconds); expired leases go back to `open` on the next claim.
+
+`claim_open` hands out the highest-priority, then oldest, open item whose
+`required_skills` the claimant has and whose `estimated_cost` (VRAM GB) fits
+its capacity; see work_queue.py.
+"""
+from __future__ import annotations
+
+import contextlib
+import itertools
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from dataclasses import dataclass, fields
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple
+
+from services.backlog.work_queue import WorkQueue, fits, parse_skill_key, priority_rank, skill_key
+
+SQLITE_SUFFIXES = (".sqlite", ".sqlite3", ".db")
+JOURNAL_SUFFIX = ".journal"
+
+
+@dataclass(slots=True)
+class BacklogItem:
+    # slotted (no per-item __dict__) with interned status/owner/priority/skills:
+    # stores hold 100k+ of these and those strings repeat across items
+    id: int
+    title: str
+    description: Optional[str] = None
+    status: str = "open"
+    owner: Optional[str] = None
+    lease_expires: Optional[float] = None
+    priority: str = "medium"
+    required_skills: Tuple[str, ...] = ()
+    estimated_cost: Optional[float] = None
+
+    def __post_init__(self):
+        self.status = sys.intern(self.status)
+        self.priority = sys.intern(self.priority)
+        if self.owner is not None:
+            self.owner = sys.intern(self.owner)
+        if self.required_skills:
+            self.required_skills = tuple(sys.intern(s) for s in self.required_skills)
+        elif not isinstance(self.required_skills, tuple):
+            self.required_skills = ()
+
+
+FIELD_NAMES = tuple(f.name for f in fields(BacklogItem))
+_KNOWN = frozenset(FIELD_NAMES)
+
+
+def item_from_dict(data: dict) -> BacklogItem:
+    """Build an item, ignoring keys this version does not know about."""
+    return BacklogItem(**{k: v for k, v in data.items() if k in _KNOWN})
+
+
+def item_to_dict(item: BacklogItem) -> dict:
+    """Plain JSON-ready dict (much cheaper than dataclasses.asdict)."""
+    d = {name: getattr(item, name) for name in FIELD_NAMES}
+    d["required_skills"] = list(item.required_skills)
+    return d
+
+
+def _apply(item: BacklogItem, changes: dict):
+    for k, v in changes.items():
+        setattr(item, k, v)
+    item.__post_init__()
+
+
+@contextlib.contextmanager
+def file_lock(path: Path):
+    """Exclusive advisory lock on `path` (created if missing), across processes."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a+b") as fh:
+        if os.name == "nt":
+            import msvcrt
+
+            fh.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(fh.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    time.sleep(0.05)
+            try:
+                yield
+            finally:
+                fh.seek(0)
+                msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+
+
+class StorageBackend:
+    """Interface implemented by every backend.
+
+    `update` is a compare-and-set: it applies `changes` only when the item
+    exists and, if given, its status equals `expect_status` (and its owner
+    equals `expect_owner`). `claim_open` atomically moves up to `n` open items
+    to `claimed` after returning expired leases to `open`; `skills` and
+    `capacity` (None = unrestricted) limit which items qualify.
+    """
+
+    def all(self) -> List[BacklogItem]:
+        raise NotImplementedError
+
+    def by_status(self, status: str) -> List[BacklogItem]:
+        raise NotImplementedError
+
+    def by_owner(self, owner: str) -> List[BacklogItem]:
+        raise NotImplementedError
+
+    def iter_status(self, status: Optional[str] = None) -> Iterator[BacklogItem]:
+        """Items in id order (only `status` if given), produced lazily."""
+        raise NotImplementedError
+
+    def page(self, offset: int, limit: Optional[int], status: Optional[str] = None) -> List[BacklogItem]:
+        stop = None if limit is None else offset + limit
+        return list(itertools.islice(self.iter_status(status), offset, stop))
+
+    def get(self, item_id: int) -> Optional[BacklogItem]:
+        raise NotImplementedError
+
+    def insert(self, title: str, description: Optional[str] = None, **extra) -> BacklogItem:
+        raise NotImplementedError
+
+    def update(self, item_id: int, expect_status: Optional[str] = None, expect_owner: Optional[str] = None,
+               **changes) -> bool:
+        raise NotImplementedError
+
+    def insert_many(self, records: Iterable[dict]) -> List[BacklogItem]:
+        """Insert items built from `records` (insert() keyword arguments) in one write."""
+        raise NotImplementedError
+
+    def update_many(self, updates: Iterable[Tuple[int, dict]]) -> int:
+        """Apply `(item_id, changes)` pairs in one write; returns how many items existed."""
+        raise NotImplementedError
+
+    def claim_open(self, owner: str, n: int, lease_expires: Optional[float], now: float,
+                   skills: Optional[FrozenSet[str]] = None, capacity: Optional[float] = None) -> List[BacklogItem]:
+        raise NotImplementedError
+
+    def expire_leases(self, now: float) -> int:
+        raise NotImplementedError
+
+    def replace_all(self, items: Iterable[BacklogItem]) -> int:
+        raise NotImplementedError
+
+    def change_stamp(self):
+        """Value that moves when another process or store writes the data (not on this
+        backend's own writes); None when the backend cannot tell."""
+        return None
+
+    def compact(self):
+        """Reclaim space left by past mutations (no-op where nothing accumulates)."""
+
+    def flush(self):
+        """Make every acknowledged mutation durable."""
+
+    def close(self):
+        pass
+
+
+def _stat(path: Path):
+    try:
+        st = path.stat()
+        return st.st_ino, st.st_mtime_ns, st.st_size
+    except OSError:
+        return None
+
+
+def _write_durable(path: Path, data: bytes):
+    """Write `data` to a temp file, fsync it and rename it over `path`."""
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as fh:
+        fh.write(data)
+        fh.flush()
+        os.fsync(fh.fileno())
+    tmp.replace(path)
+
+
+def _expired(item: BacklogItem, now: float) -> bool:
+    return item.status == "claimed" and item.lease_expires is not None and item.lease_expires <= now
+
+
+class JsonBackend(StorageBackend):
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.lock_path = self.path.with_name(self.path.name + ".lock")
+        self._items: Dict[int, BacklogItem] = {}
+        self._next_id = 1
+        self._stamp = None
+        self._generation = 0
+        self._queue = WorkQueue()
+        self._refresh()
+
+    def _refresh(self):
+        """Re-read the file if another process (or store) changed it."""
+        # every write is a rename onto the path, so the inode changes too
+        stamp = _stat(self.path)
+        if stamp == self._stamp and (stamp is not None or not self._items):
+            return
+        self._items = {}
+        if stamp is not None:
+            try:
+                data = json.loads(self.path.read_text(encoding="utf-8-sig"))
+                for it in data:
+                    item = item_from_dict(it)
+                    self._items[item.id] = item
+            except Exception:
+                self._items = {}
+        self._next_id = max(self._items, default=0) + 1
+        self._queue.rebuild(self._items.values())
+        self._stamp = stamp
+        self._generation += 1
+
+    def change_stamp(self):
+        # _refresh only reloads when the file differs from what this backend last wrote or read
+        self._refresh()
+        return self._generation
+
+    def _persist(self, changed: Optional[List[BacklogItem]] = None):
+        """Write `changed` items (None = everything); this format always rewrites the file."""
+        _write_durable(self.path, json.dumps([item_to_dict(i) for i in self._items.values()], indent=2).encode("utf-8"))
+        self._stamp = _stat(self.path)
+
+    @contextlib.contextmanager
+    def _mutate(self):
+        with file_lock(self.lock_path):
+            self._refresh()
+            yield
+
+    def all(self) -> List[BacklogItem]:
+        self._refresh()
+        return list(self._items.values())
+
+    def by_status(self, status: str) -> List[BacklogItem]:
+        self._refresh()
+        return [i for i in self._items.values() if i.status == status]
+
+    def by_owner(self, owner: str) -> List[BacklogItem]:
+        self._refresh()
+        return [i for i in self._items.values() if i.owner == owner]
+
+    def iter_status(self, status: Optional[str] = None) -> Iterator[BacklogItem]:
+        # walks the live dict: finish iterating before mutating through this backend
+        self._refresh()
+        items = self._items.values()
+        return iter(items) if status is None else (i for i in items if i.status == status)
+
+    def get(self, item_id: int) -> Optional[BacklogItem]:
+        self._refresh()
+        return self._items.get(item_id)
+
+    def insert(self, title: str, description: Optional[str] = None, **extra) -> BacklogItem:
+        with self._mutate():
+            item = BacklogItem(id=self._next_id, title=title, description=description, **extra)
+            self._items[item.id] = item
+            self._next_id += 1
+            self._queue.push(item)
+            self._persist([item])
+        return item
+
+    def update(self, item_id: int, expect_status: Optional[str] = None, expect_owner: Optional[str] = None,
+               **changes) -> bool:
+        with self._mutate():
+            it = self._items.get(item_id)
+            if (not it or (expect_status is not None and it.status != expect_status)
+                    or (expect_owner is not None and it.owner != expect_owner)):
+                return False
+            _apply(it, changes)
+            self._queue.push(it)
+            self._persist([it])
+        return True
+
+    def insert_many(self, records: Iterable[dict]) -> List[BacklogItem]:
+        with self._mutate():
+            added = []
+            for rec in records:
+                item = BacklogItem(id=self._next_id, **rec)
+                self._items[item.id] = item
+                self._next_id += 1
+                self._queue.push(item)
+                added.append(item)
+            if added:
+                self._persist(added)
+        return added
+
+    def update_many(self, updates: Iterable[Tuple[int, dict]]) -> int:
+        with self._mutate():
+            changed = []
+            for item_id, changes in updates:
+                it = self._items.get(item_id)
+                if not it:
+                    continue
+                _apply(it, changes)
+                self._queue.push(it)
+                changed.append(it)
+            if changed:
+                self._persist(changed)
+        return len(changed)
+
+    def _expire(self, now: float) -> List[BacklogItem]:
+        expired = [i for i in self._items.values() if _expired(i, now)]
+        for it in expired:
+            it.status, it.owner, it.lease_expires = "open", None, None
+            self._queue.push(it)
+        return expired
+
+    def claim_open(self, owner: str, n: int, lease_expires: Optional[float], now: float,
+                   skills: Optional[FrozenSet[str]] = None, capacity: Optional[float] = None) -> List[BacklogItem]:
+        owner = sys.intern(owner)
+        with self._mutate():
+            changed = self._expire(now)
+            claimed = []
+            while len(claimed) < n:
+                item_id = self._queue.best(self._items.get, skills, capacity)
+                if item_id is None:
+                    break
+                it = self._items[item_id]
+                it.status, it.owner, it.lease_expires = "claimed", owner, lease_expires
+                claimed.append(it)
+            if changed or claimed:
+                self._persist(changed + claimed)
+        return claimed
+
+    def expire_leases(self, now: float) -> int:
+        with self._mutate():
+            changed = self._expire(now)
+            if changed:
+                self._persist(changed)
+        return len(changed)
+
+    def replace_all(self, items: Iterable[BacklogItem]) -> int:
+        with self._mutate():
+            self._items = {i.id: i for i in items}
+            self._next_id = max(self._items, default=0) + 1
+            self._queue.rebuild(self._items.values())
+            self._persist(None)
+        return len(self._items)
+
+
+class JournalBackend(JsonBackend):
+    """Snapshot plus append-only journal.
+
+    `<path>` holds one `{"seq": n, "put": {item}}` line per changed item and
+    `<path>.snapshot` a `{"seq": n, "items": [...]}` document. Loading replays
+    journal records newer than the snapshot's seq; a torn last line (crash
+    mid-append) is ignored and trimmed before the next append. Appends are
+    flushed to the OS immediately and fsync'd every `fsync_every` records or
+    `fsync_interval` seconds, whichever comes first; a timer syncs a pending
+    tail when the interval runs out with no further append. Once the journal holds
+    `compact_every` records it is folded into a fresh snapshot.
+    """
+
+    def __init__(self, path: Path, fsync_every: int = 64, fsync_interval: float = 0.5,
+                 compact_every: int = 10000, clock=time.monotonic):
+        self.snapshot_path = Path(str(path) + ".snapshot")
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.compact_every = compact_every
+        self.clock = clock
+        self._journal_ino = None
+        self._offset = 0
+        self._seq = 0
+        self._records = 0
+        self._unsynced = 0
+        self._last_sync = clock()
+        self._sync_timer = None
+        super().__init__(path)
+
+    def _refresh(self):
+        snap = _stat(self.snapshot_path)
+        journal = _stat(self.path)
+        ino = journal[0] if journal else None
+        if snap != self._stamp or ino != self._journal_ino or (journal and journal[2] < self._offset):
+            self._reload(snap, journal)
+        elif journal and journal[2] > self._offset:
+            self._replay()
+
+    def _reload(self, snap, journal):
+        self._items, self._seq = {}, 0
+        if snap is not None:
+            data = json.loads(self.snapshot_path.read_text(encoding="utf-8"))
+            self._seq = data.get("seq", 0)
+            for it in data.get("items", []):
+                item = item_from_dict(it)
+                self._items[item.id] = item
+        self._stamp = snap
+        self._generation += 1
+        self._journal_ino = journal[0] if journal else None
+        self._offset = self._records = 0
+        self._next_id = max(self._items, default=0) + 1
+        self._queue.rebuild(self._items.values())
+        if journal:
+            self._replay()
+
+    def _replay(self):
+        """Apply complete journal lines past the current offset."""
+        with open(self.path, "rb") as fh:
+            fh.seek(self._offset)
+            data = fh.read()
+        pos = 0
+        while True:
+            end = data.find(b"\n", pos)
+            if end < 0:
+                break
+            try:
+                rec = json.loads(data[pos:end])
+            except ValueError:
+                break
+            pos = end + 1
+            self._records += 1
+            if rec.get("seq", 0) <= self._seq:
+                continue  # already folded into the snapshot
+            self._seq = rec["seq"]
+            item = item_from_dict(rec["put"])
+            self._items[item.id] = item
+            self._next_id = max(self._next_id, item.id + 1)
+            self._queue.push(item)
+        if pos:
+            self._generation += 1
+        self._offset += pos
+
+    @contextlib.contextmanager
+    def _mutate(self):
+        with file_lock(self.lock_path):
+            self._refresh()
+            journal = _stat(self.path)
+            if journal and journal[2] > self._offset:
+                # torn tail from a writer that crashed mid-append
+                with open(self.path, "r+b") as fh:
+                    fh.truncate(self._offset)
+            yield
+
+    def _persist(self, changed: Optional[List[BacklogItem]] = None):
+        if changed is None:
+            self._compact()
+            return
+        lines = []
+        for it in changed:
+            self._seq += 1
+            lines.append(json.dumps({"seq": self._seq, "put": item_to_dict(it)}, separators=(",", ":")))
+        data = ("\n".join(lines) + "\n").encode("utf-8")
+        # opened per append: a handle kept open would block compaction's rename on Windows
+        with open(self.path, "ab") as fh:
+            fh.write(data)
+            fh.flush()
+            self._unsynced += len(lines)
+            if self._unsynced >= self.fsync_every or self.clock() - self._last_sync >= self.fsync_interval:
+                self._sync(fh)
+        self._journal_ino = _stat(self.path)[0]
+        self._offset += len(data)
+        self._records += len(lines)
+        if self._records >= self.compact_every:
+            self._compact()
+        self._arm_sync_timer()
+
+    def _arm_sync_timer(self):
+        # caller holds the file lock, as does the timer when it fires
+        if not self._unsynced or self._sync_timer is not None:
+            return
+        delay = max(0.0, self.fsync_interval - (self.clock() - self._last_sync))
+        self._sync_timer = threading.Timer(delay, self._sync_due)
+        self._sync_timer.daemon = True
+        self._sync_timer.start()
+
+    def _sync_due(self):
+        with file_lock(self.lock_path):
+            self._sync_timer = None
+            self._sync()
+
+    def _sync(self, fh=None):
+        if self._unsynced and self.path.exists():
+            if fh is None:
+                with open(self.path, "rb+") as f:
+                    os.fsync(f.fileno())
+            else:
+                os.fsync(fh.fileno())
+        self._unsynced = 0
+        self._last_sync = self.clock()
+
+    def _compact(self):
+        # snapshot first: if we crash before the journal is replaced, its
+        # records are <= the snapshot seq and get skipped on replay
+        doc = {"seq": self._seq, "items": [item_to_dict(i) for i in self._items.values()]}
+        _write_durable(self.snapshot_path, json.dumps(doc, separators=(",", ":")).encode("utf-8"))
+        _write_durable(self.path, b"")
+        self._stamp = _stat(self.snapshot_path)
+        self._journal_ino = _stat(self.path)[0]
+        self._offset = self._records = self._unsynced = 0
+
+    def compact(self):
+        with self._mutate():
+            self._compact()
+
+    def flush(self):
+        with self._mutate():
+            self._sync()
+
+    def close(self):
+        timer, self._sync_timer = self._sync_timer, None
+        if timer is not None:
+            timer.cancel()
+        self.flush()
+
+
+_COLUMN_TYPES = {
+    "id": "INTEGER PRIMARY KEY",
+    "title": "TEXT NOT NULL",
+    "description": "TEXT",
+    "status": "TEXT NOT NULL DEFAULT 'open'",
+    "owner": "TEXT",
+    "lease_expires": "REAL",
+    "priority": "TEXT NOT NULL DEFAULT 'medium'",
+    # stored as skill_key() text so buckets compare with =
+    "required_skills": "TEXT NOT NULL DEFAULT ''",
+    "estimated_cost": "REAL",
+    "priority_rank": "INTEGER NOT NULL DEFAULT 2",
+}
+_INDEXES = """
+CREATE INDEX IF NOT EXISTS items_status ON items(status, id);
+CREATE INDEX IF NOT EXISTS items_owner ON items(owner);
+CREATE INDEX IF NOT EXISTS items_queue ON items(status, required_skills, priority_rank, id);
+"""
+# distinct skill keys among open items via a loose index scan (one seek per key)
+_OPEN_SKILL_KEYS = """
+WITH RECURSIVE k(key) AS (
+    SELECT MIN(required_skills) FROM items WHERE status = 'open'
+    UNION ALL
+    SELECT (SELECT MIN(required_skills) FROM items WHERE status = 'open' AND required_skills > k.key)
+    FROM k WHERE k.key IS NOT NULL
+)
+SELECT key FROM k WHERE key IS NOT NULL
+"""
+
+
+class SqliteBackend(StorageBackend):
+    _COLUMNS = FIELD_NAMES
+    _TABLE_COLUMNS = _COLUMNS + ("priority_rank",)
+    _SKILLS = _COLUMNS.index("required_skills")
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._select = "SELECT " + ", ".join(self._COLUMNS) + " FROM items"
+        self._db = sqlite3.connect(str(self.path), timeout=30, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._migrate()
+
+    def _migrate(self):
+        cols = ", ".join(f"{c} {_COLUMN_TYPES[c]}" for c in self._TABLE_COLUMNS)
+        self._db.execute(f"CREATE TABLE IF NOT EXISTS items ({cols})")
+        existing = {row[1] for row in self._db.execute("PRAGMA table_info(items)")}
+        for c in self._TABLE_COLUMNS:
+            if c not in existing:
+                self._db.execute(f"ALTER TABLE items ADD COLUMN {c} {_COLUMN_TYPES[c]}")
+        self._db.executescript(_INDEXES)
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._db
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+
+    @classmethod
+    def _item(cls, row) -> BacklogItem:
+        row = list(row)
+        row[cls._SKILLS] = parse_skill_key(row[cls._SKILLS])
+        return BacklogItem(*row)
+
+    @classmethod
+    def _row(cls, item: BacklogItem) -> tuple:
+        values = [getattr(item, c) for c in cls._COLUMNS]
+        values[cls._SKILLS] = skill_key(item.required_skills)
+        return tuple(values) + (priority_rank(item.priority),)
+
+    def _rows(self, where: str = "", params=()) -> List[BacklogItem]:
+        with self._lock:
+            rows = self._db.execute(f"{self._select} {where}", params).fetchall()
+        return [self._item(r) for r in rows]
+
+    def all(self) -> List[BacklogItem]:
+        return self._rows("ORDER BY id")
+
+    def by_status(self, status: str) -> List[BacklogItem]:
+        return self._rows("WHERE status = ? ORDER BY id", (status,))
+
+    def by_owner(self, owner: str) -> List[BacklogItem]:
+        return self._rows("WHERE owner = ? ORDER BY id", (owner,))
+
+    def iter_status(self, status: Optional[str] = None, batch: int = 500) -> Iterator[BacklogItem]:
+        # keyset pagination: no cursor or lock is held between batches
+        last = 0
+        while True:
+            if status is None:
+                rows = self._rows("WHERE id > ? ORDER BY id LIMIT ?", (last, batch))
+            else:
+                rows = self._rows("WHERE status = ? AND id > ? ORDER BY id LIMIT ?", (status, last, batch))
+            yield from rows
+            if len(rows) < batch:
+                return
+            last = rows[-1].id
+
+    def page(self, offset: int, limit: Optional[int], status: Optional[str] = None) -> List[BacklogItem]:
+        where, params = ("", []) if status is None else ("WHERE status = ? ", [status])
+        return self._rows(f"{where}ORDER BY id LIMIT ? OFFSET ?", params + [-1 if limit is None else limit, offset])
+
+    def get(self, item_id: int) -> Optional[BacklogItem]:
+        rows = self._rows("WHERE id = ?", (item_id,))
+        return rows[0] if rows else None
+
+    def insert(self, title: str, description: Optional[str] = None, **extra) -> BacklogItem:
+        return self.insert_many([dict(extra, title=title, description=description)])[0]
+
+    def insert_many(self, records: Iterable[dict]) -> List[BacklogItem]:
+        cols = self._TABLE_COLUMNS[1:]
+        sql = f"INSERT INTO items({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})"
+        items = []
+        with self._transaction() as db:
+            for rec in records:
+                item = BacklogItem(id=None, **rec)
+                item.id = db.execute(sql, self._row(item)[1:]).lastrowid
+                items.append(item)
+        return items
+
+    def _set_clause(self, changes: dict):
+        unknown = set(changes) - set(self._COLUMNS[1:])
+        if unknown:
+            raise ValueError(f"unknown fields: {sorted(unknown)}")
+        changes = dict(changes)
+        if "required_skills" in changes:
+            changes["required_skills"] = skill_key(changes["required_skills"])
+        if "priority" in changes:
+            changes["priority_rank"] = priority_rank(changes["priority"])
+        return "UPDATE items SET " + ", ".join(f"{k} = ?" for k in changes) + " WHERE id = ?", list(changes.values())
+
+    def update_many(self, updates: Iterable[Tuple[int, dict]]) -> int:
+        count = 0
+        with self._transaction() as db:
+            for item_id, changes in updates:
+                if changes:
+                    sql, params = self._set_clause(changes)
+                    count += db.execute(sql, params + [item_id]).rowcount
+                else:
+                    count += db.execute("SELECT COUNT(*) FROM items WHERE id = ?", (item_id,)).fetchone()[0]
+        return count
+
+    def update(self, item_id: int, expect_status: Optional[str] = None, expect_owner: Optional[str] = None,
+               **changes) -> bool:
+        if not changes:
+            return self.get(item_id) is not None
+        sql, params = self._set_clause(changes)
+        params.append(item_id)
+        if expect_status is not None:
+            sql += " AND status = ?"
+            params.append(expect_status)
+        if expect_owner is not None:
+            sql += " AND owner = ?"
+            params.append(expect_owner)
+        with self._lock:
+            return self._db.execute(sql, params).rowcount == 1
+
+    @staticmethod
+    def _expire(db, now: float) -> int:
+        return db.execute("UPDATE items SET status = 'open', owner = NULL, lease_expires = NULL "
+                          "WHERE status = 'claimed' AND lease_expires <= ?", (now,)).rowcount
+
+    @staticmethod
+    def _best_open(db, skills: Optional[FrozenSet[str]], capacity: Optional[float]) -> Optional[int]:
+        best = None
+        for (key,) in db.execute(_OPEN_SKILL_KEYS).fetchall():
+            if not fits(parse_skill_key(key), None, skills, None):
+                continue
+            row = db.execute("SELECT priority_rank, id FROM items WHERE status = 'open' AND required_skills = ? "
+                             "AND (? IS NULL OR estimated_cost IS NULL OR estimated_cost <= ?) "
+                             "ORDER BY priority_rank, id LIMIT 1", (key, capacity, capacity)).fetchone()
+            if row and (best is None or row < best):
+                best = row
+        return best[1] if best else None
+
+    def claim_open(self, owner: str, n: int, lease_expires: Optional[float], now: float,
+                   skills: Optional[FrozenSet[str]] = None, capacity: Optional[float] = None) -> List[BacklogItem]:
+        ids = []
+        with self._transaction() as db:
+            self._expire(db, now)
+            while len(ids) < n:
+                item_id = self._best_open(db, skills, capacity)
+                if item_id is None:
+                    break
+                db.execute("UPDATE items SET status = 'claimed', owner = ?, lease_expires = ? WHERE id = ?",
+                           (owner, lease_expires, item_id))
+                ids.append(item_id)
+            rows = {r[0]: r for r in db.execute(f"{self._select} WHERE id IN ({','.join('?' * len(ids))})", ids)}
+        return [self._item(rows[i]) for i in ids]
+
+    def expire_leases(self, now: float) -> int:
+        with self._transaction() as db:
+            return self._expire(db, now)
+
+    def replace_all(self, items: Iterable[BacklogItem]) -> int:
+        rows = [self._row(i) for i in items]
+        marks = ", ".join("?" * len(self._TABLE_COLUMNS))
+        with self._transaction() as db:
+            db.execute("DELETE FROM items")
+            db.executemany(f"INSERT INTO items({', '.join(self._TABLE_COLUMNS)}) VALUES ({marks})", rows)
+        return len(rows)
+
+    def change_stamp(self):
+        # data_version moves on commits from other connections only
+        with self._lock:
+            return self._db.execute("PRAGMA data_version").fetchone()[0]
+
+    def compact(self):
+        with self._lock:
+            self._db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def open_backend(path: Path) -> StorageBackend:
+    """SQLite for .sqlite/.sqlite3/.db, snapshot + journal for .journal, the JSON file format otherwise."""
+    path = Path(path)
+    if path.suffix.lower() in SQLITE_SUFFIXES:
+        return SqliteBackend(path)
+    if path.suffix.lower() == JOURNAL_SUFFIX:
+        return JournalBackend(path)
+    return JsonBackend(path)
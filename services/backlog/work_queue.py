@@ -0,0 +1,137 @@
+"""Priority work queue used to pick the next backlog item for an agent.
+
+Open items are bucketed by required skill set and, inside each bucket, by cost
+class; each class is a heap ordered by (priority rank, id). Cost classes are
+cut at the capacities agents have asked with: the first claim with a new
+capacity splits the class containing it once, after which every class lies
+entirely within or entirely above any known capacity. The number of heaps is
+therefore skill sets * (distinct agent capacities + 2), independent of the
+number of items or distinct costs, and choosing an item is a look at the top
+of each eligible heap: O(S * K * log N). Heap entries are removed lazily: an
+entry whose item is no longer open (or changed bucket or priority) is
+discarded when it reaches the top.
+"""
+from __future__ import annotations
+
+import bisect
+import heapq
+import math
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+# Same vocabulary as agentRoles priorities (scripts/autoscale_controller.py).
+PRIORITY_RANK = {"critical": 0, "high": 1, "medium": 2, "low": 3}
+
+
+def priority_rank(priority) -> int:
+    return PRIORITY_RANK.get(priority, PRIORITY_RANK["medium"])
+
+
+def skill_key(skills: Optional[Iterable[str]]) -> str:
+    """Canonical, order-independent text form of a skill set ('' for none)."""
+    return ",".join(sorted(set(skills or ())))
+
+
+def parse_skill_key(key: Optional[str]) -> List[str]:
+    return [s for s in (key or "").split(",") if s]
+
+
+def fits(required: Iterable[str], cost: Optional[float], skills: Optional[FrozenSet[str]],
+         capacity: Optional[float]) -> bool:
+    """Whether an agent with `skills`/`capacity` (None = unrestricted) may take the work."""
+    if skills is not None and not set(required) <= skills:
+        return False
+    return capacity is None or cost is None or cost <= capacity
+
+
+_NO_COST = None  # class of items without an estimated cost (fit every agent)
+
+
+class WorkQueue:
+    def __init__(self):
+        # skill key -> cost class (upper bound, math.inf or _NO_COST) -> heap of (priority rank, id)
+        self._buckets: Dict[str, Dict[Optional[float], list]] = {}
+        self._required: Dict[str, FrozenSet[str]] = {}
+        self._bounds: List[float] = []  # capacities seen, sorted
+
+    def _class(self, cost: Optional[float]) -> Optional[float]:
+        if cost is None:
+            return _NO_COST
+        i = bisect.bisect_left(self._bounds, cost)
+        return self._bounds[i] if i < len(self._bounds) else math.inf
+
+    def _bucket(self, item) -> Tuple[str, Optional[float]]:
+        return skill_key(item.required_skills), self._class(item.estimated_cost)
+
+    def bucket_count(self) -> int:
+        """Number of heaps currently held."""
+        return sum(len(classes) for classes in self._buckets.values())
+
+    def push(self, item):
+        if item.status == "open":
+            key, cls = self._bucket(item)
+            heapq.heappush(self._buckets.setdefault(key, {}).setdefault(cls, []), (priority_rank(item.priority), item.id))
+
+    def rebuild(self, items: Iterable):
+        self._buckets = {}
+        for it in items:
+            if it.status == "open":
+                key, cls = self._bucket(it)
+                self._buckets.setdefault(key, {}).setdefault(cls, []).append((priority_rank(it.priority), it.id))
+        for classes in self._buckets.values():
+            for heap in classes.values():
+                heapq.heapify(heap)
+
+    def _live(self, it, entry, key: str, cls: Optional[float]) -> bool:
+        return (it is not None and it.status == "open" and priority_rank(it.priority) == entry[0]
+                and self._bucket(it) == (key, cls))
+
+    def _split(self, capacity: float, lookup):
+        """Add `capacity` as a class bound, moving the cheaper part of the class it cuts."""
+        upper = self._class(capacity)
+        bisect.insort(self._bounds, capacity)
+        for key, classes in self._buckets.items():
+            heap = classes.get(upper)
+            if not heap:
+                continue
+            below, above = [], []
+            for entry in heap:
+                it = lookup(entry[1])
+                if self._live(it, entry, key, capacity):
+                    below.append(entry)
+                elif self._live(it, entry, key, upper):
+                    above.append(entry)
+            for cls, entries in ((capacity, below), (upper, above)):
+                if entries:
+                    heapq.heapify(entries)
+                    classes[cls] = entries
+                else:
+                    classes.pop(cls, None)
+
+    def best(self, lookup: Callable[[int], Optional[object]], skills: Optional[FrozenSet[str]] = None,
+             capacity: Optional[float] = None) -> Optional[int]:
+        """Id of the highest-priority (then oldest) open item the agent can take."""
+        if capacity is not None:
+            i = bisect.bisect_left(self._bounds, capacity)
+            if i == len(self._bounds) or self._bounds[i] != capacity:
+                self._split(capacity, lookup)
+        best = None
+        for key in list(self._buckets):
+            required = self._required.get(key)
+            if required is None:
+                required = self._required[key] = frozenset(parse_skill_key(key))
+            if not fits(required, None, skills, None):
+                continue
+            classes = self._buckets[key]
+            for cls in list(classes):
+                if capacity is not None and cls is not _NO_COST and cls > capacity:
+                    continue
+                heap = classes[cls]
+                while heap and not self._live(lookup(heap[0][1]), heap[0], key, cls):
+                    heapq.heappop(heap)
+                if not heap:
+                    del classes[cls]
+                elif best is None or heap[0] < best:
+                    best = heap[0]
+            if not classes:
+                del self._buckets[key]
+        return best[1] if best else None
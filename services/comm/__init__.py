@@ -1,3 +1,3 @@
 """Communication helpers for local agents."""
 
-__all__ = ["dialog_manager"]
+__all__ = ["async_dialog", "dialog_manager", "impediments"]
@@ -0,0 +1,228 @@
+"""Asyncio dialog manager multiplexing many pending dialogs over one input channel.
+
+A coordinator running several agents can have many human questions open at
+once without parking a thread per question: every dialog awaits its own queue,
+and a single reader task pulls lines from the channel and routes them.
+
+Routing: a reply `"<dialog id>:<reply>"` (e.g. `3:y`, `2: 1`) goes to that
+dialog; a bare reply goes to the oldest pending dialog. Each dialog keeps the
+`DialogManager` semantics: short codes and numeric choices, a per-attempt
+`timeout_seconds` that counts as an invalid reply, and an impediment plus a
+None result after `max_invalid_attempts`. When the channel reaches EOF every
+pending dialog raises its impediment and returns None.
+
+Channels: `StdinChannel` (the default), `StreamChannel` (a socket, via
+`StreamChannel.connect(host, port)`) and `FileQueueChannel` (tails a file,
+handy for tests and for feeding replies from another process).
+"""
+from __future__ import annotations
+
+import asyncio
+import itertools
+import sys
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from services.comm.dialog_manager import DialogManager
+from services.comm.impediments import ImpedimentLog
+
+_EOF = object()
+
+
+class StdinChannel:
+    """Lines from stdin; prompts go to stdout."""
+
+    def __init__(self):
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._threaded = False
+
+    async def readline(self) -> Optional[str]:
+        loop = asyncio.get_running_loop()
+        if self._reader is None and not self._threaded:
+            try:
+                reader = asyncio.StreamReader()
+                await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+                self._reader = reader
+            except (NotImplementedError, OSError, ValueError):
+                # Windows consoles cannot be registered with the loop: one
+                # helper thread reads for every dialog.
+                self._threaded = True
+        if self._threaded:
+            line = await loop.run_in_executor(None, sys.stdin.readline)
+            return line or None
+        line = await self._reader.readline()
+        return line.decode("utf-8", "replace") if line else None
+
+    def write(self, text: str):
+        print(text, flush=True)
+
+    def close(self):
+        pass
+
+
+class StreamChannel:
+    """Lines from an asyncio stream (e.g. a TCP socket); prompts are written back to it."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: Optional[asyncio.StreamWriter] = None):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def connect(cls, host: str, port: int) -> "StreamChannel":
+        reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def readline(self) -> Optional[str]:
+        line = await self.reader.readline()
+        return line.decode("utf-8", "replace") if line else None
+
+    def write(self, text: str):
+        if self.writer is not None:
+            self.writer.write((text + "\n").encode("utf-8"))
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+class FileQueueChannel:
+    """Tails `path`, returning each complete line once; prompts go to `out_path` (or nowhere)."""
+
+    def __init__(self, path: Path, out_path: Optional[Path] = None, poll: float = 0.05):
+        self.path = Path(path)
+        self.out_path = Path(out_path) if out_path else None
+        self.poll = poll
+        self._offset = 0
+        self._buffer = b""
+        self._closed = False
+
+    async def readline(self) -> Optional[str]:
+        while not self._closed:
+            nl = self._buffer.find(b"\n")
+            if nl >= 0:
+                line, self._buffer = self._buffer[:nl + 1], self._buffer[nl + 1:]
+                return line.decode("utf-8", "replace")
+            try:
+                with open(self.path, "rb") as fh:
+                    fh.seek(self._offset)
+                    chunk = fh.read()
+            except FileNotFoundError:
+                chunk = b""
+            if chunk:
+                self._offset += len(chunk)
+                self._buffer += chunk
+                continue
+            await asyncio.sleep(self.poll)
+        return None
+
+    def write(self, text: str):
+        if self.out_path is not None:
+            with open(self.out_path, "a", encoding="utf-8") as fh:
+                fh.write(text + "\n")
+
+    def close(self):
+        self._closed = True
+
+
+class AsyncDialogManager(DialogManager):
+    def __init__(self, channel=None, max_options: int = 10, max_invalid_attempts: int = 10,
+                 impediments: Optional[ImpedimentLog] = None):
+        super().__init__(max_options, max_invalid_attempts, impediments)
+        self.channel = channel or StdinChannel()
+        self._ids = itertools.count(1)
+        self._pending: "OrderedDict[int, asyncio.Queue]" = OrderedDict()
+        self._reader_task: Optional[asyncio.Task] = None
+        self._eof = False
+
+    def _route(self, line: str) -> Tuple[Optional[int], str]:
+        head, sep, rest = line.partition(":")
+        if sep and head.strip().isdigit():
+            return int(head.strip()), rest
+        return (next(iter(self._pending)) if self._pending else None), line
+
+    async def _pump(self):
+        while True:
+            line = await self.channel.readline()
+            if line is None:
+                self._eof = True
+                for queue in self._pending.values():
+                    queue.put_nowait(_EOF)
+                return
+            dialog_id, reply = self._route(line.rstrip("\r\n"))
+            queue = self._pending.get(dialog_id)
+            if queue is None:
+                self.channel.write("(no pending dialog)" if dialog_id is None else f"(no pending dialog {dialog_id})")
+                continue
+            queue.put_nowait(reply)
+
+    def _ensure_reader(self):
+        if self._reader_task is None or self._reader_task.done():
+            if not self._eof:
+                self._reader_task = asyncio.get_running_loop().create_task(self._pump())
+
+    async def select_option(
+        self,
+        options: List[str],
+        timeout_seconds: Optional[float] = None,
+        allowed_short: Optional[List[str]] = None,
+    ) -> Optional[str]:
+        """Await a reply for this dialog; same results as `DialogManager.select_option`."""
+        if len(options) > self.max_options:
+            options = options[: self.max_options]
+        allowed_short = allowed_short or ["y", "n", "g", "p"]
+
+        dialog_id = next(self._ids)
+        queue: asyncio.Queue = asyncio.Queue()
+        self._pending[dialog_id] = queue
+        if self._eof:
+            queue.put_nowait(_EOF)
+        self._ensure_reader()
+
+        prompt = f"[{dialog_id}] " + self._prompt_text(options) + f"\n(reply as '{dialog_id}:<choice>')"
+        invalid = 0
+        try:
+            while True:
+                self.channel.write(prompt)
+                try:
+                    raw = await asyncio.wait_for(queue.get(), timeout_seconds)
+                except asyncio.TimeoutError:
+                    raw = ""
+                if raw is _EOF:
+                    # nothing more will arrive; same outcome as exhausting the attempts
+                    self._raise_impediment("too_many_invalid_replies", {"options": options, "input_closed": True})
+                    return None
+
+                choice = self._parse_reply(raw, options, allowed_short)
+                if choice is not None:
+                    return choice
+
+                invalid += 1
+                if invalid >= self.max_invalid_attempts:
+                    self._raise_impediment("too_many_invalid_replies", {"options": options})
+                    return None
+        finally:
+            del self._pending[dialog_id]
+
+    async def aclose(self):
+        self.channel.close()
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            try:
+                await self._reader_task
+            except (asyncio.CancelledError, Exception):
+                pass
+
+
+async def _demo():
+    dm = AsyncDialogManager()
+    results = await asyncio.gather(
+        dm.select_option(["Start task", "Defer task"], timeout_seconds=30),
+        dm.select_option(["Use GPU 0", "Use GPU 1", "Wait"], timeout_seconds=30),
+    )
+    await dm.aclose()
+    print("Selections:", results)
+
+
+if __name__ == "__main__":
+    asyncio.run(_demo())
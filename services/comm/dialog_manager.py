@@ -6,44 +6,63 @@ Behavior (defaults):
 - numeric replies 1..N are accepted to select options.
 - agent provides `timeout_seconds` and may decide allowed options.
 - after `max_invalid_attempts` (default 10) of invalid replies, an impediment is raised
-  and written to `.continue/impediments.json`, then the dialog returns None so caller
-  can proceed to next task.
+  and appended to `.continue/impediments.jsonl` (see `services.comm.impediments`), then
+  the dialog returns None so caller can proceed to next task.
 
 This module exposes `DialogManager` with methods for interactive use and for unit tests
 (simulated responses).
 """
 from __future__ import annotations
 
-import json
-import time
+import select
+import sys
 from pathlib import Path
 from typing import Iterable, List, Optional
 
+from services.comm.impediments import ImpedimentLog
+
 
 CONTINUE_DIR = Path.cwd() / ".continue"
-IMPEDIMENTS_FILE = CONTINUE_DIR / "impediments.json"
+IMPEDIMENTS_FILE = CONTINUE_DIR / "impediments.jsonl"
 
 
 class DialogManager:
-    def __init__(self, max_options: int = 10, max_invalid_attempts: int = 10):
+    def __init__(self, max_options: int = 10, max_invalid_attempts: int = 10,
+                 impediments: Optional[ImpedimentLog] = None):
         self.max_options = min(max_options, 10)
         self.max_invalid_attempts = max_invalid_attempts
+        self.impediments = impediments or ImpedimentLog(IMPEDIMENTS_FILE)
         CONTINUE_DIR.mkdir(parents=True, exist_ok=True)
 
     def _raise_impediment(self, reason: str, context: dict):
-        entry = {"reason": reason, "context": context, "ts": time.time()}
-        data = []
-        if IMPEDIMENTS_FILE.exists():
-            try:
-                data = json.loads(IMPEDIMENTS_FILE.read_text(encoding="utf-8-sig"))
-            except Exception:
-                data = []
-        data.append(entry)
-        IMPEDIMENTS_FILE.write_text(json.dumps(data, indent=2), encoding="utf-8")
+        # one O_APPEND line per impediment; no read-modify-write of the history
+        return self.impediments.append(reason, context)
 
     def _normalize_reply(self, reply: str) -> str:
         return (reply or "").strip().lower()
 
+    def _prompt_text(self, options: List[str]) -> str:
+        prompt_lines = ["Choose an option:"]
+        for i, opt in enumerate(options, start=1):
+            prompt_lines.append(f"  {i}) {opt}")
+        prompt_lines.append("Reply 'y'/'n'/'g'/'p' or option number.")
+        return "\n".join(prompt_lines)
+
+    def _parse_reply(self, raw: str, options: List[str], allowed_short: List[str]) -> Optional[str]:
+        """Short code or selected option for a valid reply, None for an invalid one."""
+        reply = self._normalize_reply(raw)
+
+        # check short codes
+        if reply in allowed_short:
+            return reply
+
+        # check numeric
+        if reply.isdigit():
+            idx = int(reply)
+            if 1 <= idx <= len(options):
+                return options[idx - 1]
+        return None
+
     def select_option(
         self,
         options: List[str],
@@ -68,21 +87,14 @@ class DialogManager:
         resp_iter = iter(responses) if responses is not None else None
         invalid = 0
 
-        prompt_lines = ["Choose an option:"]
-        for i, opt in enumerate(options, start=1):
-            prompt_lines.append(f"  {i}) {opt}")
-        prompt_lines.append("Reply 'y'/'n'/'g'/'p' or option number.")
-        prompt_text = "\n".join(prompt_lines)
+        prompt_text = self._prompt_text(options)
 
         while True:
             if resp_iter is None:
                 try:
                     if timeout_seconds:
                         print(prompt_text)
-                        start = time.time()
                         # simple blocking read with timeout
-                        import sys, select
-
                         print(f"(waiting up to {timeout_seconds}s)")
                         rlist, _, _ = select.select([sys.stdin], [], [], timeout_seconds)
                         if rlist:
@@ -99,17 +111,9 @@ class DialogManager:
                 except StopIteration:
                     raw = ""
 
-            reply = self._normalize_reply(raw)
-
-            # check short codes
-            if reply in allowed_short:
-                return reply
-
-            # check numeric
-            if reply.isdigit():
-                idx = int(reply)
-                if 1 <= idx <= len(options):
-                    return options[idx - 1]
+            choice = self._parse_reply(raw, options, allowed_short)
+            if choice is not None:
+                return choice
 
             invalid += 1
             if invalid >= self.max_invalid_attempts:
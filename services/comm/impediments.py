@@ -0,0 +1,200 @@
+"""Append-only JSONL impediment log.
+
+Each impediment is one JSON line appended with a single `O_APPEND` write, so
+concurrent agents never rewrite (or clobber) each other's entries and each
+append costs O(1) regardless of history. The live file is rotated to
+`impediments.jsonl.<epoch-ms>` once it exceeds `max_bytes` or its first entry
+is older than `max_age_seconds`; only the newest `keep` rotated segments are
+kept. Rotation is a rename, so appends racing with it land in one segment or
+the other and nothing is lost. Segment names are reserved with `O_EXCL`, so
+two processes rotating in the same millisecond never overwrite each other; a
+rotation that fails (e.g. Windows refusing to rename a file another agent has
+open) is skipped and retried on a later append.
+
+Readers stream the legacy `.continue/impediments.json` array (if present),
+then rotated segments oldest first, then the live file, optionally filtered
+by reason and time window.
+
+    python -m services.comm.impediments summary --since-hours 24
+    python -m services.comm.impediments list --reason too_many_invalid_replies
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+CONTINUE_DIR = Path.cwd() / ".continue"
+IMPEDIMENTS_LOG = CONTINUE_DIR / "impediments.jsonl"
+
+
+class ImpedimentLog:
+    def __init__(self, path: Optional[Path] = None, max_bytes: int = 5 * 1024 * 1024,
+                 max_age_seconds: Optional[float] = None, keep: int = 10, legacy_path: Optional[Path] = None,
+                 clock=time.time):
+        self.path = Path(path) if path else IMPEDIMENTS_LOG
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.keep = keep
+        self.legacy_path = Path(legacy_path) if legacy_path else self.path.with_suffix(".json")
+        self.clock = clock
+
+    def append(self, reason: str, context: Optional[dict] = None, ts: Optional[float] = None) -> dict:
+        entry = {"reason": reason, "context": context or {}, "ts": self.clock() if ts is None else ts}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._maybe_rotate()
+        line = (json.dumps(entry, separators=(",", ":"), default=str) + "\n").encode("utf-8")
+        fd = os.open(str(self.path), os.O_WRONLY | os.O_CREAT | os.O_APPEND | getattr(os, "O_BINARY", 0), 0o644)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+        return entry
+
+    def _first_ts(self) -> Optional[float]:
+        try:
+            with open(self.path, "rb") as fh:
+                return json.loads(fh.readline()).get("ts")
+        except (OSError, ValueError, AttributeError):
+            return None
+
+    def _maybe_rotate(self):
+        try:
+            size = self.path.stat().st_size
+        except OSError:
+            return
+        if size == 0:
+            return
+        too_big = self.max_bytes and size >= self.max_bytes
+        too_old = False
+        if not too_big and self.max_age_seconds:
+            first = self._first_ts()
+            too_old = first is not None and self.clock() - first >= self.max_age_seconds
+        if too_big or too_old:
+            self.rotate()
+
+    def _reserve_segment(self) -> Path:
+        """Create an empty, not yet used `<name>.<epoch-ms>` file to rotate onto."""
+        stamp = int(self.clock() * 1000)
+        while True:
+            target = self.path.with_name(f"{self.path.name}.{stamp}")
+            try:
+                os.close(os.open(str(target), os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644))
+                return target
+            except FileExistsError:
+                stamp += 1
+
+    def rotate(self) -> Optional[Path]:
+        """Rename the live file to a new segment; None if there was nothing to (or it could not) rotate."""
+        try:
+            target = self._reserve_segment()
+        except OSError:
+            return None
+        try:
+            os.replace(self.path, target)
+        except OSError:
+            # FileNotFoundError: another process rotated first; PermissionError: on
+            # Windows another agent has the file open. Logging must not fail the caller.
+            try:
+                target.unlink()
+            except OSError:
+                pass
+            return None
+        for old in self.segments()[:-self.keep or None] if self.keep else []:
+            try:
+                old.unlink()
+            except OSError:
+                pass
+        return target
+
+    def segments(self) -> List[Path]:
+        """Rotated segments, oldest first."""
+        prefix = self.path.name + "."
+        found = []
+        for p in self.path.parent.glob(prefix + "*"):
+            suffix = p.name[len(prefix):]
+            if suffix.isdigit():
+                found.append((int(suffix), p))
+        return [p for _, p in sorted(found)]
+
+    def _read_jsonl(self, path: Path) -> Iterator[dict]:
+        try:
+            with open(path, encoding="utf-8") as fh:
+                for line in fh:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue  # torn or partial line
+        except OSError:
+            return
+
+    def _read_legacy(self) -> Iterator[dict]:
+        if not self.legacy_path.exists():
+            return
+        try:
+            data = json.loads(self.legacy_path.read_text(encoding="utf-8-sig"))
+        except Exception:
+            return
+        yield from (d for d in data if isinstance(d, dict))
+
+    def iter_entries(self, reason: Optional[str] = None, since: Optional[float] = None,
+                     until: Optional[float] = None) -> Iterator[dict]:
+        """Stream entries oldest first, filtered by reason and `since <= ts < until`."""
+        sources = [self._read_legacy()]
+        for seg in self.segments():
+            # a segment last written before `since` cannot contain matches
+            if since is not None:
+                try:
+                    if seg.stat().st_mtime < since:
+                        continue
+                except FileNotFoundError:
+                    continue  # pruned by a concurrent rotate
+            sources.append(self._read_jsonl(seg))
+        sources.append(self._read_jsonl(self.path))
+        for source in sources:
+            for entry in source:
+                ts = entry.get("ts") or 0
+                if reason is not None and entry.get("reason") != reason:
+                    continue
+                if (since is not None and ts < since) or (until is not None and ts >= until):
+                    continue
+                yield entry
+
+
+def summarize(entries: Iterable[dict]) -> Dict[str, dict]:
+    """Count, first and last timestamp per reason, most frequent first."""
+    out: Dict[str, dict] = {}
+    for e in entries:
+        ts = e.get("ts")
+        s = out.setdefault(e.get("reason") or "unknown", {"count": 0, "first": ts, "last": ts})
+        s["count"] += 1
+        if ts is not None:
+            s["first"] = ts if s["first"] is None else min(s["first"], ts)
+            s["last"] = ts if s["last"] is None else max(s["last"], ts)
+    return dict(sorted(out.items(), key=lambda kv: -kv[1]["count"]))
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser()
+    p.add_argument("command", choices=["list", "summary", "rotate"])
+    p.add_argument("--path", default=str(IMPEDIMENTS_LOG))
+    p.add_argument("--reason")
+    p.add_argument("--since-hours", type=float, help="only entries from the last N hours")
+    args = p.parse_args(argv)
+
+    log = ImpedimentLog(Path(args.path))
+    since = time.time() - args.since_hours * 3600 if args.since_hours else None
+    if args.command == "rotate":
+        print(json.dumps({"rotated": str(log.rotate())}))
+    elif args.command == "list":
+        for entry in log.iter_entries(args.reason, since):
+            print(json.dumps(entry))
+    else:
+        print(json.dumps(summarize(log.iter_entries(args.reason, since)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
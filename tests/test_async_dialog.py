@@ -0,0 +1,46 @@
+import asyncio
+
+from services.comm.async_dialog import AsyncDialogManager, FileQueueChannel, StreamChannel
+from services.comm.impediments import ImpedimentLog
+
+
+def test_many_dialogs_over_one_file_queue(tmp_path):
+    inbox = tmp_path / "replies.txt"
+    log = ImpedimentLog(tmp_path / "impediments.jsonl")
+
+    async def run():
+        dm = AsyncDialogManager(FileQueueChannel(inbox, tmp_path / "prompts.txt", poll=0.01),
+                                max_invalid_attempts=2, impediments=log)
+        tasks = [asyncio.ensure_future(dm.select_option(["A", "B", "C"], timeout_seconds=5)) for _ in range(3)]
+        slow = asyncio.ensure_future(dm.select_option(["X"], timeout_seconds=0.05))
+        await asyncio.sleep(0.05)
+        # replies arrive out of order and interleaved; 3 first gets an invalid reply
+        inbox.write_text("2:3\n3:zz\n1: y\n3:2\n")
+        results = await asyncio.gather(*tasks, slow)
+        await dm.aclose()
+        return results
+
+    assert asyncio.run(run()) == ["y", "C", "B", None]
+    # the unanswered dialog timed out twice and raised an impediment
+    entries = list(log.iter_entries(reason="too_many_invalid_replies"))
+    assert [e["context"]["options"] for e in entries] == [["X"]]
+    assert "[4] Choose an option:" in (tmp_path / "prompts.txt").read_text()
+
+
+def test_bare_reply_and_eof_on_stream(tmp_path):
+    log = ImpedimentLog(tmp_path / "impediments.jsonl")
+
+    async def run():
+        reader = asyncio.StreamReader()
+        dm = AsyncDialogManager(StreamChannel(reader), impediments=log)
+        first = asyncio.ensure_future(dm.select_option(["A", "B"]))
+        second = asyncio.ensure_future(dm.select_option(["A", "B"]))
+        await asyncio.sleep(0)
+        reader.feed_data(b"1\n")  # no dialog id: goes to the oldest pending dialog
+        await asyncio.sleep(0.01)
+        reader.feed_eof()
+        return await asyncio.gather(first, second)
+
+    assert asyncio.run(run()) == ["A", None]
+    entries = list(log.iter_entries())
+    assert len(entries) == 1 and entries[0]["context"]["input_closed"] is True
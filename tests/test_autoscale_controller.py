@@ -0,0 +1,118 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+import json  # noqa: E402
+import os  # noqa: E402
+
+from autoscale_controller import DocCache, RoleIndex, recommend, wait_for_change  # noqa: E402
+
+
+def roles_for(*specs):
+    return {"agentRoles": {"agents": [
+        {"name": n, "priority": p, "resources": {"vramGB": v, "memoryGB": m, "cpus": c}}
+        for n, p, v, m, c in specs
+    ]}}
+
+
+def test_skewed_sizes_admit_small_agents_and_queue_large():
+    roles = roles_for(("Low-1", "medium", 19, 32, 4), *[(f"Low-{i}", "medium", 2, 4, 2) for i in range(2, 11)])
+    agents = [{"name": f"Low-{i}", "vram": 0} for i in range(1, 11)]
+    rec = recommend(agents, roles, 24)
+    names = [a["name"] for a in rec["admitted"]]
+    assert "Low-1" not in names
+    assert len(names) == 9
+    assert rec["queue"] == ["Low-1"]
+    assert rec["MaxParallel"] == 9
+    assert rec["usedVramGB"] <= 24
+
+
+def test_multi_dimensional_budget_and_gpus():
+    roles = roles_for(("A", "high", 10, 8, 2), ("B", "medium", 10, 8, 2), ("C", "medium", 4, 30, 2))
+    agents = [{"name": n} for n in "ABC"]
+    # memory caps the set even though VRAM would fit all three on two cards
+    rec = recommend(agents, roles, 24, available_memory_gb=20, vram_bins=[12, 12])
+    assert [a["name"] for a in rec["admitted"]] == ["A", "B"]
+    assert sorted(a["gpu"] for a in rec["admitted"]) == [0, 1]
+    assert rec["queue"] == ["C"]
+
+
+def test_higher_priority_work_preempts_running_agent():
+    roles = roles_for(("Run", "low", 16, 4, 2), ("Urgent", "high", 16, 4, 2))
+    agents = [{"name": "Run", "status": "running"}, {"name": "Urgent"}]
+    rec = recommend(agents, roles, 24)
+    assert [a["name"] for a in rec["admitted"]] == ["Urgent"]
+    assert rec["preempt"][0]["name"] == "Run"
+    assert rec["preempt"][0]["reason"] == "higher-priority work"
+
+
+def test_running_agent_kept_over_same_priority_newcomer():
+    roles = roles_for(("Run", "medium", 16, 4, 2), ("New", "medium", 8, 4, 2), ("New2", "medium", 8, 4, 2))
+    agents = [{"name": "New"}, {"name": "New2"}, {"name": "Run", "status": "running"}]
+    rec = recommend(agents, roles, 24)
+    assert rec["admitted"][0]["name"] == "Run"
+    assert rec["preempt"] == []
+
+
+def test_role_index_lookups_and_cheapest_skill():
+    roles = {"agentRoles": {"agents": [
+        {"name": "Big", "labels": ["gpu"], "skills": ["nlp:code-review", "qa:unit-test"],
+         "resources": {"vramGB": 19, "memoryGB": 32, "cpus": 4}},
+        {"name": "Small", "labels": ["low-resource"], "skills": ["qa:unit-test"],
+         "resources": {"vramGB": 2, "memoryGB": 4, "cpus": 2}},
+        {"name": "Mid", "labels": ["low-resource"], "skills": ["nlp:code-review"],
+         "resources": {"vramGB": 8, "memoryGB": 8, "cpus": 2}},
+    ]}}
+    idx = RoleIndex(roles)
+    assert idx.get("Mid")["resources"]["vramGB"] == 8
+    assert [r["name"] for r in idx.with_label("low-resource")] == ["Small", "Mid"]
+    assert [r["name"] for r in idx.with_skill("nlp:code-review")] == ["Mid", "Big"]
+    assert idx.cheapest_with_skill("qa:unit-test")["name"] == "Small"
+    assert idx.cheapest_with_skill("qa:unit-test", exclude={"Small"})["name"] == "Big"
+    assert idx.cheapest_with_skills(["qa:unit-test", "nlp:code-review"])["name"] == "Big"
+    assert idx.cheapest_with_skill("vision:ocr") is None
+    # recommend accepts a prebuilt index
+    assert recommend([{"name": "Small"}], idx, 24)["admitted"][0]["vramGB"] == 2
+
+
+def _write(path, doc, bump_ns):
+    path.write_text(json.dumps(doc), encoding="utf-8")
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + bump_ns))
+
+
+def test_doc_cache_skips_identical_rewrites(tmp_path):
+    path = tmp_path / "agents-epic.json"
+    _write(path, [{"name": "A"}], 0)
+    docs = DocCache()
+    first = docs.get(path)
+    assert first == [{"name": "A"}]
+    _write(path, [{"name": "A"}], 10**9)
+    assert docs.stale(path)
+    assert docs.refresh(path) is False
+    assert docs.get(path) is first
+    _write(path, [{"name": "B"}], 2 * 10**9)
+    assert docs.refresh(path) is True
+    assert docs.get(path) == [{"name": "B"}]
+
+
+def test_wait_for_change_debounces_write_burst(tmp_path):
+    path = tmp_path / "agents-epic.json"
+    _write(path, [], 0)
+    docs = DocCache()
+    docs.get(path)
+    clock = [0.0]
+    writes = iter(range(1, 4))
+
+    def sleep(s):
+        clock[0] += s
+        n = next(writes, None)
+        if n is not None:
+            _write(path, [{"name": f"A{i}"} for i in range(n)], n * 10**9)
+
+    changed = wait_for_change(docs, [path], poll=0.5, debounce=1.0, sleep=sleep, clock=lambda: clock[0])
+    assert changed == [path]
+    assert len(docs.get(path)) == 3
+    # three writes, then at least the debounce window of quiet time
+    assert clock[0] >= 3 * 0.5 + 1.0
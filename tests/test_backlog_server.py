@@ -0,0 +1,110 @@
+import threading
+import time
+
+import pytest
+
+from services.backlog.backlog_store import BacklogStore
+from services.backlog.controller import Controller
+from services.backlog.server import BacklogClient, BacklogService, make_server
+
+
+@pytest.fixture
+def served(tmp_path):
+    db = tmp_path / "db.sqlite"
+    service = BacklogService(Controller(db_path=db, roles_path=tmp_path / "none.json"), poll=0.05)
+    service.start_watcher()
+    srv = make_server("127.0.0.1:0", service)
+    t = threading.Thread(target=srv.serve_forever, args=(0.05,), daemon=True)
+    t.start()
+    yield db, BacklogClient("127.0.0.1:%d" % srv.server_address[1], timeout=5)
+    service.stop()
+    srv.shutdown()
+    srv.server_close()
+
+
+def test_server_crud_and_claims(served):
+    _, client = served
+    assert [i["id"] for i in client.add([{"title": "a"}, {"title": "b", "priority": "high"}])] == [1, 2]
+    assert [i["title"] for i in client.claim("w1")] == ["b"]
+    assert [i["id"] for i in client.list(status="open")] == [1]
+    assert client.heartbeat(2, "w1") and not client.heartbeat(2, "w2")
+    assert client.release(2, "w1")
+    assert client.complete(1)
+    assert [i["id"] for i in client.list(status="open")] == [2]
+    assert client.request("GET", "/items/99") == {"error": "not found"}
+
+
+def test_claim_long_polls_for_new_items(served):
+    db, client = served
+    got = {}
+    waiter = threading.Thread(target=lambda: got.setdefault("items", client.claim("w1", wait=5)))
+    waiter.start()
+    time.sleep(0.1)
+    start = time.monotonic()
+    client.add({"title": "late"})
+    waiter.join(5)
+    assert [i["title"] for i in got["items"]] == ["late"]
+    assert time.monotonic() - start < 1
+
+    # items written straight to the store by another process are picked up by the watcher
+    since = client.request("GET", "/health")["version"]
+    BacklogStore(path=db).add("external")
+    assert client.wait(since, timeout=5)["opened"] is True
+    assert [i["title"] for i in client.claim("w2", wait=1)] == ["external"]
+    assert client.claim("w3", wait=0.1) == []
+
+
+def test_controller_cli_uses_server(served, capsys):
+    import json
+
+    from services.backlog import controller_cli
+
+    _, client = served
+    client.add({"title": "remote"})
+    controller_cli.main(["--server", client.address, "claim-next", "--owner", "w1"])
+    out = json.loads(capsys.readouterr().out)
+    assert out["claimed"] and out["item"]["owner"] == "w1"
+    controller_cli.main(["--server", client.address, "complete", str(out["item"]["id"])])
+    assert capsys.readouterr().out.strip() == "ok"
+
+
+def test_unix_address_rejected_without_unix_sockets(monkeypatch, tmp_path):
+    from services.backlog import server
+
+    monkeypatch.setattr(server, "UnixServer", None)
+    service = BacklogService(Controller(db_path=tmp_path / "db.sqlite", roles_path=tmp_path / "none.json"))
+    with pytest.raises(OSError, match="not supported"):
+        make_server(f"unix:{tmp_path / 'backlog.sock'}", service)
+    service.controller.store.close()
+
+
+@pytest.mark.parametrize("suffix", [".json", ".journal", ".sqlite"])
+def test_watcher_rescans_only_on_external_change(tmp_path, monkeypatch, suffix):
+    db = tmp_path / f"db{suffix}"
+    controller = Controller(db_path=db, lease_seconds=60, roles_path=tmp_path / "none.json")
+    clock = [1000.0]
+    controller.store.clock = lambda: clock[0]
+    service = BacklogService(controller)
+    scans = []
+    iter_all = controller.store.iter_all
+    monkeypatch.setattr(controller.store, "iter_all", lambda: scans.append(1) or iter_all())
+
+    service.add([{"title": "a"}, {"title": "b"}])
+    assert [i.title for i in service.claim("w1")] == ["a"]
+    version = service.version
+    for _ in range(3):
+        service.check_external()
+    assert scans == [] and service.version == version
+
+    # an expired lease reopens the item without a rescan
+    clock[0] += 61
+    service.check_external()
+    assert scans == [] and service.open_version > version and service._open_ids == {1, 2}
+
+    other = BacklogStore(path=db)
+    other.add("external")
+    other.close()
+    version = service.open_version
+    service.check_external()
+    assert scans == [1] and service.open_version > version and service._open_ids == {1, 2, 3}
+    controller.store.close()
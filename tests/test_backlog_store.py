@@ -51,3 +51,146 @@ def test_claim_release_complete(tmp_path):
     ok = store.complete(it.id)
     assert ok
     assert store.get(it.id).status == "done"
+
+
+def test_sqlite_backend_matches_json(tmp_path):
+    src = BacklogStore(path=tmp_path / "db.json")
+    src.add("a", "first")
+    b = src.add("b")
+    src.claim(b.id, "worker-1")
+    store = BacklogStore(path=tmp_path / "db.sqlite")
+    assert store.import_json(tmp_path / "db.json") == 2
+    assert store.get(b.id).owner == "worker-1"
+    assert [i.title for i in store.list_open()] == ["a"]
+    assert [i.id for i in store.list_owned("worker-1")] == [b.id]
+    assert store.add("c").id == 3
+    assert not store.claim(b.id, "worker-2")
+    assert store.release(b.id) and store.claim(b.id, "worker-2")
+    assert store.complete(b.id)
+    store.close()
+    reopened = BacklogStore(path=tmp_path / "db.sqlite")
+    assert [(i.id, i.status) for i in reopened.list()] == [(1, "open"), (2, "done"), (3, "open")]
+    assert reopened.export_json(tmp_path / "out.json") == 3
+    assert len(BacklogStore(path=tmp_path / "out.json").list()) == 3
+
+
+def test_journal_replays_and_compacts(tmp_path):
+    db = tmp_path / "db.journal"
+    store = BacklogStore(path=db)
+    for t in ("a", "b", "c"):
+        store.add(t)
+    store.claim(2, "w1")
+    store.complete(3)
+    assert len(db.read_text().splitlines()) == 5
+    assert not (tmp_path / "db.journal.snapshot").exists()
+
+    # a crash mid-append leaves a torn line: it is ignored, then trimmed
+    with open(db, "ab") as fh:
+        fh.write(b'{"seq": 6, "put": {"id": 1, "ti')
+    s2 = BacklogStore(path=db)
+    assert [(i.id, i.status, i.owner) for i in s2.list()] == [(1, "open", None), (2, "claimed", "w1"), (3, "done", None)]
+    assert s2.add("d").id == 4
+    assert len(db.read_text().splitlines()) == 6
+
+    s2.compact()
+    assert db.read_text() == ""
+    snapshot = (tmp_path / "db.journal.snapshot").read_text()
+    # crash between snapshot and journal rewrite: old records are skipped by seq
+    db.write_text("\n".join(['{"seq": 1, "put": {"id": 1, "title": "stale"}}'] * 3) + "\n")
+    s3 = BacklogStore(path=db)
+    assert [i.title for i in s3.list()] == ["a", "b", "c", "d"]
+    assert (tmp_path / "db.journal.snapshot").read_text() == snapshot
+    s3.release(2)
+    store.claim(4, "w2")  # stale instance catches up on the journal tail first
+    assert [i.status for i in BacklogStore(path=db).list()] == ["open", "open", "done", "claimed"]
+
+
+def test_journal_compacts_automatically(tmp_path):
+    from services.backlog.storage import JournalBackend
+
+    db = tmp_path / "db.journal"
+    store = BacklogStore(path=db, backend=JournalBackend(db, compact_every=10))
+    for i in range(25):
+        store.add(f"t{i}")
+    assert len(db.read_text().splitlines()) == 5
+    assert len(BacklogStore(path=db).list()) == 25
+
+
+def test_journal_syncs_pending_tail_when_idle(tmp_path, monkeypatch):
+    import os
+    import time
+
+    from services.backlog.storage import JournalBackend
+
+    synced = []
+    real_fsync = os.fsync
+    monkeypatch.setattr(os, "fsync", lambda fd: (synced.append(fd), real_fsync(fd)))
+    db = tmp_path / "db.journal"
+    backend = JournalBackend(db, fsync_every=1000, fsync_interval=0.05)
+    store = BacklogStore(path=db, backend=backend)
+    for t in ("a", "b", "c"):
+        store.add(t)
+    # a burst followed by idle time: the timer syncs the tail without another append
+    deadline = time.monotonic() + 5
+    while backend._unsynced and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert backend._unsynced == 0 and synced
+    backend.close()
+
+
+def test_add_many_update_many_and_bulk_io(tmp_path):
+    from services.backlog import bulk
+    from services.backlog.jira_stub import JiraStub, mirror_items
+
+    seed = tmp_path / "seed.jsonl"
+    seed.write_text('{"title": "a", "priority": "high", "required_skills": "x, y"}\n\n{"title": "b"}\n')
+    for name in ("db.json", "db.sqlite", "db.journal"):
+        store = BacklogStore(path=tmp_path / name)
+        assert bulk.import_file(store, seed, batch_size=1) == 2
+        added = store.add_many({"title": f"t{i}", "estimated_cost": 2} for i in range(3))
+        assert [i.id for i in added] == [3, 4, 5]
+        assert store.update_many({1: {"status": "done"}, 4: {"priority": "low"}, 99: {"status": "done"}}) == 2
+        out = tmp_path / f"{name}.csv"
+        assert bulk.export_file(store, out) == 5
+        copy = BacklogStore(path=tmp_path / f"copy-{name}")
+        assert bulk.import_file(copy, out) == 5
+        got = copy.get(1)
+        assert (got.title, got.priority, got.required_skills) == ("a", "high", ("x", "y"))
+        assert copy.get(4).priority == "low" and copy.get(4).estimated_cost == 2.0
+    assert mirror_items(JiraStub(), store.list_open()) == {2: "JIRA-1", 3: "JIRA-2", 4: "JIRA-3", 5: "JIRA-4"}
+
+
+def test_items_are_slotted_and_paginated(tmp_path):
+    import sys
+
+    for name in ("db.json", "db.sqlite", "db.journal"):
+        store = BacklogStore(path=tmp_path / name)
+        store.add_many({"title": f"t{i}", "required_skills": ["nlp:code-review"]} for i in range(1200))
+        store.update_many({i: {"status": "done"} for i in range(1, 1201, 3)})
+        first = store.get(2)
+        assert not hasattr(first, "__dict__")
+        assert first.required_skills[0] is sys.intern("nlp:code-review")
+        open_ids = [i.id for i in store.iter_open()]
+        assert len(open_ids) == 800 and open_ids[:3] == [2, 3, 5]
+        assert [i.id for i in store.list_open(offset=2, limit=3)] == open_ids[2:5]
+        assert [i.id for i in store.list(offset=1198)] == [1199, 1200]
+        assert len(store.list()) == 1200
+
+
+def test_controller_cli_streams_list_open(tmp_path, capsys):
+    import json
+
+    from services.backlog import controller_cli
+
+    db = tmp_path / "db.sqlite"
+    store = BacklogStore(path=db)
+    for t in ("a", "b", "c"):
+        store.add(t)
+    controller_cli.main(["--db", str(db), "list-open"])
+    out = capsys.readouterr().out
+    assert out == json.dumps(json.loads(out), indent=2) + "\n"
+    assert [i["title"] for i in json.loads(out)] == ["a", "b", "c"]
+    controller_cli.main(["--db", str(db), "list-open", "--jsonl", "--offset", "1", "--limit", "1"])
+    assert [json.loads(line)["title"] for line in capsys.readouterr().out.splitlines()] == ["b"]
+    controller_cli.main(["--db", str(tmp_path / "empty.json"), "list-open"])
+    assert capsys.readouterr().out == "[]\n"
@@ -0,0 +1,27 @@
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+import bench  # noqa: E402
+
+
+def test_compare_flags_only_real_slowdowns():
+    baseline = {"results": {"a": 0.010, "b": 0.0001, "c": 0.010}, "thresholds": {"c": 3.0}}
+    rows = {r[0]: r[4] for r in bench.compare({"a": 0.020, "b": 0.0003, "c": 0.020, "d": 1.0}, baseline)}
+    # b is 3x slower but only by 0.2 ms; c has a looser per-metric threshold
+    assert rows == {"a": "REGRESSION", "b": "ok", "c": "ok", "d": "new"}
+
+
+def test_cli_writes_results_and_fails_on_regression(tmp_path):
+    out, base = tmp_path / "results.json", tmp_path / "baseline.json"
+    args = ["--suite", "recommend", "--suite", "impediments", "--quick", "--output", str(out), "--baseline", str(base)]
+    assert bench.main(args + ["--save-baseline"]) == 0
+    doc = json.loads(out.read_text())
+    assert {"meta", "results"} <= set(doc) and any(k.startswith("recommend.") for k in doc["results"])
+    # pretend the baseline was 100x faster
+    saved = json.loads(base.read_text())
+    saved["results"] = {k: v / 100 for k, v in saved["results"].items()}
+    base.write_text(json.dumps(saved))
+    assert bench.main(args + ["--min-delta", "0"]) == 1
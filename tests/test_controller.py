@@ -1,3 +1,4 @@
+import json
 from services.backlog.controller import Controller
 from services.backlog.backlog_store import BacklogStore
 from pathlib import Path
@@ -32,3 +33,104 @@ def test_release_and_complete(tmp_path):
     # reload store to observe persisted state
     store2 = BacklogStore(path=db)
     assert store2.get(claimed2.id).status == "done"
+
+
+def test_leases_expire_and_heartbeat(tmp_path):
+    now = [0.0]
+    for name in ("db.json", "db.sqlite", "db.journal"):
+        now[0] = 1000.0
+        store = BacklogStore(path=tmp_path / name, clock=lambda: now[0])
+        for t in ("a", "b", "c"):
+            store.add(t)
+        batch = store.claim_batch("w1", 2, lease_seconds=30)
+        assert [i.id for i in batch] == [1, 2]
+        assert all(i.lease_expires == 1030.0 for i in batch)
+        now[0] = 1020.0
+        assert store.heartbeat(1, "w1", 30)
+        assert not store.heartbeat(1, "w2", 30)
+        now[0] = 1040.0
+        # item 2 expired and is handed out again; item 1 was kept alive
+        assert [i.id for i in store.claim_batch("w2", 5, lease_seconds=30)] == [2, 3]
+        assert not store.heartbeat(2, "w1", 30)
+        assert not store.release(1, owner="w2")
+        assert store.release(1, owner="w1")
+        now[0] = 2000.0
+        assert store.expire_leases() == 2
+        assert len(store.list_open()) == 3
+
+
+def _claim_worker(args):
+    db, owner = args
+    ctrl = Controller(db_path=Path(db))
+    got = []
+    while True:
+        it = ctrl.claim_next(owner)
+        if it is None:
+            return got
+        got.append(it.id)
+
+
+def test_claim_next_is_exclusive_across_processes(tmp_path):
+    from concurrent.futures import ProcessPoolExecutor
+
+    for name in ("db.json", "db.sqlite", "db.journal"):
+        db = tmp_path / name
+        store = BacklogStore(path=db)
+        for i in range(40):
+            store.add(f"t{i}")
+        with ProcessPoolExecutor(max_workers=4) as ex:
+            results = list(ex.map(_claim_worker, [(str(db), f"w{i}") for i in range(4)]))
+        claimed = [i for r in results for i in r]
+        assert sorted(claimed) == list(range(1, 41))
+        assert {it.status for it in BacklogStore(path=db).list()} == {"claimed"}
+
+
+def test_claim_next_matches_priority_skills_and_cost(tmp_path):
+    roles = tmp_path / "agent-roles.json"
+    roles.write_text(json.dumps({"agentRoles": {"agents": [
+        {"name": "Small", "skills": ["nlp:code-review"], "resources": {"vramGB": 2}},
+        {"name": "Big", "skills": ["nlp:code-review", "nlp:unit-test-gen"], "resources": {"vramGB": 19}},
+    ]}}))
+    for name in ("db.json", "db.sqlite"):
+        db = tmp_path / name
+        store = BacklogStore(path=db)
+        store.add("plain-low", priority="low")
+        store.add("review-big", priority="high", required_skills=["nlp:code-review"], estimated_cost=16)
+        store.add("review", priority="medium", required_skills=["nlp:code-review"], estimated_cost=1.5)
+        store.add("tests", priority="critical", required_skills=["nlp:unit-test-gen", "nlp:code-review"])
+        store.add("plain", priority="medium")
+        ctrl = Controller(db_path=db, roles_path=roles)
+        assert [i.title for i in ctrl.claim_batch("Small", 2)] == ["review", "plain"]
+        assert [i.title for i in ctrl.claim_batch("Big", 2)] == ["tests", "review-big"]
+        assert [i.title for i in ctrl.claim_batch("Unknown", 5)] == ["plain-low"]
+        assert BacklogStore(path=db).get(4).required_skills == ("nlp:code-review", "nlp:unit-test-gen")
+
+
+def test_work_queue_buckets_stay_bounded_with_distinct_costs():
+    import random
+
+    from services.backlog.storage import BacklogItem
+    from services.backlog.work_queue import WorkQueue, priority_rank
+
+    rnd = random.Random(7)
+    items = {i: BacklogItem(id=i, title=f"t{i}", priority=rnd.choice(["critical", "high", "medium", "low"]),
+                            required_skills=rnd.choice([(), ("a",), ("a", "b")]),
+                            estimated_cost=rnd.choice([None, round(rnd.uniform(0.1, 48), 3)]))
+             for i in range(1, 5001)}
+    queue = WorkQueue()
+    queue.rebuild(items.values())
+    capacities = [None, 2, 7.5, 19, 24]
+
+    def brute(skills, capacity):
+        ok = [it for it in items.values() if it.status == "open" and set(it.required_skills) <= skills
+              and (capacity is None or it.estimated_cost is None or it.estimated_cost <= capacity)]
+        return min(ok, key=lambda it: (priority_rank(it.priority), it.id)).id if ok else None
+
+    for _ in range(600):
+        skills, capacity = frozenset(rnd.choice([(), ("a",), ("a", "b")])), rnd.choice(capacities)
+        expected = brute(skills, capacity)
+        assert queue.best(items.get, skills, capacity) == expected
+        if expected is not None:
+            items[expected].status = "claimed"
+        # 4,000+ distinct costs, but heaps only per skill set and agent capacity class
+        assert queue.bucket_count() <= 3 * (len(capacities) + 1)
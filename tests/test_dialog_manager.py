@@ -1,6 +1,8 @@
 from services.comm.dialog_manager import DialogManager
+from services.comm.impediments import ImpedimentLog, summarize
 from pathlib import Path
 import json
+import os
 
 
 def test_select_numeric_option(tmp_path, monkeypatch):
@@ -19,11 +21,71 @@ def test_impediment_written(tmp_path):
     # use small max_invalid_attempts for test
     dm = DialogManager(max_options=3, max_invalid_attempts=2)
     # ensure impediments file path is inside repo .continue
-    imp = Path.cwd() / ".continue" / "impediments.json"
+    imp = Path.cwd() / ".continue" / "impediments.jsonl"
     if imp.exists():
         imp.unlink()
     res = dm.select_option(["A", "B"], responses=["x", "", ""])  # 2 invalid then third triggers
     assert res is None
     assert imp.exists()
-    data = json.loads(imp.read_text())
+    data = [json.loads(line) for line in imp.read_text().splitlines()]
     assert any(d.get("reason") == "too_many_invalid_replies" for d in data)
+
+
+def test_impediment_log_rotation_and_filters(tmp_path):
+    now = [1000.0]
+    log = ImpedimentLog(tmp_path / "impediments.jsonl", max_bytes=200, keep=2, clock=lambda: now[0])
+    for i in range(12):
+        now[0] += 10
+        log.append("timeout" if i % 3 else "too_many_invalid_replies", {"i": i})
+    assert 1 <= len(log.segments()) <= 2  # older segments pruned
+    kept = list(log.iter_entries())
+    assert [e["context"]["i"] for e in kept] == list(range(12 - len(kept), 12))
+    assert all(e["reason"] == "timeout" for e in log.iter_entries(reason="timeout"))
+    window = list(log.iter_entries(since=1100, until=1120))
+    assert [e["ts"] for e in window] == [1100, 1110]
+    summary = summarize(log.iter_entries())
+    assert sum(s["count"] for s in summary.values()) == len(kept)
+    assert summary["timeout"]["last"] == 1120
+
+
+def test_impediment_log_age_rotation_and_legacy(tmp_path):
+    now = [0.0]
+    legacy = tmp_path / "impediments.json"
+    legacy.write_text(json.dumps([{"reason": "old", "context": {}, "ts": -5}]))
+    log = ImpedimentLog(tmp_path / "impediments.jsonl", max_age_seconds=60, clock=lambda: now[0])
+    log.append("a", {})
+    now[0] = 30
+    log.append("b", {})
+    assert log.segments() == []
+    now[0] = 61
+    log.append("c", {})
+    assert len(log.segments()) == 1
+    assert [e["reason"] for e in log.iter_entries()] == ["old", "a", "b", "c"]
+    # a torn trailing line is skipped rather than breaking the reader
+    with open(log.path, "a", encoding="utf-8") as fh:
+        fh.write('{"reason": "par')
+    assert [e["reason"] for e in log.iter_entries()][-1] == "c"
+
+
+def test_impediment_rotation_races(tmp_path, monkeypatch):
+    log = ImpedimentLog(tmp_path / "impediments.jsonl", max_bytes=1, keep=10, clock=lambda: 1000.0)
+    for i in range(4):
+        log.append("r", {"i": i})
+    # every rotation in the same millisecond still gets its own segment
+    assert [p.name for p in log.segments()] == [f"impediments.jsonl.{1000000 + i}" for i in range(3)]
+    assert [e["context"]["i"] for e in log.iter_entries()] == [0, 1, 2, 3]
+
+    # a refused rename (Windows: file open in another agent) skips rotation instead of failing
+    def refuse(src, dst):
+        raise PermissionError(13, "in use")
+
+    monkeypatch.setattr(os, "replace", refuse)
+    log.append("r", {"i": 4})
+    monkeypatch.undo()
+    assert len(log.segments()) == 3
+    assert [e["context"]["i"] for e in log.iter_entries()] == [0, 1, 2, 3, 4]
+
+    # a segment pruned between listing and reading is skipped
+    listed = log.segments() + [tmp_path / "impediments.jsonl.1"]
+    monkeypatch.setattr(log, "segments", lambda: listed)
+    assert len(list(log.iter_entries(since=0))) == 5
@@ -0,0 +1,69 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+import json_validation  # noqa: E402
+from json_validation import PassCache, iter_jsonl, validate_many  # noqa: E402
+
+SCHEMA = {"type": "object", "required": ["request_id"], "properties": {"request_id": {"type": "string"}}}
+
+
+def test_iter_jsonl_streams_lines_and_parse_errors(tmp_path):
+    path = tmp_path / "requests.jsonl"
+    path.write_text('{"request_id": "a"}\n\n{broken\n{"request_id": "b"}\n', encoding="utf-8")
+    rows = list(iter_jsonl(path))
+    assert [n for n, _ in rows] == [1, 3, 4]
+    assert isinstance(rows[1][1], ValueError)
+
+
+def test_pass_cache_roundtrip(tmp_path):
+    cache = PassCache(tmp_path / "cache.json")
+    cache.add("c1", "s1")
+    cache.save()
+    again = PassCache(tmp_path / "cache.json")
+    assert ("c1", "s1") in again and ("c1", "s2") not in again
+
+
+def test_incremental_skips_passed_and_revalidates_edits(tmp_path, monkeypatch):
+    pytest.importorskip("jsonschema")
+    schema = tmp_path / "request.schema.json"
+    schema.write_text(json.dumps(SCHEMA), encoding="utf-8")
+    good = tmp_path / "good.jsonl"
+    good.write_text('{"request_id": "a"}\n{"request_id": "b"}\n', encoding="utf-8")
+    bad = tmp_path / "bad.json"
+    bad.write_text('{"title": "x"}', encoding="utf-8")
+    cache = PassCache(tmp_path / "cache.json")
+
+    first = validate_many([(good, schema), (bad, schema), (tmp_path / "missing.json", schema)], jobs=1,
+                          pass_cache=cache)
+    assert [r["ok"] for r in first] == [True, False]
+    assert first[0]["documents"] == 2 and "request_id" in first[1]["message"]
+
+    calls = []
+    monkeypatch.setattr(json_validation, "get_validator",
+                        lambda *a, _orig=json_validation.get_validator: calls.append(a) or _orig(*a))
+    second = validate_many([(good, schema), (bad, schema)], jobs=1, pass_cache=PassCache(cache.path))
+    assert second[0].get("skipped") and not second[1]["ok"]
+    assert len(calls) == 1  # only the failing file was validated again
+
+    good.write_text('{"request_id": 1}\n', encoding="utf-8")
+    third = validate_many([(good, schema)], jobs=1, pass_cache=PassCache(cache.path))
+    assert not third[0]["ok"] and third[0]["message"].startswith("line 1:")
+
+
+def test_process_pool_matches_serial(tmp_path):
+    pytest.importorskip("jsonschema")
+    schema = tmp_path / "request.schema.json"
+    schema.write_text(json.dumps(SCHEMA), encoding="utf-8")
+    pairs = []
+    for i in range(12):
+        p = tmp_path / f"doc{i}.json"
+        p.write_text(json.dumps({"request_id": f"r{i}"} if i % 3 else {}), encoding="utf-8")
+        pairs.append((p, schema))
+    serial = [r["ok"] for r in validate_many(pairs, jobs=1)]
+    pooled = [r["ok"] for r in validate_many(pairs, jobs=2)]
+    assert serial == pooled == [bool(i % 3) for i in range(12)]
@@ -0,0 +1,88 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+from autoscale_controller import live_budget, recommend  # noqa: E402
+from resource_sampler import COLUMNS, FakeGpuSource, ProcSampler, headroom, snapshot  # noqa: E402
+
+
+def fake_proc(root, cpu_line="cpu 600 0 200 1000 200 0 0 0", utime=150, stime=50):
+    root.mkdir(exist_ok=True)
+    (root / "stat").write_text(f"{cpu_line}\nbtime 1700000000\n")
+    (root / "uptime").write_text("100.00 50.00\n")
+    (root / "meminfo").write_text("MemTotal: 33554432 kB\nMemAvailable: 16777216 kB\n")
+    pid = root / "42"
+    (pid / "fd").mkdir(parents=True, exist_ok=True)
+    (pid / "fd" / "0").write_text("")
+    (pid / "comm").write_text("ollama\n")
+    fields = ["S"] + ["0"] * 10 + [str(utime), str(stime)] + ["0"] * 4 + ["7", "0", "1000"] + ["0"] * 10
+    (pid / "stat").write_text("42 (ollama serve) " + " ".join(fields) + "\n")
+    (pid / "status").write_text("Threads:\t7\nVmSize:\t 2048000 kB\nVmRSS:\t 1024000 kB\nRssAnon:\t 512000 kB\n")
+    (pid / "io").write_text("read_bytes: 4096\nwrite_bytes: 8192\n")
+    return root
+
+
+def test_sampler_reads_process_and_host(tmp_path):
+    proc = fake_proc(tmp_path / "proc")
+    now = [0.0]
+    sampler = ProcSampler(proc, clock=lambda: now[0], sleep=lambda s: None)
+    sampler.ticks = 100
+    assert sampler.find_pids("ollama") == [42]
+    snap = snapshot(sampler, FakeGpuSource([(24, 6)]), pids=[42], role="ollama")
+    row = snap["Samples"][0]
+    assert set(row) == set(COLUMNS)
+    # 2s of CPU over 90s of lifetime (uptime 100s, started at tick 1000)
+    assert row["CPUPercent"] == round(200 / 100 / 90 * 100, 2)
+    assert (row["WorkingSetMB"], row["PrivateMB"], row["Threads"], row["Handles"]) == (1000.0, 500.0, 7, 1)
+    assert (row["IOReadBytes"], row["IOWriteBytes"], row["Alive"]) == (4096, 8192, True)
+    assert snap["Host"]["memoryAvailableGB"] == 16.0
+    # no time passed between the priming and the real reading: unknown, not the since-boot average
+    assert snap["Host"]["cpuPercent"] is None
+
+    # second sample uses the delta since the first one
+    fake_proc(proc, cpu_line="cpu 700 0 200 1900 200 0 0 0", utime=250)
+    now[0] = 2.0
+    assert sampler.sample_pid(42)["CPUPercent"] == 50.0
+    assert sampler.host()["cpuPercent"] == 10.0
+    assert sampler.sample_pid(99)["Alive"] is False
+
+
+def test_first_host_sample_measures_current_load(tmp_path):
+    proc = fake_proc(tmp_path / "proc")
+    waited = []
+
+    def sleep(seconds):
+        # 90% busy during the priming interval; since boot the host was only 40% busy
+        waited.append(seconds)
+        fake_proc(proc, cpu_line="cpu 1500 0 200 1100 200 0 0 0")
+
+    sampler = ProcSampler(proc, prime_seconds=0.1, sleep=sleep)
+    assert sampler.host()["cpuPercent"] == 90.0
+    assert waited == [0.1]
+    sampler.host()
+    assert waited == [0.1]
+
+
+def test_headroom_applies_pressure_thresholds():
+    snap = {"Host": {"memoryAvailableGB": 16.0, "cpus": 8, "cpuPercent": 30.0}, "Gpus": FakeGpuSource([(24, 20), (12, 2)]).query()}
+    head = headroom(snap, {"MemoryPressureThresholdGB": 6, "CpuPressurePercent": 80})
+    assert head == {"vramGB": 14.0, "vramBins": [4.0, 10.0], "memoryGB": 10.0, "cpus": 4.0, "pressure": False}
+    snap["Host"]["cpuPercent"] = 95.0
+    assert headroom(snap)["pressure"] is True
+    assert headroom({"Host": {}, "Gpus": []})["vramGB"] is None
+
+
+def test_live_budget_adds_back_running_agents():
+    head = {"vramBins": [4.0, 10.0], "memoryGB": 10.0, "cpus": 4.0}
+    budget = live_budget(head, {"vramGB": 16, "memoryGB": 8, "cpus": 2}, 24)
+    assert budget == {"vram_bins": [20.0, 10.0], "memoryGB": 18.0, "cpus": 6.0}
+    roles = {"agentRoles": {"agents": [
+        {"name": "Big", "priority": "high", "resources": {"vramGB": 16, "memoryGB": 8, "cpus": 2}},
+        {"name": "Small", "priority": "medium", "resources": {"vramGB": 8, "memoryGB": 4, "cpus": 2}},
+    ]}}
+    agents = [{"name": "Big", "status": "running"}, {"name": "Small"}]
+    rec = recommend(agents, roles, 30, 1, 4, available_memory_gb=budget["memoryGB"],
+                    available_cpus=budget["cpus"], vram_bins=budget["vram_bins"])
+    assert rec["MaxParallel"] == 2
+    assert rec["queue"] == []
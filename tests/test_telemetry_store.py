@@ -0,0 +1,69 @@
+import sys
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+from telemetry_store import TelemetryRing, stable_change, summarize  # noqa: E402
+
+
+def test_ring_wraps_at_fixed_size(tmp_path):
+    path = tmp_path / "metrics.ring"
+    ring = TelemetryRing(path, capacity=8)
+    size = path.stat().st_size
+    for i in range(20):
+        ring.append({"ts": 100 + i, "MaxParallel": i, "headroomVramGB": None})
+    assert path.stat().st_size == size
+    recs = TelemetryRing(path).records()
+    assert [r["MaxParallel"] for r in recs] == list(range(12, 20))
+    assert recs[-1]["headroomVramGB"] is None
+    # shrinking the capacity keeps the newest samples
+    assert [r["MaxParallel"] for r in TelemetryRing(path, capacity=3).records()] == [17, 18, 19]
+
+
+def test_window_stats(tmp_path):
+    ring = TelemetryRing(tmp_path / "metrics.ring", capacity=64)
+    for i in range(30):
+        ring.append({"ts": 1000 + i, "MaxParallel": 4 if i != 25 else 9, "headroomVramGB": 20 - i * 0.5})
+    stats = ring.window_stats(window=10, now=1029)
+    par = stats["MaxParallel"]
+    assert par["count"] == 11 and par["p50"] == 4 and par["max"] == 9
+    assert abs(stats["headroomVramGB"]["rate"] + 0.5) < 1e-9
+    assert summarize([])["count"] == 0
+
+
+def test_single_noisy_sample_does_not_reconfigure(tmp_path):
+    ring = TelemetryRing(tmp_path / "metrics.ring", capacity=64)
+    applied = {"recommendation": {"MaxParallel": 4, "MaxVramGB": 24}}
+    for i in range(10):
+        ring.append({"ts": 1000 + i, "MaxParallel": 4, "MaxVramGB": 24})
+    spike = {"recommendation": {"MaxParallel": 8, "MaxVramGB": 24}}
+    ring.append({"ts": 1010, "MaxParallel": 8, "MaxVramGB": 24})
+    assert not stable_change(applied, spike, ring.window_stats(60, now=1010))
+    # a sustained shift moves the median and is applied
+    for i in range(11, 25):
+        ring.append({"ts": 1000 + i, "MaxParallel": 8, "MaxVramGB": 24})
+    assert stable_change(applied, spike, ring.window_stats(60, now=1024))
+    # but not when the latest sample has already gone back
+    back = {"recommendation": {"MaxParallel": 4, "MaxVramGB": 24}}
+    assert not stable_change(applied, back, ring.window_stats(60, now=1024))
+    assert stable_change(None, spike, {})
+
+
+def test_threaded_appends_keep_every_sample(tmp_path):
+    ring = TelemetryRing(tmp_path / "metrics.ring", capacity=1024)
+
+    def writer(base):
+        for i in range(100):
+            ring.append({"ts": base + i, "MaxParallel": base + i})
+
+    threads = [threading.Thread(target=writer, args=(n * 1000,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    recs = ring.records()
+    assert len(ring) == len(recs) == 800
+    # no slot was written twice: every (thread, i) sample survived intact
+    assert sorted(r["MaxParallel"] for r in recs) == sorted(n * 1000 + i for n in range(8) for i in range(100))
+    assert all(r["ts"] == r["MaxParallel"] for r in recs)